@@ -0,0 +1,65 @@
+"""
+Validation engine benchmarks
+
+    python -m benchmarks                        # every workload through ShExEvaluator.evaluate
+    python -m benchmarks --cli                  # ... and through the shexeval command line
+    python -m benchmarks -w regex_facets -s 5   # one workload, five times its default size
+    python -m benchmarks -o new.json -c old.json  # save the results and compare them with an earlier run
+
+Run from the root of the repository.  The same workloads are available to asv (see benchmarks.py).
+"""
+import json
+import sys
+from argparse import ArgumentParser
+from typing import List, Optional
+
+from benchmarks.runner import run_evaluate, run_cli, BenchmarkResult
+from benchmarks.workloads import WORKLOADS, workload
+
+
+def genargs() -> ArgumentParser:
+    parser = ArgumentParser("benchmarks", description="Run the synthetic validation workloads")
+    parser.add_argument("-w", "--workload", action="append", choices=list(WORKLOADS.keys()),
+                        help="Workload to run (default: all).  May be repeated")
+    parser.add_argument("-s", "--scale", type=float, default=1.0, help="Multiply the number of focus nodes")
+    parser.add_argument("--cli", action="store_true", help="Also run the workloads through the shexeval CLI")
+    parser.add_argument("-nm", "--nomemory", action="store_true", help="Don't measure peak memory")
+    parser.add_argument("-vo", "--verdictonly", action="store_true", help="Evaluate in verdict only mode")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    parser.add_argument("-c", "--compare", help="Compare nodes/sec with the results in this JSON file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    opts = genargs().parse_args(argv)
+    results: List[BenchmarkResult] = []
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = {(r['workload'], r['mode']): r for r in json.load(f)}
+
+    print(f"{'workload':20} {'mode':8} {'nodes':>7} {'errors':>6} {'seconds':>8} {'nodes/sec':>10} {'peak kb':>8}"
+          f"{'  vs baseline' if baseline else ''}")
+    for name in opts.workload or WORKLOADS.keys():
+        wl = workload(name, opts.scale)
+        runs = [run_evaluate(wl, not opts.nomemory, verdict_only=opts.verdictonly)]
+        if opts.cli:
+            runs.append(run_cli(wl, not opts.nomemory))
+        for r in runs:
+            results.append(r)
+            line = f"{r.workload:20} {r.mode:8} {r.nodes:7} {r.errors:6} {r.seconds:8.3f} {r.nodes_per_sec:10.1f} " \
+                   f"{r.peak_kb:8}"
+            base = baseline.get((r.workload, r.mode))
+            if base and base['nodes_per_sec']:
+                line += f"  {r.nodes_per_sec / base['nodes_per_sec']:6.2f}x"
+            print(line)
+            sys.stdout.flush()
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump([dict(r._asdict(), nodes_per_sec=r.nodes_per_sec) for r in results], f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
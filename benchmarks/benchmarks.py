@@ -0,0 +1,53 @@
+"""
+`asv <https://asv.readthedocs.io>`_ view of the workloads.  Each workload is a parameter; graph and schema
+generation happen in setup and aren't timed.
+"""
+from time import perf_counter
+
+from rdflib import Graph
+
+from benchmarks.runner import run_cli
+from benchmarks.workloads import WORKLOADS, workload
+from pyshex import ShExEvaluator
+
+
+class EvaluateSuite:
+    params = list(WORKLOADS.keys())
+    param_names = ["workload"]
+    timeout = 300
+
+    def setup(self, name: str) -> None:
+        self.wl = workload(name)
+        self.g = Graph()
+        self.g.parse(data=self.wl.rdf, format="turtle")
+
+    def _evaluate(self, **kwargs) -> None:
+        ShExEvaluator(self.g, self.wl.shex, self.wl.foci, self.wl.start, **kwargs).evaluate()
+
+    def time_evaluate(self, _: str) -> None:
+        self._evaluate()
+
+    def time_evaluate_verdict_only(self, _: str) -> None:
+        self._evaluate(verdict_only=True)
+
+    def peakmem_evaluate(self, _: str) -> None:
+        self._evaluate()
+
+    def track_nodes_per_sec(self, _: str) -> float:
+        evaluator = ShExEvaluator(self.g, self.wl.shex, self.wl.foci, self.wl.start)
+        start = perf_counter()
+        evaluator.evaluate()
+        return evaluator.nnodes / (perf_counter() - start)
+    track_nodes_per_sec.unit = "nodes/sec"
+
+
+class CLISuite:
+    params = list(WORKLOADS.keys())
+    param_names = ["workload"]
+    timeout = 300
+
+    def setup(self, name: str) -> None:
+        self.wl = workload(name)
+
+    def time_shexeval(self, _: str) -> None:
+        run_cli(self.wl, memory=False)
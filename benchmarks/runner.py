@@ -0,0 +1,86 @@
+"""
+Run the synthetic workloads through :py:class:`ShExEvaluator` or the `shexeval` command line and measure them.
+
+Time and memory are measured in separate runs, as tracemalloc slows evaluation down considerably.  Graph parsing
+is not included in the `evaluate` timings -- it is in the `cli` ones, as that is what a command line user sees.
+"""
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import NamedTuple, Callable, Tuple
+
+from rdflib import Graph
+
+from benchmarks.workloads import Workload
+from pyshex import ShExEvaluator
+from pyshex.shex_evaluator import evaluate_cli
+
+
+class BenchmarkResult(NamedTuple):
+    workload: str
+    mode: str
+    nodes: int
+    errors: int
+    seconds: float
+    peak_kb: int
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+def _measure(f: Callable[[], Tuple[int, int]], memory: bool) -> Tuple[int, int, float, int]:
+    """ Run f, which returns (nodes, errors), and return nodes, errors, elapsed time and peak memory (kb) """
+    start = time.perf_counter()
+    nodes, errors = f()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        try:
+            f()
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return nodes, errors, elapsed, peak
+
+
+def run_evaluate(wl: Workload, memory: bool = True, **evaluator_args) -> BenchmarkResult:
+    """ Evaluate every focus node in wl with a ShExEvaluator
+
+    :param wl: workload to run
+    :param memory: also measure peak memory
+    :param evaluator_args: additional ShExEvaluator arguments (e.g. verdict_only, workers)
+    """
+    g = Graph()
+    g.parse(data=wl.rdf, format="turtle")
+
+    def evaluate() -> Tuple[int, int]:
+        evaluator = ShExEvaluator(g, wl.shex, wl.foci, wl.start, **evaluator_args)
+        evaluator.evaluate()
+        return evaluator.nnodes, evaluator.nerrors
+
+    return BenchmarkResult(wl.name, "evaluate", *_measure(evaluate, memory))
+
+
+def run_cli(wl: Workload, memory: bool = True) -> BenchmarkResult:
+    """ Validate every subject in wl with the shexeval command line (-A) """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        rdf_file = os.path.join(tmpdir, "data.ttl")
+        shex_file = os.path.join(tmpdir, "schema.shex")
+        with open(rdf_file, 'w') as f:
+            f.write(wl.rdf)
+        with open(shex_file, 'w') as f:
+            f.write(wl.shex)
+        nsubjects = len(set(Graph().parse(rdf_file, format="turtle").subjects()))
+
+        def evaluate() -> Tuple[int, int]:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                evaluate_cli([rdf_file, shex_file, "-A", "-s", wl.start])
+            return nsubjects, output.getvalue().count("  Focus: ")
+
+        return BenchmarkResult(wl.name, "cli", *_measure(evaluate, memory))
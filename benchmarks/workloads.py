@@ -0,0 +1,141 @@
+"""
+Synthetic, reproducible validation workloads.
+
+Each generator returns a :py:class:`Workload` -- a ShExC schema, a turtle graph, the focus nodes and the start
+shape.  The graphs are generated from a fixed seed, so a workload of a given size is identical from run to run.
+`size` is the rough number of focus nodes (or triples per node for the cardinality workloads).
+"""
+import random
+from typing import List, NamedTuple, Callable, Dict, Tuple
+
+NS = "http://bench.example/"
+
+PREFIXES = f"""PREFIX : <{NS}>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+"""
+
+TTL_PREFIXES = f"""@prefix : <{NS}> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+"""
+
+
+class Workload(NamedTuple):
+    name: str
+    shex: str
+    rdf: str
+    foci: List[str]
+    start: str
+
+
+def _foci(n: int) -> List[str]:
+    return [f"{NS}n{i}" for i in range(n)]
+
+
+def wide_shapes(size: int, width: int = 30) -> Workload:
+    """ Shapes with many triple constraints, each with a datatype """
+    shex = PREFIXES + ":Wide {\n" + " ;\n".join(f"  :p{j} xsd:integer" for j in range(width)) + "\n}"
+    rdf = TTL_PREFIXES + '\n'.join(f":n{i} " + ' ; '.join(f":p{j} {i * width + j}" for j in range(width)) + " ."
+                                   for i in range(size))
+    return Workload("wide_shapes", shex, rdf, _foci(size), f"{NS}Wide")
+
+
+def deep_recursion(size: int, depth: int = 40) -> Workload:
+    """ Linked lists that are validated by a recursive shape from the head """
+    shex = PREFIXES + ":List { :value xsd:integer ; :next @:List ? }"
+    lines = []
+    for i in range(size):
+        for d in range(depth):
+            lines.append(f":l{i}_{d} :value {d}" + (f" ; :next :l{i}_{d + 1} ." if d < depth - 1 else " ."))
+    return Workload("deep_recursion", shex, TTL_PREFIXES + '\n'.join(lines), [f"{NS}l{i}_0" for i in range(size)],
+                    f"{NS}List")
+
+
+def high_cardinality(size: int, cardinality: int = 500) -> Workload:
+    """ Nodes with hundreds of triples for the same predicate """
+    shex = PREFIXES + ":Many { :p xsd:integer * ; :q LITERAL }"
+    rdf = TTL_PREFIXES + '\n'.join(f":n{i} :q 'x' ; :p " + ', '.join(str(j) for j in range(cardinality)) + " ."
+                                   for i in range(size))
+    return Workload("high_cardinality", shex, rdf, _foci(size), f"{NS}Many")
+
+
+def shared_predicates(size: int) -> Workload:
+    """ EachOfs whose components share predicates, so triples have to be assigned between them """
+    shex = PREFIXES + """:Shared {
+  :p [:a] ;
+  :p [:b] ? ;
+  :p IRI {1,3} ;
+  ( :q xsd:integer ; :r LITERAL | :q LITERAL ; :s . ) ;
+  :r . *
+}"""
+    rng = random.Random(1)
+    lines = []
+    for i in range(size):
+        ps = [":a"] + ([":b"] if rng.random() < 0.5 else []) + [f":v{j}" for j in range(rng.randint(1, 3))]
+        rest = f":q {i} ; :r 'r{i}'" if rng.random() < 0.5 else f":q 'q{i}' ; :s :x"
+        lines.append(f":n{i} :p {', '.join(ps)} ; {rest} .")
+    return Workload("shared_predicates", shex, TTL_PREFIXES + '\n'.join(lines), _foci(size), f"{NS}Shared")
+
+
+def large_value_set(size: int, values: int = 5000) -> Workload:
+    """ Value sets with thousands of IRIs and a few stems """
+    shex = PREFIXES + ":Coded { :code [" + ' '.join(f":c{j}" for j in range(values)) + \
+        " <http://other.example/>~ ] ; :lang [@en @fr @de~] ? }"
+    rng = random.Random(2)
+    rdf = TTL_PREFIXES + '\n'.join(f":n{i} :code :c{rng.randrange(values + values // 10)} ; :lang 'x'@en ."
+                                   for i in range(size))
+    return Workload("large_value_set", shex, rdf, _foci(size), f"{NS}Coded")
+
+
+def closed_shapes(size: int, extras: int = 10) -> Workload:
+    """ CLOSED shapes with EXTRA predicates that carry many values """
+    shex = PREFIXES + """:Closed CLOSED EXTRA rdf:type {
+  rdf:type [:Thing] ;
+  :name LITERAL ;
+  :link @:Closed ?
+}"""
+    lines = []
+    for i in range(size):
+        types = ', '.join([":Thing"] + [f":T{j}" for j in range(extras)])
+        link = f" ; :link :n{i + 1}" if i % 3 != 2 and i + 1 < size else ""
+        stray = " ; :stray 1" if i % 10 == 9 else ""
+        lines.append(f":n{i} rdf:type {types} ; :name 'n{i}'{link}{stray} .")
+    return Workload("closed_shapes", shex, TTL_PREFIXES + '\n'.join(lines), _foci(size), f"{NS}Closed")
+
+
+def regex_facets(size: int) -> Workload:
+    """ String and numeric facets on literal heavy nodes """
+    shex = PREFIXES + r""":Facets {
+  :id /^[A-Z]{3}-[0-9]{4,6}$/ ;
+  :email /^[a-z0-9.]+@[a-z]+\.(com|org)$/i ;
+  :title LITERAL MINLENGTH 3 MAXLENGTH 40 ;
+  :score xsd:decimal MININCLUSIVE 0 MAXEXCLUSIVE 100 TOTALDIGITS 5 ;
+  :count xsd:integer MININCLUSIVE 1 {1,5}
+}"""
+    rng = random.Random(3)
+    lines = []
+    for i in range(size):
+        ident = f"ABC-{rng.randint(1000, 1100000)}"
+        counts = ', '.join(str(rng.randint(0, 200)) for _ in range(rng.randint(1, 5)))
+        lines.append(f":n{i} :id '{ident}' ; :email 'user.{i}@Example.org' ; :title 'Title number {i}' ; "
+                     f":score {rng.randint(0, 10500) / 100} ; :count {counts} .")
+    return Workload("regex_facets", shex, TTL_PREFIXES + '\n'.join(lines), _foci(size), f"{NS}Facets")
+
+
+# Workload generators and the size that each is run at by default
+WORKLOADS: Dict[str, Tuple[Callable[..., Workload], int]] = {
+    "wide_shapes": (wide_shapes, 200),
+    "deep_recursion": (deep_recursion, 20),
+    "high_cardinality": (high_cardinality, 20),
+    "shared_predicates": (shared_predicates, 200),
+    "large_value_set": (large_value_set, 500),
+    "closed_shapes": (closed_shapes, 300),
+    "regex_facets": (regex_facets, 1000),
+}
+
+
+def workload(name: str, scale: float = 1.0) -> Workload:
+    """ Generate workload name with its default focus node count multiplied by scale """
+    generator, size = WORKLOADS[name]
+    return generator(max(1, int(size * scale)))
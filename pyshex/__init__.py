@@ -1,5 +1,6 @@
 from pyshex.prefixlib import PrefixLibrary, standard_prefixes, known_prefixes
 from pyshex.shex_evaluator import ShExEvaluator
+from pyshex.incremental_evaluator import IncrementalEvaluator
 
 import rdflib_shim
 shim_installed = rdflib_shim.RDFLIB_SHIM
@@ -0,0 +1,165 @@
+"""
+Incremental re-validation of a graph that changes by small deltas.
+
+A full evaluation records, for each verdict, the arcs that it read (its :py:class:`Footprint`).  An index from arcs
+to focus nodes then turns a set of added and removed triples into the focus nodes whose verdicts may have changed.
+Only those are re-evaluated.  Footprints cover every shape a verdict visited, so a focus that references a changed
+node is re-evaluated along with it::
+
+    incremental = IncrementalEvaluator(ShExEvaluator(g, schema, focus, start))
+    incremental.evaluate()
+    incremental.save('verdicts.json')
+    ...
+    incremental.load('verdicts.json')
+    results = incremental.update(added=[(s, p, o)], removed=[(s, p, o2)])
+
+The graph is updated in place, so the evaluator must work on an in-memory graph.
+"""
+import json
+from typing import Dict, List, Tuple, Set, Iterable, Optional, Union
+
+from ShExJSG import ShExJ
+from rdflib import URIRef, Graph
+from rdflib.term import Identifier
+from rdflib.util import from_n3
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple
+from pyshex.shex_evaluator import ShExEvaluator, EvaluationResult
+from pyshex.utils.footprint import Footprint, FootprintEntry, affected_entries
+
+FootprintedResult = Tuple[EvaluationResult, Footprint]
+
+
+class IncrementalEvaluator:
+    def __init__(self, evaluator: ShExEvaluator) -> None:
+        """
+        :param evaluator: evaluator with the graph, schema, focus nodes and start shapes.  If the evaluator has no
+        focus nodes, every non-BNode subject in the graph is a focus node -- subjects come and go with updates.
+        """
+        self.evaluator = evaluator
+        self.reevaluated: List[URIRef] = []             # Focus nodes that the last evaluate or update evaluated
+
+        # Results of each focus node, in focus order, and the focus nodes whose results read each arc
+        self._results: Dict[URIRef, List[FootprintedResult]] = {}
+        self._index: Dict[FootprintEntry, Set[URIRef]] = {}
+
+    @property
+    def results(self) -> List[EvaluationResult]:
+        return [result for results in self._results.values() for result, _ in results]
+
+    def evaluate(self) -> List[EvaluationResult]:
+        """ Evaluate every focus node from scratch """
+        self._results = {}
+        self._index = {}
+        self.reevaluated = []
+        self._evaluate(self.evaluator.foci)
+        return self.results
+
+    def update(self, added: Iterable[RDFTriple] = (), removed: Iterable[RDFTriple] = ()) -> List[EvaluationResult]:
+        """ Apply a delta to the graph and re-evaluate the focus nodes whose verdicts it may change
+
+        :param added: triples to add to the graph
+        :param removed: triples to remove from the graph
+        :return: complete set of results after the update
+        """
+        added = list(added)
+        removed = list(removed)
+        g = self.evaluator.g
+        was_empty = self._is_empty(g)
+        for t in removed:
+            g.remove(t)
+        for t in added:
+            g.add(t)
+        if self.evaluator.result_cache is not None:
+            self.evaluator.result_cache.clear()
+
+        # A focus node that isn't in the graph conforms to some shapes if, and only if, the graph is empty
+        if was_empty or self._is_empty(g):
+            return self.evaluate()
+
+        affected: Set[URIRef] = set()
+        for t in added + removed:
+            for entry in affected_entries(t):
+                affected.update(self._index.get(entry, ()))
+        foci = [focus for focus in self._results if focus in affected]
+
+        # Without explicit focus nodes, new subjects are new focus nodes and subjects without arcs out are gone
+        if not self.evaluator.focus:
+            for s in dict.fromkeys(t[0] for t in added):
+                if isinstance(s, URIRef) and s not in self._results:
+                    foci.append(s)
+            for s in dict.fromkeys(t[0] for t in removed):
+                if s in self._results and next(g.predicate_objects(s), None) is None:
+                    self._discard(s)
+                    del self._results[s]
+                    if s in foci:
+                        foci.remove(s)
+
+        self.reevaluated = []
+        self._evaluate(foci)
+        return self.results
+
+    def save(self, path: str) -> None:
+        """ Save the results and their footprints to path """
+        with open(path, 'w') as f:
+            json.dump([[focus.n3(), [[result.result, _encode_start(result.start), result.reason,
+                                      [[n.n3(), is_out, p.n3() if p is not None else None]
+                                       for n, is_out, p in footprint]]
+                                     for result, footprint in results]]
+                       for focus, results in self._results.items()], f)
+
+    def load(self, path: str) -> None:
+        """ Replace the results and their footprints with those saved in path.  The graph must be in the state it
+        was in when they were saved. """
+        self._results = {}
+        self._index = {}
+        self.reevaluated = []
+        with open(path) as f:
+            for focus, results in json.load(f):
+                focus = from_n3(focus)
+                self._results[focus] = [
+                    (EvaluationResult(result, focus, _decode_start(start), reason),
+                     Footprint((from_n3(n), is_out, from_n3(p) if p is not None else None)
+                               for n, is_out, p in footprint))
+                    for result, start, reason, footprint in results]
+                self._add(focus)
+
+    def _evaluate(self, foci: Iterable[URIRef]) -> None:
+        for focus, results in self.evaluator.footprinted_results(foci):
+            if focus in self._results:
+                self._discard(focus)
+            self._results[focus] = results
+            self._add(focus)
+            self.reevaluated.append(focus)
+
+    def _add(self, focus: URIRef) -> None:
+        for _, footprint in self._results[focus]:
+            for entry in footprint:
+                self._index.setdefault(entry, set()).add(focus)
+
+    def _discard(self, focus: URIRef) -> None:
+        for _, footprint in self._results[focus]:
+            for entry in footprint:
+                foci = self._index.get(entry)
+                if foci is not None:
+                    foci.discard(focus)
+                    if not foci:
+                        del self._index[entry]
+
+    @staticmethod
+    def _is_empty(g: Graph) -> bool:
+        return next(g.triples((None, None, None)), None) is None
+
+
+def _encode_start(start: Optional[Union[Identifier, ShExJ.shapeExprLabel]]) -> Optional[List[str]]:
+    if start is None:
+        return None
+    return ['n3', start.n3()] if isinstance(start, Identifier) else ['label', str(start)]
+
+
+def _decode_start(start: Optional[List[str]]) -> Optional[Union[Identifier, ShExJ.shapeExprLabel]]:
+    if start is None:
+        return None
+    if start[0] == 'n3':
+        return from_n3(start[1])
+    return ShExJ.BNODE(start[1]) if start[1].startswith('_:') else ShExJ.IRIREF(start[1])
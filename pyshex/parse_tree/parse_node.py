@@ -8,6 +8,9 @@ from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import R
 from pyshex.utils.collection_utils import format_collection
 from pyshex.utils.n3_mapper import N3Mapper
 
+# A fail reason -- either the text itself or a function that renders it on demand
+Reason = Union[str, Callable[[], str]]
+
 
 class ParseNode:
     def __init__(self,
@@ -20,11 +23,23 @@ class ParseNode:
         self.graph = obj if isinstance(obj, RDFGraph) else None
         self.node = obj if isinstance_(obj, Node) else None
         self.result: bool = None
-        self._fail_reason: Optional[str] = None
+        self._reasons: List[Reason] = []
         self.reason_stack: List[Tuple[Union[BNode, URIRef], Optional[str]]] = []
         self.nodes: List[ParseNode] = []
         self.n3m = cntxt.n3_mapper
 
+    @property
+    def _fail_reason(self) -> Optional[str]:
+        """ Render the fail reasons recorded for this node.  Deferred reasons are only formatted here """
+        return '\n'.join(r if isinstance(r, str) else r() for r in self._reasons) if self._reasons else None
+
+    def add_reason(self, reason: Reason) -> None:
+        """ Record a fail reason
+
+        :param reason: reason text or a function that produces it if and when the reasons are reported
+        """
+        self._reasons.append(reason)
+
     def dump_bnodes(self, g: Graph, node: BNode, indent: str, top: bool = True) -> List[str]:
         indent = indent + "  "
         collection = format_collection(g, node, 6)
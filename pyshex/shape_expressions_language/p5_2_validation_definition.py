@@ -29,21 +29,30 @@ def isValid(cntxt: Context, m: FixedShapeMap) -> Tuple[bool, List[str]]:
         n = nodeshapepair.nodeSelector
         if not isinstance_(n, Node):
             return False, [f"{n}: Triple patterns are not implemented"]
-        # The third test below is because the spec asserts that completely empty graphs pass in certain circumstances
-        elif not (next(cntxt.graph.predicate_objects(nodeshapepair.nodeSelector), None) or
-                  next(cntxt.graph.subject_predicates(nodeshapepair.nodeSelector), None) or
-                  not next(cntxt.graph.triples((None, None, None)), None)):
+        s = cntxt.shapeExprFor(START if nodeshapepair.shapeLabel is None or nodeshapepair.shapeLabel is START
+                               else nodeshapepair.shapeLabel)
+        cntxt.plan_fetch(n, s)
+        if cntxt.footprint is not None:
+            cntxt.footprint.read_node(n)
+        # The fourth test below is because the spec asserts that completely empty graphs pass in certain circumstances
+        if not (cntxt.has_fetched_arcs(n) or
+                next(cntxt.graph.predicate_objects(nodeshapepair.nodeSelector), None) or
+                next(cntxt.graph.subject_predicates(nodeshapepair.nodeSelector), None) or
+                not next(cntxt.graph.triples((None, None, None)), None)):
             return False, [f"Focus: {nodeshapepair.nodeSelector} not in graph"]
         else:
-            s = cntxt.shapeExprFor(START if nodeshapepair.shapeLabel is None or nodeshapepair.shapeLabel is START
-                                   else nodeshapepair.shapeLabel)
-            cntxt.current_node = ParseNode(satisfies, s, n, cntxt)
+            if not cntxt.verdict_only:
+                cntxt.current_node = ParseNode(satisfies, s, n, cntxt)
             if not s:
                 if nodeshapepair.shapeLabel is START or nodeshapepair.shapeLabel is None:
                     cntxt.fail_reason = "START node is not specified or is invalid"
                 else:
                     cntxt.fail_reason = f"Shape: {nodeshapepair.shapeLabel} not found in Schema"
                 return False, cntxt.process_reasons()
+            if cntxt.verdict_only:
+                if not satisfies(cntxt, n, s):
+                    return False, []
+                continue
             parse_nodes.append(cntxt.current_node)
             if not satisfies(cntxt, n, s):
                 cntxt.current_node.result = False
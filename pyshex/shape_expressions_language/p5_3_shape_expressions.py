@@ -60,13 +60,13 @@ def notSatisfies(cntxt: Context, n: Node, se: ShExJ.shapeExpr, _: DebugContext)
 @trace_satisfies()
 def satisifesShapeOr(cntxt: Context, n: Node, se: ShExJ.ShapeOr, _: DebugContext) -> bool:
     """ Se is a ShapeOr and there is some shape expression se2 in shapeExprs such that satisfies(n, se2, G, m). """
-    return any(satisfies(cntxt, n, se2) for se2 in se.shapeExprs)
+    return cntxt.component_order.disjunction(cntxt, se.shapeExprs, lambda se2: satisfies(cntxt, n, se2))
 
 
 @trace_satisfies()
 def satisfiesShapeAnd(cntxt: Context, n: Node, se: ShExJ.ShapeAnd, _: DebugContext) -> bool:
     """ Se is a ShapeAnd and for every shape expression se2 in shapeExprs, satisfies(n, se2, G, m) """
-    return all(satisfies(cntxt, n, se2) for se2 in se.shapeExprs)
+    return cntxt.component_order.conjunction(cntxt, se.shapeExprs, lambda se2: satisfies(cntxt, n, se2))
 
 
 @trace_satisfies()
@@ -96,8 +96,8 @@ def satisfiesShapeExprRef(cntxt: Context, n: Node, se: ShExJ.shapeExprLabel, c:
      """
     if c.debug:
         print(f"id: {se}")
-    for shape in cntxt.schema.shapes:
-        if shape.id == se:
-            return satisfies(cntxt, n, shape)
+    shape = cntxt.shapeExprFor(se)
+    if shape is not None:
+        return satisfies(cntxt, n, shape)
     cntxt.fail_reason = f"{se}: Shape is not in Schema"
     return False
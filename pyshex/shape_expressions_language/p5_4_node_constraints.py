@@ -1,7 +1,7 @@
 """ Implementation of `5.4 <http://shex.io/shex-semantics/#node-constraints>`_"""
 
 import numbers
-from typing import Union
+from typing import Union, Callable, Optional
 
 from ShExJSG import ShExJ
 from pyjsg.jsglib import isinstance_
@@ -11,24 +11,176 @@ from jsonasobj import as_json
 from pyshex.shape_expressions_language.p5_context import Context, DebugContext
 from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node
 from pyshex.sparql11_query.p17_1_operand_data_types import is_sparql_operand_datatype, is_numeric
-from pyshex.utils.datatype_utils import can_cast_to, total_digits, fraction_digits, pattern_match, map_object_literal
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.datatype_utils import can_cast_to, total_digits, fraction_digits, pattern_match, map_object_literal, \
+    compile_pattern
 from pyshex.utils.trace_utils import trace_satisfies
 from pyshex.utils.value_set_utils import objectValueMatches, uriref_startswith_iriref, uriref_matches_iriref
 
 
 @trace_satisfies()
-def satisfiesNodeConstraint(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint, _: DebugContext) -> bool:
+def satisfiesNodeConstraint(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint, c: DebugContext) -> bool:
     """ `5.4.1 Semantics <http://shex.io/shex-semantics/#node-constraint-semantics>`_
 
     For a node n and constraint nc, satisfies2(n, nc) if and only if for every nodeKind, datatype, xsFacet and
     values constraint value v present in nc nodeSatisfies(n, v). The following sections define nodeSatisfies for
     each of these types of constraints:
     """
+    if not c.debug:
+        return cntxt.compiled_schema.node_checker(nc)(cntxt, n)
     return nodeSatisfiesNodeKind(cntxt, n, nc) and nodeSatisfiesDataType(cntxt, n, nc) and \
         nodeSatisfiesStringFacet(cntxt, n, nc) and nodeSatisfiesNumericFacet(cntxt, n, nc) and \
         nodeSatisfiesValues(cntxt, n, nc)
 
 
+# A node constraint compiled into a single test.  Returns the same result and records the same fail reasons as
+# the nodeSatisfies functions below
+NodeChecker = Callable[[Context, Node], bool]
+
+_node_kinds = {'iri': URIRef, 'bnode': BNode, 'literal': Literal, 'nonliteral': (URIRef, BNode)}
+
+
+def compile_node_constraint(nc: ShExJ.NodeConstraint, cs: CompiledSchema) -> NodeChecker:
+    """ Compile nc into a function that tests a node against the facets that are present in nc.  Everything that
+    depends on nc alone -- the node kind types, datatype IRI, regular expression and numeric bounds -- is worked
+    out here rather than for every node.  The nodeSatisfies functions are still used when debugging, as they
+    trace each facet.
+
+    :param nc: constraint to compile
+    :param cs: compiled schema that nc belongs to
+    :return: function that returns `satisfies2(n, nc)`
+    """
+    checks = [check for check in (_node_kind_checker(nc), _datatype_checker(nc), _string_facet_checker(nc),
+                                  _numeric_facet_checker(nc), _values_checker(nc, cs)) if check is not None]
+    if not checks:
+        return lambda _c, _n: True
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(cntxt: Context, n: Node) -> bool:
+        for check in checks:
+            if not check(cntxt, n):
+                return False
+        return True
+    return check_all
+
+
+def _node_kind_checker(nc: ShExJ.NodeConstraint) -> Optional[NodeChecker]:
+    if nc.nodeKind is None:
+        return None
+    node_kind = str(nc.nodeKind)
+    kind_types = _node_kinds.get(node_kind, ())
+
+    def check_node_kind(cntxt: Context, n: Node) -> bool:
+        if isinstance(n, kind_types):
+            return True
+        cntxt.fail_reason = f"Node kind mismatch have: {type(n).__name__} expected: {node_kind}"
+        return False
+    return check_node_kind
+
+
+def _datatype_checker(nc: ShExJ.NodeConstraint) -> Optional[NodeChecker]:
+    if nc.datatype is None:
+        return None
+    datatype = str(nc.datatype)
+    castable = is_sparql_operand_datatype(nc.datatype)
+
+    def check_datatype(cntxt: Context, n: Node) -> bool:
+        if not isinstance(n, Literal):
+            cntxt.fail_reason = lambda: f"Datatype constraint ({datatype}) " \
+                f"does not match {type(n).__name__} {cntxt.n3_mapper.n3(n)}"
+            cntxt.dump_bnode(n)
+            return False
+        actual_datatype = _datatype(n)
+        if actual_datatype == datatype or (castable and can_cast_to(n, datatype)):
+            return True
+        cntxt.fail_reason = f"Datatype mismatch - expected: {datatype} actual: {actual_datatype}"
+        return False
+    return check_datatype
+
+
+def _string_facet_checker(nc: ShExJ.NodeConstraint) -> Optional[NodeChecker]:
+    if nc.length is None and nc.minlength is None and nc.maxlength is None and nc.pattern is None:
+        return None
+    length = int(nc.length) if nc.length is not None else None
+    minlength = int(nc.minlength) if nc.minlength is not None else None
+    maxlength = int(nc.maxlength) if nc.maxlength is not None else None
+    pattern = compile_pattern(str(nc.pattern), str(nc.flags) if nc.flags is not None else None) \
+        if nc.pattern is not None else None
+
+    def check_string_facets(cntxt: Context, n: Node) -> bool:
+        lex = str(n)
+        lex_len = len(lex)
+        if length is not None and lex_len != length:
+            cntxt.fail_reason = f"String length mismatch - expected: {nc.length} actual: {lex_len}"
+        elif minlength is not None and lex_len < minlength:
+            cntxt.fail_reason = f"String length violation - minimum: {nc.minlength} actual: {lex_len}"
+        elif maxlength is not None and lex_len > maxlength:
+            cntxt.fail_reason = f"String length violation - maximum: {nc.maxlength} actual: {lex_len}"
+        elif pattern is not None and pattern.search(lex) is None:
+            cntxt.fail_reason = f"Pattern match failure - pattern: {nc.pattern} flags:{nc.flags} string: {lex}"
+        else:
+            return True
+        return False
+    return check_string_facets
+
+
+def _numeric_facet_checker(nc: ShExJ.NodeConstraint) -> Optional[NodeChecker]:
+    if nc.mininclusive is None and nc.minexclusive is None and nc.maxinclusive is None \
+            and nc.maxexclusive is None and nc.totaldigits is None and nc.fractiondigits is None:
+        return None
+
+    def native(v: Optional[numbers.Number]) -> Optional[numbers.Number]:
+        return None if v is None else int(v) if isinstance(v, int) else float(v)
+
+    mininclusive, minexclusive = native(nc.mininclusive), native(nc.minexclusive)
+    maxinclusive, maxexclusive = native(nc.maxinclusive), native(nc.maxexclusive)
+    totaldigits, fractiondigits = native(nc.totaldigits), native(nc.fractiondigits)
+
+    def check_numeric_facets(cntxt: Context, n: Node) -> bool:
+        if not is_numeric(n):
+            cntxt.fail_reason = f"Numeric test on non-number: {n}"
+            return False
+        v = n.value
+        if not isinstance(v, numbers.Number):
+            cntxt.fail_reason = f"Numeric test on non-number: {v}"
+            return False
+        if mininclusive is not None and v < mininclusive:
+            cntxt.fail_reason = f"Numeric value volation - minimum inclusive: {nc.mininclusive} actual: {v}"
+        elif minexclusive is not None and v <= minexclusive:
+            cntxt.fail_reason = f"Numeric value volation - minimum exclusive: {nc.minexclusive} actual: {v}"
+        elif maxinclusive is not None and v > maxinclusive:
+            cntxt.fail_reason = f"Numeric value volation - maximum inclusive: {nc.maxinclusive} actual: {v}"
+        elif maxexclusive is not None and v >= maxexclusive:
+            cntxt.fail_reason = f"Numeric value volation - maximum exclusive: {nc.maxexclusive} actual: {v}"
+        elif totaldigits is not None and (total_digits(n) is None or total_digits(n) > totaldigits):
+            cntxt.fail_reason = f"Numeric value volation - max total digits: {nc.totaldigits} value: {v}"
+        elif fractiondigits is not None and (fraction_digits(n) is None or fraction_digits(n) > fractiondigits):
+            cntxt.fail_reason = f"Numeric value volation - max fractional digits: {nc.fractiondigits} value: {v}"
+        else:
+            return True
+        return False
+    return check_numeric_facets
+
+
+def _values_checker(nc: ShExJ.NodeConstraint, cs: CompiledSchema) -> Optional[NodeChecker]:
+    index = cs.value_set_index(nc)
+    if index is None:
+        return None
+    others = index.others
+
+    def check_values(cntxt: Context, n: Node) -> bool:
+        if index.matches(n):
+            return True
+        for vsv in others:
+            if _nodeSatisfiesValue(cntxt, n, vsv):
+                return True
+        cntxt.fail_reason = lambda: f"Node: {cntxt.n3_mapper.n3(n)} not in value set:\n\t " \
+            f"{as_json(cntxt.type_last(nc), indent=None)[:60]}..."
+        return False
+    return check_values
+
+
 @trace_satisfies(newline=False, skip_trace=lambda nc: nc.nodeKind is None)
 def nodeSatisfiesNodeKind(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint, c: DebugContext) -> bool:
     """ `5.4.2 Node Kind Constraints <http://shex.io/shex-semantics/#nodeKind>`_
@@ -66,7 +218,7 @@ def nodeSatisfiesDataType(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint, c:
     if c.debug:
         print(f" Datatype: {nc.datatype}")
     if not isinstance(n, Literal):
-        cntxt.fail_reason = f"Datatype constraint ({nc.datatype}) " \
+        cntxt.fail_reason = lambda: f"Datatype constraint ({nc.datatype}) " \
             f"does not match {type(n).__name__} {cntxt.n3_mapper.n3(n)}"
         cntxt.dump_bnode(n)
         return False
@@ -188,10 +340,10 @@ def nodeSatisfiesNumericFacet(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint,
                         cntxt.fail_reason = "Impossible error - kick the programmer"
                     return False
             else:
-                cntxt.fail_reason = "Numeric test on non-number: {v}"
+                cntxt.fail_reason = f"Numeric test on non-number: {v}"
                 return False
         else:
-            cntxt.fail_reason = "Numeric test on non-number: {n}"
+            cntxt.fail_reason = f"Numeric test on non-number: {n}"
             return False
     return True
 
@@ -201,14 +353,18 @@ def nodeSatisfiesValues(cntxt: Context, n: Node, nc: ShExJ.NodeConstraint, _c: D
     """ `5.4.5 Values Constraint <http://shex.io/shex-semantics/#values>`_
 
      For a node n and constraint value v, nodeSatisfies(n, v) if n matches some valueSetValue vsv in v.
+
+     The values are looked up in the compiled schema's :py:class:`ValueSetIndex` -- :py:func:`_nodeSatisfiesValue`
+     is only applied to the values that can't be indexed.
     """
-    if nc.values is None:
+    index = cntxt.compiled_schema.value_set_index(nc)
+    if index is None:
         return True
     else:
-        if any(_nodeSatisfiesValue(cntxt, n, vsv) for vsv in nc.values):
+        if index.matches(n) or any(_nodeSatisfiesValue(cntxt, n, vsv) for vsv in index.others):
             return True
         else:
-            cntxt.fail_reason = f"Node: {cntxt.n3_mapper.n3(n)} not in value set:\n\t " \
+            cntxt.fail_reason = lambda: f"Node: {cntxt.n3_mapper.n3(n)} not in value set:\n\t " \
                 f"{as_json(cntxt.type_last(nc), indent=None)[:60]}..."
             return False
 
@@ -223,7 +379,8 @@ def _nodeSatisfiesValue(cntxt: Context, n: Node, vsv: ShExJ.valueSetValue) -> bo
           nodeIn(n, st) and there is no x in excls such that nodeIn(n, excl).
         * vsv is a Wildcard with exclusions excls and there is no x in excls such that nodeIn(n, excl).
 
-    Note that ObjectLiteral is *not* typed in ShExJ.jsg, so we identify it by a lack of a 'type' variable
+    Note that ObjectLiteral is *not* typed in ShExJ.jsg, so we identify it by a lack of a 'type' variable.  The
+    compiled schema has already done this for the values in a NodeConstraint.
 
     .. note:: Mismatch with spec
         This won't work correctly if the stem value is passed in to nodeIn, as there will be no way to know whether
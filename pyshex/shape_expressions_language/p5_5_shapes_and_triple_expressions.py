@@ -1,23 +1,25 @@
 """ Implementation of `5.5 Shapes and Triple Expressions <http://shex.io/shex-semantics/#shapes-and-TEs>`_"""
 
+import time
 from typing import List, Optional, Union, Set
 
 from ShExJSG import ShExJ
 from pyjsg.jsglib import isinstance_
 from rdflib import URIRef
-from sparqlslurper import SlurpyGraph
 
 from pyshex.shape_expressions_language.p3_terminology import arcsOut
 from pyshex.shape_expressions_language.p5_7_semantic_actions import semActsSatisfied
 from pyshex.shape_expressions_language.p5_context import Context, DebugContext
 from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFGraph, RDFTriple, Node
+from pyshex.utils.bipartite_matcher import BipartiteMatcher
+from pyshex.utils.compiled_schema import CompiledShape
+from pyshex.utils.extras_resolver import ExtrasResolver
 from pyshex.utils.matchesEachOfEvaluator import EachOfEvaluator
-from pyshex.utils.partitions import partition_t, partition_2
-from pyshex.utils.schema_utils import predicates_in_expression, triple_constraints_in_expression, \
-    directed_predicates_in_expression
+from pyshex.utils.neighbourhood import Neighbourhood
+from pyshex.utils.partitions import partition_t
 from pyshex.utils.slurp_utils import slurper
 from pyshex.utils.trace_utils import trace_matches, trace_satisfies, trace_matches_tripleconstraint
-from pyshex.utils.value_set_utils import uriref_matches_iriref, iriref_to_uriref
+from pyshex.utils.triple_table import bit_count
 
 
 @trace_satisfies()
@@ -36,69 +38,92 @@ def satisfiesShape(cntxt: Context, n: Node, S: ShExJ.Shape, c: DebugContext) ->
     :return: true iff `satisfies(n, S, cntxt)`
     """
 
+    # Deep data is evaluated from the bottom up rather than by nesting any deeper
+    if len(cntxt.evaluate_stack) >= cntxt.nesting_limit:
+        cntxt.evaluate_deep(n, S)
+
     # Recursion detection.  If start_evaluating returns a boolean value, this is the assumed result of the shape
     # evaluation.  If it returns None, then an initial evaluation is needed
     rslt = cntxt.start_evaluating(n, S)
 
     if rslt is None:
         cntxt.evaluate_stack.append((n, S.id))
-        predicates = directed_predicates_in_expression(S, cntxt)
-        matchables = RDFGraph()
-
-        # Note: The code below does an "over-slurp" for the sake of expediency.  If you are interested in
-        #       getting EXACTLY the needed triples, set cntxt.over_slurp to false
-        if isinstance(cntxt.graph, SlurpyGraph) and cntxt.over_slurp:
-            with slurper(cntxt, n, S) as g:
-                _ = g.triples((n, None, None))
-
-        for predicate, direction in predicates.items():
-            with slurper(cntxt, n, S) as g:
-                matchables.add_triples(g.triples((n if direction.is_fwd else None,
-                                                  iriref_to_uriref(predicate),
-                                                  n if direction.is_rev else None)))
+        if cntxt.stats is not None:
+            cntxt.stats.enter_shape(S.id)
+        cshape = cntxt.compiled_schema.shape(S)
+        predicates = cshape.predicates
+        if cntxt.footprint is not None:
+            cntxt.footprint.read_shape(n, cshape)
+
+        # Note: The neighbourhood does an "over-slurp" of the arcs out for the sake of expediency.  If you are
+        #       interested in getting EXACTLY the needed triples, set cntxt.over_slurp to false or use a
+        #       cntxt.sparql_planner
+        with slurper(cntxt, n, S):
+            neighbourhood = cntxt.neighbourhood(n, S)
+            matchables_mask = 0
+            for predicate, direction in predicates.items():
+                if direction.is_fwd:
+                    matchables_mask |= neighbourhood.out_mask(predicate)
+                if direction.is_rev:
+                    matchables_mask |= neighbourhood.in_mask(predicate)
+        table = neighbourhood.table
+        matchables = table.graph(matchables_mask)
 
         if c.debug:
             print(c.i(1, "predicates:", sorted(cntxt.n3_mapper.n3(p) for p in predicates.keys())))
             print(c.i(1, "matchables:", sorted(cntxt.n3_mapper.n3(m) for m in matchables)))
             print()
 
-        if S.closed:
-            # TODO: Is this working correctly on reverse items?
-            non_matchables = RDFGraph([t for t in arcsOut(cntxt.graph, n) if t not in matchables])
-            if len(non_matchables):
-                cntxt.fail_reason = "Unmatched triples in CLOSED shape:"
-                cntxt.fail_reason = '\n'.join(f"\t{t}" for t in non_matchables)
-                if c.debug:
-                    print(c.i(0,
-                              f"<--- Satisfies shape {c.d()} FAIL - "
-                              f"{len(non_matchables)} non-matching triples on a closed shape"))
-                    print(c.i(1, "", list(non_matchables)))
-                    print()
-                return False
+        non_matchables = RDFGraph()
+        if cshape.closed:
+            # Arcs out that aren't matchables are unmatchable
+            non_matchables = table.graph(neighbourhood.arcs_out_mask() & ~matchables_mask)
+        if len(non_matchables):
+            cntxt.fail_reason = "Unmatched triples in CLOSED shape:"
+            cntxt.fail_reason = lambda: '\n'.join(f"\t{t}" for t in non_matchables)
+            if c.debug:
+                print(c.i(0,
+                          f"<--- Satisfies shape {c.d()} FAIL - "
+                          f"{len(non_matchables)} non-matching triples on a closed shape"))
+                print(c.i(1, "", list(non_matchables)))
+                print()
+            rslt = False
+
+        # A node with too few or too many arcs of some predicate fails before any partition or value is looked at
+        elif S.expression and not _arc_counts_fit(cntxt, neighbourhood, cshape):
+            if cntxt.stats is not None:
+                cntxt.stats.shape(S.id).prefiltered += 1
+            rslt = False
 
         # Evaluate the actual expression.  Start assuming everything matches...
-        if S.expression:
-            extras = {iriref_to_uriref(e) for e in S.extra} if S.extra is not None else {}
+        elif S.expression:
+            extras = cshape.extras
             if matches(cntxt, matchables, S.expression, extras):
                 rslt = True
             else:
-                if len(extras):
-                    permutable_matchables = RDFGraph([t for t in matchables if t.p in extras])
-                    non_permutable_matchables = RDFGraph([t for t in matchables if t not in permutable_matchables])
+                # The bipartite matcher accounts for extras on its own.  Only the partition enumerator needs the
+                # extras permuted
+                if len(extras) and cntxt.compiled_schema.alternatives(S.expression) is None:
+                    permutable_mask = 0
+                    for p in extras:
+                        if p in predicates:
+                            if predicates[p].is_fwd:
+                                permutable_mask |= neighbourhood.out_mask(p)
+                            if predicates[p].is_rev:
+                                permutable_mask |= neighbourhood.in_mask(p)
                     if c.debug:
                         print(c.i(1,
                                   f"Complete match failed -- evaluating extras", list(extras)))
-                    for matched, remainder in partition_2(permutable_matchables):
-                        permutation = non_permutable_matchables.union(matched)
-                        if matches(cntxt, permutation, S.expression):
-                            rslt = True
-                            break
+                    rslt = ExtrasResolver(table, matchables_mask & ~permutable_mask, permutable_mask,
+                                          cshape.triple_constraints, n).evaluate(cntxt, S.expression)
                 rslt = rslt or False
         else:
             rslt = True         # Empty shape
 
-        # If an assumption was made and the result doesn't match the assumption, switch directions and try again
+        # If our own value changed after it was read by the pairs that depend on it, evaluate again
         done, consistent = cntxt.done_evaluating(n, S, rslt)
+        if cntxt.stats is not None:
+            cntxt.stats.exit_shape()
         if not done:
             rslt = satisfiesShape(cntxt, n, S)
         rslt = rslt and consistent
@@ -107,6 +132,28 @@ def satisfiesShape(cntxt: Context, n: Node, S: ShExJ.Shape, c: DebugContext) ->
     return rslt
 
 
+def _arc_counts_fit(cntxt: Context, neighbourhood: Neighbourhood, cshape: CompiledShape) -> bool:
+    """ Determine whether the number of arcs of each predicate in the neighbourhood is within the bounds that the
+    shape can match.  This is a necessary condition only -- the values of the arcs are not checked
+    """
+    if cshape.arc_bounds is None:
+        return True
+    for (p, is_fwd), (min_, max_) in cshape.arc_bounds.items():
+        mask = neighbourhood.out_mask(p) if is_fwd else neighbourhood.in_mask(p)
+        n = bit_count(mask)
+        if n < min_ or 0 <= max_ < n:
+            cardinality_text = f"{{{min_},{'*' if max_ == -1 else max_}}}"
+            if n == 0:
+                cntxt.fail_reason = lambda: f"   No matching triples found for predicate " \
+                    f"{'^' if not is_fwd else ''}{cntxt.n3_mapper.n3(p)}"
+            else:
+                _fail_triples(cntxt, neighbourhood.table.graph(mask))
+                cntxt.fail_reason = f"   {n} triples {'less than' if n < min_ else 'exceeds max'} " \
+                    f"{cardinality_text}"
+            return False
+    return True
+
+
 def valid_remainder(cntxt: Context, n: Node, matchables: RDFGraph, S: ShExJ.Shape) -> bool:
     """
     Let **outs** be the arcsOut in remainder: `outs = remainder ∩ arcsOut(G, n)`.
@@ -131,26 +178,26 @@ def valid_remainder(cntxt: Context, n: Node, matchables: RDFGraph, S: ShExJ.Shap
     outs = arcsOut(cntxt.graph, n).intersection(matchables)
 
     # predicates that in a TripleConstraint in `expression`
-    predicates = predicates_in_expression(S, cntxt)
+    cshape = cntxt.compiled_schema.shape(S)
+    predicates = cshape.predicates
 
     # Let **matchables** be the triples in outs whose predicate appears in predicates. If
     # `expression` is absent, matchables = Ø (the empty set).
-    matchables = RDFGraph(t for t in outs if str(t.p) in predicates)
+    matchables = RDFGraph(t for t in outs if t.p in predicates)
 
     # There is no triple in **matchables** which matches a TripleConstraint in expression
     if matchables and S.expression is not None:
-        tes = triple_constraints_in_expression(S.expression, cntxt)
+        tes = cshape.triple_constraints
         for m in matchables:
             if any(matchesTripleConstraint(cntxt, m, te) for te in tes):
                 return False
 
     # There is no triple in **matchables** whose predicate does not appear in extra.
-    extras = {iriref_to_uriref(e) for e in S.extra} if S.extra is not None else {}
-    if any(t.p not in extras for t in matchables):
+    if any(t.p not in cshape.extras for t in matchables):
         return False
 
     # closed is false or unmatchables is empty.
-    return not S.closed.val or not bool(outs - matchables)
+    return not cshape.closed or not bool(outs - matchables)
 
 
 def matches(cntxt: Context, T: RDFGraph, expr: ShExJ.tripleExpr, extras: Optional[Set[URIRef]] = None) -> bool:
@@ -178,13 +225,28 @@ def matches(cntxt: Context, T: RDFGraph, expr: ShExJ.tripleExpr, extras: Optiona
             * expr has no valueExpr
             * or `satisfies(value, valueExpr, G, m).
     """
-    if isinstance_(expr, ShExJ.tripleExprLabel):
+    if cntxt.compiled_schema.alternatives(expr) is not None:
+        return matchesBipartite(cntxt, T, expr, extras)
+    elif isinstance_(expr, ShExJ.tripleExprLabel):
         return matchesExpr(cntxt, T, expr)
     else:
         return matchesCardinality(cntxt, T, expr, extras) \
                and (expr.semActs is None or semActsSatisfied(expr.semActs, cntxt))
 
 
+@trace_matches()
+def matchesBipartite(cntxt: Context, T: RDFGraph, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel],
+                     c: DebugContext, extras: Optional[Set[URIRef]] = None) -> bool:
+    """ Assign each triple in T to a TripleConstraint in one of the alternatives of expr, such that every
+    non-extra triple is assigned and every constraint's cardinality is met.
+    """
+    alternatives = cntxt.compiled_schema.alternatives(expr)
+    if c.debug:
+        print(c.i(1, f"{len(T)} triples, {len(alternatives)} alternative(s)"))
+    focus = cntxt.evaluate_stack[-1][0] if cntxt.evaluate_stack else None
+    return BipartiteMatcher(T, alternatives, extras, focus).evaluate(cntxt)
+
+
 @trace_matches(True)
 def matchesTripleExprLabel(cntxt: Context, T: RDFGraph, expr: ShExJ.tripleExprLabel, c: DebugContext) -> bool:
     if c.debug:
@@ -205,9 +267,7 @@ def matchesCardinality(cntxt: Context, T: RDFGraph, expr: Union[ShExJ.tripleExpr
     T can be partitioned into k subsets T1, T2,…Tk such that min ≤ k ≤ max and for each Tn,
     matches(Tn, expr, m) by the remaining rules in this list.
     """
-    # TODO: Cardinality defaults into spec
-    min_ = expr.min if expr.min is not None else 1
-    max_ = expr.max if expr.max is not None else 1
+    min_, max_ = cntxt.compiled_schema.cardinality(expr)
 
     cardinality_text = f"{{{min_},{'*' if max_ == -1 else max_}}}"
     if c.debug and (min_ != 0 or len(T) != 0):
@@ -220,7 +280,8 @@ def matchesCardinality(cntxt: Context, T: RDFGraph, expr: Union[ShExJ.tripleExpr
                 _fail_triples(cntxt, T)
                 cntxt.fail_reason = f"   {len(T)} triples less than {cardinality_text}"
             else:
-                cntxt.fail_reason = f"   No matching triples found for predicate {cntxt.n3_mapper.n3(expr.predicate)}"
+                cntxt.fail_reason = lambda: f"   No matching triples found for predicate " \
+                    f"{cntxt.n3_mapper.n3(expr.predicate)}"
             return False
 
         # Don't include extras in the cardinality check
@@ -238,7 +299,7 @@ def matchesCardinality(cntxt: Context, T: RDFGraph, expr: Union[ShExJ.tripleExpr
         else:
             return any(matchesTripleConstraint(cntxt, t, expr) for t in T)
     else:
-        for partition in _partitions(T, min_, max_):
+        for partition in cntxt.partitions(_partitions(T, min_, max_)):
             if all(matchesExpr(cntxt, part, expr) for part in partition):
                 return True
         if min_ != 1 or max_ != 1:
@@ -249,12 +310,13 @@ def matchesCardinality(cntxt: Context, T: RDFGraph, expr: Union[ShExJ.tripleExpr
 
 def _fail_triples(cntxt: Context, T: RDFGraph) -> None:
     tlist = list(T)
+
+    def render() -> str:
+        return '\n'.join(["Triples:"] + [f"      {cntxt.n3_mapper.n3(t)}" for t in sorted(tlist)] +
+                         (["      ...   "] if len(tlist) > 5 else []))
+
     if len(tlist):
-        cntxt.fail_reason = "Triples:"
-        for t in sorted(tlist):
-            cntxt.fail_reason = f"      {cntxt.n3_mapper.n3(t)}"
-        if len(tlist) > 5:
-            cntxt.fail_reason = "      ...   "
+        cntxt.fail_reason = render
 
 
 def _partitions(T: RDFGraph, min_: Optional[int], max_: Optional[int]) -> List[List[RDFGraph]]:
@@ -289,7 +351,7 @@ def matchesOneOf(cntxt: Context, T: RDFGraph, expr: ShExJ.OneOf, _: DebugContext
     """
     expr is a OneOf and there is some shape expression se2 in shapeExprs such that a matches(T, se2, m).
     """
-    return any(matches(cntxt, T, e) for e in expr.expressions)
+    return cntxt.component_order.one_of(cntxt, expr.expressions, lambda e: matches(cntxt, T, e))
 
 
 @trace_matches()
@@ -318,12 +380,35 @@ def matchesTripleConstraint(cntxt: Context, t: RDFTriple, expr: ShExJ.TripleCons
         print(c.i(1, f" triple: {t}"))
         print(c.i(1, '', expr._as_json_dumps().split('\n')))
 
-    if uriref_matches_iriref(t.p, expr.predicate):
-        value = t.s if expr.inverse else t.o
-        return expr.valueExpr is None or satisfies(cntxt, value, expr.valueExpr)
-    else:
+    if t.p != cntxt.compiled_schema.predicate(expr):
         cntxt.fail_reason = f"Predicate mismatch: {t.p} ≠ {expr.predicate}"
         return False
+    if cntxt.evaluate_stack and (t.o if expr.inverse else t.s) != cntxt.evaluate_stack[-1][0]:
+        cntxt.fail_reason = f"Direction mismatch: {t} is not an arc {'in' if expr.inverse else 'out'}"
+        return False
+    if expr.valueExpr is None:
+        return True
+
+    # The same triple is checked against the same constraint for every partition that it turns up in.  A failure
+    # is re-evaluated when reasons are being recorded, as every partition reports its own reasons.
+    stats = None
+    if cntxt.stats is not None:
+        stats = cntxt.stats.triple_constraint(cntxt.evaluate_stack[-1][1] if cntxt.evaluate_stack else None,
+                                              str(t.p), bool(expr.inverse))
+        stats.evaluations += 1
+    if not c.debug:
+        rslt = cntxt.tc_result(t, expr)
+        if rslt or (rslt is not None and cntxt.verdict_only):
+            if stats is not None:
+                stats.cache_hits += 1
+            return rslt
+    value = t.s if expr.inverse else t.o
+    start = time.perf_counter() if stats is not None else None
+    rslt = satisfies(cntxt, value, expr.valueExpr)
+    if stats is not None:
+        stats.time += time.perf_counter() - start
+    cntxt.record_tc_result(t, expr, rslt)
+    return rslt
 
 
 @trace_matches()
@@ -7,18 +7,26 @@ We might fold the various routines inside context and replace "cntxt: Context" w
 """
 from collections import defaultdict
 from copy import copy
-from typing import Dict, Any, Callable, Optional, List, Tuple, Union, Set
+from typing import Dict, Any, Callable, Optional, List, Tuple, Union, Set, Iterable, Iterator
 
 from ShExJSG import ShExJ
 from ShExJSG.ShExJ import Schema
 from jsonasobj import JsonObj, as_dict
 from pyjsg.jsglib import isinstance_
 from rdflib import Graph, BNode, Namespace, URIRef, Literal
+from sparqlslurper import SlurpyGraph
 
-from pyshex.parse_tree.parse_node import ParseNode
-from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node
+from pyshex.parse_tree.parse_node import ParseNode, Reason
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node, RDFTriple
 from pyshex.shapemap_structure_and_language.p3_shapemap_structure import START
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.component_order import ComponentOrder
+from pyshex.utils.evaluation_stats import EvaluationStats
+from pyshex.utils.footprint import Footprint
 from pyshex.utils.n3_mapper import N3Mapper
+from pyshex.utils.neighbourhood import Neighbourhood
+from pyshex.utils.sparql_planner import SPARQLPlanner
+from pyshex.utils.result_cache import ResultCache
 
 
 class DebugContext:
@@ -76,44 +84,68 @@ class DebugContext:
             self.max_print_depth = self.trace_depth
 
 
+ResultKey = Tuple[Node, ShExJ.shapeExprLabel]
+
+
+class _Frame:
+    """ The evaluation of a (node, shape) pair """
+    def __init__(self, key: ResultKey, S: ShExJ.Shape, depth: int, scc_mark: int) -> None:
+        self.key = key
+        self.S = S
+        self.depth = depth
+        self.scc_mark = scc_mark        # Pairs in Context.scc above this mark finished while we were open
+        self.open = True
+        self.serial = 0                 # Identifies the current evaluation
+        self.direct = True              # False if the evaluation wasn't requested by the frame below us
+        self.pending = False            # Opened by evaluate_deep ahead of the evaluation itself
+
+        # Lowest frame that the evaluation read the value of.  Once we are done, frames that read our value depend
+        # on that frame instead
+        self.low = self
+
+
 class _VisitorCenter:
     """ A visitor context -- couldn't resist calling it Visitor Center, however... it is python, you know """
     def __init__(self, f: Callable[[Any, ShExJ.shapeExpr, "Context"], None], arg_cntxt: Any) \
             -> None:
         self.f = f
         self.arg_cntxt = arg_cntxt
-        self._seen_shapes = []
-        self._visiting_shapes = []
-        self._seen_tes = []
-        self._visiting_tes = []
+        self._seen_shapes: Set[str] = set()
+        self._visiting_shapes: Set[str] = set()
+        self._seen_tes: Set[str] = set()
+        self._visiting_tes: Set[str] = set()
 
     def start_visiting_shape(self, id_: str) -> None:
-        self._visiting_shapes.append(id_)
+        self._visiting_shapes.add(id_)
 
     def actively_visiting_shape(self, id_: str) -> bool:
         return id_ in self._visiting_shapes
 
     def done_visiting_shape(self, id_: str) -> None:
-        self._visiting_shapes.remove(id_)
-        self._seen_shapes.append(id_)
+        self._visiting_shapes.discard(id_)
+        self._seen_shapes.add(id_)
 
     def already_seen_shape(self, id_: str) -> bool:
         return id_ in self._seen_shapes
 
     def start_visiting_te(self, id_: str) -> None:
-        self._visiting_tes.append(id_)
+        self._visiting_tes.add(id_)
 
     def actively_visiting_te(self, id_: str) -> bool:
         return id_ in self._visiting_tes
 
     def done_visiting_te(self, id_: str) -> None:
-        self._visiting_tes.remove(id_)
-        self._seen_tes.append(id_)
+        self._visiting_tes.discard(id_)
+        self._seen_tes.add(id_)
 
     def already_seen_te(self, id_: str) -> bool:
         return id_ in self._seen_tes
 
 
+def _lower(f1: _Frame, f2: _Frame) -> _Frame:
+    return f1 if f1.depth <= f2.depth else f2
+
+
 def default_external_shape_resolver(_: ShExJ.IRIREF) -> Optional[ShExJ.Shape]:
     """ Default external shape resolution function """
     return None
@@ -129,7 +161,9 @@ class Context:
     def __init__(self, g: Optional[Graph], s: Schema,
                  external_shape_resolver: Optional[Callable[[ShExJ.IRIREF], Optional[ShExJ.Shape]]]=None,
                  base_namespace: Optional[Namespace]=None,
-                 shape_importer: Optional[Callable[[ShExJ.IRIREF], Optional[ShExJ.Schema]]]=None) -> None:
+                 shape_importer: Optional[Callable[[ShExJ.IRIREF], Optional[ShExJ.Schema]]]=None,
+                 compiled_schema: Optional[CompiledSchema]=None,
+                 result_cache: Optional[ResultCache]=None) -> None:
         """
         Create a context consisting of an RDF Graph and a ShEx Schema and generate a identifier to
         item map.
@@ -138,33 +172,83 @@ class Context:
         :param s: ShExJ Schema instance
         :param external_shape_resolver: External resolution function
         :param base_namespace:
+        :param shape_importer: Import resolution function
+        :param compiled_schema: Precompiled form of s.  If absent, s is compiled here.  Supplying the same
+        compiled schema to several contexts means that the schema analysis is only done once.
+        :param result_cache: Cache of assumption-free results that survives :py:meth:`reset`.  Must only be shared
+        between contexts with the same graph and schema.
         """
         self.is_valid: bool = True
         self.error_list: List[str] = []
         self.graph: Graph = g
         self.n3_mapper = N3Mapper(g)
-        self.schema: ShExJ.Schema = s
-        self.schema_id_map: Dict[ShExJ.shapeExprLabel, ShExJ.shapeExpr] = {}
-        self.te_id_map: Dict[ShExJ.tripleExprLabel, ShExJ.tripleExpr] = {}
+        self.compiled_schema = compiled_schema if compiled_schema is not None else CompiledSchema(s, base_namespace)
+        self.schema: ShExJ.Schema = self.compiled_schema.schema
+        self.schema_id_map: Dict[ShExJ.shapeExprLabel, ShExJ.shapeExpr] = self.compiled_schema.schema_id_map
+        self.te_id_map: Dict[ShExJ.tripleExprLabel, ShExJ.tripleExpr] = self.compiled_schema.te_id_map
         self.external_shape_for = external_shape_resolver if external_shape_resolver \
             else default_external_shape_resolver
-        self.base_namespace = base_namespace if isinstance(base_namespace, Namespace) \
-            else Namespace(base_namespace) if base_namespace else None
+        self.base_namespace = self.compiled_schema.base_namespace
         self.shape_importer = shape_importer if shape_importer else default_shape_importer
 
         # For SPARQL API's, true means pull ALL predicate objects for a given subject, false means only the
         # predicates that are needed
         self.over_slurp = True
 
-        # A list of node selectors/shape expressions that are being evaluated.  If we attempt to evaluate
-        # an entry for a second time, we, instead, put the entry into the assumptions table.  We start with 'true'
-        # and, if the result is 'true' then we count it as success.  If not, we switch to false and try again
-        self.evaluating: Set[Tuple[Node, ShExJ.shapeExprLabel]] = set()
-        self.assumptions: Dict[Tuple[Node, ShExJ.shapeExprLabel], bool] = {}
+        # For SPARQL API's, a planner that fetches exactly what each shape needs in one query (overrides over_slurp)
+        self.sparql_planner: Optional[SPARQLPlanner] = None
+
+        # The order in which the components of ShapeAnds, ShapeOrs, OneOfs and EachOfs are evaluated
+        self.component_order = ComponentOrder(self.compiled_schema)
+
+        # Recursion.  The (node, shape) pairs form a dependency graph and, as the ShEx semantics call for the maximal
+        # typing, each strongly connected component is resolved to its greatest fixpoint.  A pair that is referenced
+        # while it is still being evaluated is assumed to conform.  A pair whose result depends on a pair that is
+        # still open is provisional until the root of its component (the lowest pair that it depends on) is done.
+        # At that point the pairs that read a value that has since gone from true to false are re-evaluated, and
+        # so on, until nothing changes.  Every pair goes false at most once, so the component is resolved in time
+        # proportional to its size and number of references.  A value that goes from false to true can only come
+        # from a negation inside the cycle, which makes the schema inconsistent.
+        self.evaluating: Dict[ResultKey, _Frame] = {}               # Open pairs
+        self.frames: List[_Frame] = []                              # ... in evaluation order
+        self.assumptions: Dict[ResultKey, bool] = {}                # Current values of the unresolved pairs
+        self.provisional: Dict[ResultKey, _Frame] = {}              # Finished unresolved pairs
+        self.scc: List[ResultKey] = []                              # ... in finish order
+        self.readers: Dict[ResultKey, Dict[ResultKey, bool]] = {}   # Pairs that read an unresolved value and what
+        self.dirty: Set[ResultKey] = set()                          # Pairs that read a value that has changed
+        self.inconsistent = False
+        self._restarts: Dict[ResultKey, _Frame] = {}
+        self._reevaluating: Optional[ResultKey] = None
+        self._frame_serial = 0
+
+        # Shape evaluations nest (in python frames) at most this deep.  Pairs that are referenced from any deeper
+        # are evaluated from the bottom up with an explicit stack -- see evaluate_deep
+        self.nesting_limit = 25
+
+        # Changes every time an assumption is made, revised or retired.  Results that were computed while an
+        # assumption was in effect are only good for as long as the epoch doesn't change.
+        self.assumption_epoch = 0
+
+        # True means only the conformance verdict is needed -- no parse tree is built and no reasons are recorded
+        self.verdict_only = False
 
         # Known results -- a cache of existing evaluation results
         self.known_results: Dict[Tuple[Node, ShExJ.shapeExprLabel], bool] = {}
 
+        # Results that carry across resets -- only those that don't depend on any assumption get recorded here
+        self.result_cache = result_cache
+
+        # Value checks of (triple, TripleConstraint) pairs -- result and, if it may depend on an assumption, the
+        # assumption epoch and the evaluation it was made in
+        self.tc_results: Dict[Tuple[RDFTriple, int], Tuple[bool, Optional[int], Optional[int]]] = {}
+
+        # Profiling counters.  None means no profiling
+        self.stats: Optional[EvaluationStats] = None
+
+        # The arcs that the current evaluation has read.  None means they aren't recorded.  Cached results don't
+        # come with the arcs that they read, so the result cache is bypassed while recording
+        self.footprint: Optional[Footprint] = None
+
         # Debugging options
         self.debug_context = DebugContext()
 
@@ -177,86 +261,70 @@ class Context:
                     self.is_valid = False
                     self.error_list.append(f"Import failure on {uri}")
 
-        if self.schema.start is not None:
-            if not isinstance_(self.schema.start, ShExJ.shapeExprLabel) and\
-                    'id' in self.schema.start and self.schema.start.id is None:
-                self.schema.start.id = "_:start"
-            self._gen_schema_xref(self.schema.start)
-            # TODO: The logic below really belongs in the parser.  We shouldn't be messing with the schema here...
-            if not isinstance_(self.schema.start, ShExJ.shapeExprLabel):
-                if self.schema.shapes is None:
-                    self.schema.shapes = [self.schema.start]
-                else:
-                    self.schema.shapes.append(self.schema.start)
-                self.schema.start = self.schema.start.id
-        if self.schema.shapes is not None:
-            for e in self.schema.shapes:
-                self._gen_schema_xref(e)
-
         self.current_node: ParseNode = None
         self.evaluate_stack: List[Tuple[Union[BNode, URIRef], Optional[str]]] = []  # Node / shape evaluation stacks
         self.bnode_map: Dict[BNode, str] = {}       # Map for prettifying bnodes
+        self.neighbourhoods: Dict[Node, Neighbourhood] = {}
 
     def reset(self) -> None:
         """
         Reset the context preceeding an evaluation
         """
-        self.evaluating = set()
+        self.evaluating = {}
+        self.frames = []
         self.assumptions = {}
+        self.provisional = {}
+        self.scc = []
+        self.readers = {}
+        self.dirty = set()
+        self.inconsistent = False
+        self._restarts = {}
         self.known_results = {}
+        self.tc_results = {}
         self.current_node = None
         self.evaluate_stack = []
         self.bnode_map = {}
+        self.neighbourhoods = {}
 
-    def _gen_schema_xref(self, expr: Optional[Union[ShExJ.shapeExprLabel, ShExJ.shapeExpr]]) -> None:
-        """
-        Generate the schema_id_map
+    def neighbourhood(self, n: Node, S: Optional[ShExJ.Shape] = None) -> Neighbourhood:
+        """ Return the (lazily fetched) neighbourhood of n
 
-        :param expr: root shape expression
+        :param n: node
+        :param S: shape that n is about to be evaluated against.  Used to plan SPARQL fetches
         """
-        if expr is not None and not isinstance_(expr, ShExJ.shapeExprLabel) and 'id' in expr and expr.id is not None:
-            abs_id = self._resolve_relative_uri(expr.id)
-            if abs_id not in self.schema_id_map:
-                self.schema_id_map[abs_id] = expr
-        if isinstance(expr, (ShExJ.ShapeOr, ShExJ.ShapeAnd)):
-            for expr2 in expr.shapeExprs:
-                self._gen_schema_xref(expr2)
-        elif isinstance(expr, ShExJ.ShapeNot):
-            self._gen_schema_xref(expr.shapeExpr)
-        elif isinstance(expr, ShExJ.Shape):
-            if expr.expression is not None:
-                self._gen_te_xref(expr.expression)
+        is_sparql = isinstance(self.graph, SlurpyGraph)
+        if S is not None:
+            self.plan_fetch(n, S)
+        rval = self.neighbourhoods.get(n)
+        if rval is None:
+            rval = self.neighbourhoods[n] = \
+                Neighbourhood(self.graph, n, all_out=not is_sparql or (self.over_slurp and self.sparql_planner is None),
+                              all_in=not is_sparql)
+        return rval
 
-    def _resolve_relative_uri(self, ref: Union[URIRef, BNode, ShExJ.shapeExprLabel]) -> ShExJ.shapeExprLabel:
-        return ShExJ.IRIREF(str(self.base_namespace[str(ref)])) if ':' not in str(ref) and self.base_namespace else ref
+    def plan_fetch(self, n: Node, S: Optional[ShExJ.shapeExpr]) -> None:
+        """ Fetch everything that the evaluation of n against S needs from a SPARQL graph in one query.  Does nothing
+        unless there is a sparql_planner and S is a Shape """
+        if self.sparql_planner is not None and isinstance(self.graph, SlurpyGraph) and isinstance(S, ShExJ.Shape):
+            self.sparql_planner.fetch(self.graph, [n], S)
 
-    def _gen_te_xref(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel]) -> None:
-        """
-        Generate the triple expression map (te_id_map)
+    def has_fetched_arcs(self, n: Node) -> bool:
+        """ Determine whether any arc into or out of n is already in the graph, without asking a SPARQL endpoint """
+        if not isinstance(self.graph, SlurpyGraph):
+            return False
+        return next(Graph.triples(self.graph, (n, None, None)), None) is not None or \
+            next(Graph.triples(self.graph, (None, None, n)), None) is not None
 
-        :param expr: root triple expression
-
-        """
-        if expr is not None and not isinstance_(expr, ShExJ.tripleExprLabel) and 'id' in expr and expr.id is not None:
-            if expr.id in self.te_id_map:
-                return
-            else:
-                self.te_id_map[self._resolve_relative_uri(expr.id)] = expr
-        if isinstance(expr, (ShExJ.OneOf, ShExJ.EachOf)):
-            for expr2 in expr.expressions:
-                self._gen_te_xref(expr2)
-        elif isinstance(expr, ShExJ.TripleConstraint):
-            if expr.valueExpr is not None:
-                self._gen_schema_xref(expr.valueExpr)
+    def _resolve_relative_uri(self, ref: Union[URIRef, BNode, ShExJ.shapeExprLabel]) -> ShExJ.shapeExprLabel:
+        return self.compiled_schema._resolve_relative_uri(ref)
 
     def tripleExprFor(self, id_: ShExJ.tripleExprLabel) -> ShExJ.tripleExpr:
         """ Return the triple expression that corresponds to id """
-        return self.te_id_map.get(id_)
+        return self.compiled_schema.tripleExprFor(id_)
 
     def shapeExprFor(self, id_: Union[ShExJ.shapeExprLabel, START]) -> Optional[ShExJ.shapeExpr]:
         """ Return the shape expression that corresponds to id """
-        rval = self.schema.start if id_ is START else self.schema_id_map.get(str(id_))
-        return rval
+        return self.compiled_schema.shapeExprFor(id_)
 
     def visit_shapes(self, expr: ShExJ.shapeExpr, f: Callable[[Any, ShExJ.shapeExpr, "Context"], None], arg_cntxt: Any,
                      visit_center: _VisitorCenter = None, follow_inner_shapes: bool=True) -> None:
@@ -368,13 +436,51 @@ class Context:
 
         # We only evaluate a node once
         if key in self.known_results:
+            if self.stats is not None:
+                self.stats.shape(s.id).cache_hits += 1
             return self.known_results[key]
 
+        # The focus itself is always evaluated so that there is a parse tree to report on
+        if self.result_cache is not None and self.footprint is None and self.evaluate_stack and \
+                key not in self.evaluating:
+            rslt = self.result_cache.get(key)
+            if rslt is not None:
+                self.known_results[key] = rslt
+                if self.stats is not None:
+                    self.stats.shape(s.id).cache_hits += 1
+                return rslt
+
+        # A finished pair whose component is still being resolved
+        if key in self.provisional:
+            self._read(key, self.provisional[key])
+            return self.assumptions[key]
+
         if key not in self.evaluating:
-            self.evaluating.add(key)
+            frame = self._restarts.pop(key, None)
+            if frame is None:
+                frame = _Frame(key, s, len(self.frames), len(self.scc))
+            frame.open = True
+            frame.low = frame
+            frame.direct = self._reevaluating != key
+            self._frame_serial += 1
+            frame.serial = self._frame_serial
+            self.evaluating[key] = frame
+            self.frames.append(frame)
+            return None
+
+        # The evaluation of a pair that evaluate_deep opened once the pairs that it references are done
+        frame = self.evaluating[key]
+        if frame.pending and frame is self.frames[-1]:
+            frame.pending = False
             return None
-        elif key not in self.assumptions:
+
+        # A reference to an open pair
+        if key not in self.assumptions:
             self.assumptions[key] = True
+            self.assumption_epoch += 1
+        if self.stats is not None:
+            self.stats.shape(s.id).assumptions += 1
+        self._read(key, self.evaluating[key])
         return self.assumptions[key]
 
     def done_evaluating(self, n: Node, s: ShExJ.shapeExpr, result: bool) -> Tuple[bool, bool]:
@@ -385,47 +491,224 @@ class Context:
         :param n: Node that was evaluated
         :param s: expression for node evaluation
         :param result: result of evaluation
-        :return: Tuple - first element is whether we are done, second is whether evaluation was consistent
+        :return: Tuple - first element is whether we are done, second is whether evaluation was consistent.  If we
+        aren't done, (n,s) has to be evaluated again.
         """
         key = (n, s.id)
+        frame = self.frames[-1]
+        low = self._anchor(frame)
+        self._set_value(key, result, low is not frame)
+
+        # The result depends on a pair that is still open -- it is provisional
+        if low is not frame:
+            self._pop_frame()
+            parent = self.frames[-1]
+            parent.low = _lower(self._anchor(parent), low)
+            if frame.direct:
+                self.readers.setdefault(key, {})[parent.key] = result
+            self.provisional[key] = frame
+            self.scc.append(key)
+            return True, True
 
-        # If we didn't have to assume anything or our assumption was correct, we're done
-        if key not in self.assumptions or self.assumptions[key] == result:
-            if key in self.assumptions:
-                del self.assumptions[key]       # good housekeeping, not strictly necessary
-            self.evaluating.remove(key)
-            self.known_results[key] = result
+        # No recursion involved
+        members = list(dict.fromkeys(self.scc[frame.scc_mark:]))
+        if not members and key not in self.assumptions:
+            self._pop_frame()
+            self._resolve([key], {key: result})
             return True, True
-        # If we assumed true and got a false, try assuming false
-        elif self.assumptions[key]:
-            self.evaluating.remove(key)         # restart the evaluation from the top
-            self.assumptions[key] = False
-            return False, True
-        else:
+
+        # We are the root of a component.  Re-evaluate the pairs that read a value that has changed until nothing
+        # does
+        while not self.inconsistent:
+            stale = [member for member in members if member in self.dirty and member in self.provisional]
+            if not stale:
+                break
+            for member in stale:
+                if member in self.dirty and member in self.provisional and not self.inconsistent:
+                    self._reevaluate(member)
+            members = list(dict.fromkeys(self.scc[frame.scc_mark:]))
+
+        self._pop_frame()
+        if self.inconsistent:
+            self.inconsistent = False
             self.fail_reason = f"{s.id}: Inconsistent recursive shape reference"
+            self.assumptions[key] = False
+            self._resolve(members + [key], {}, cache=False)
+            del self.scc[frame.scc_mark:]
             return True, False
 
+        # Our own value changed since it was read -- evaluate again
+        if key in self.dirty:
+            self.dirty.discard(key)
+            self._restarts[key] = frame
+            if self.stats is not None:
+                self.stats.shape(s.id).restarts += 1
+            return False, True
+        self._resolve(members + [key], {})
+        del self.scc[frame.scc_mark:]
+        return True, True
+
+    def _anchor(self, frame: _Frame) -> _Frame:
+        """ Return the lowest open frame that frame depends on """
+        rval = frame.low
+        while not rval.open and rval.low is not rval:
+            rval = rval.low
+        frame.low = rval
+        return rval
+
+    def _read(self, key: ResultKey, frame: _Frame) -> None:
+        """ Record that the evaluation on top of the stack read the value of key, which is being evaluated in, or
+        was provisionally evaluated by, frame """
+        if self.frames:
+            reader = self.frames[-1]
+            reader.low = _lower(self._anchor(reader), self._anchor(frame))
+            self.readers.setdefault(key, {})[reader.key] = self.assumptions[key]
+
+    def _set_value(self, key: ResultKey, value: bool, provisional: bool) -> None:
+        """ Record the (new) value of key, marking the pairs that read a different value as dirty """
+        for reader, seen in self.readers.get(key, {}).items():
+            if seen != value:
+                self.dirty.add(reader)
+        old = self.assumptions.get(key)
+        if old is not None and old != value:
+            if value:
+                self.inconsistent = True
+            self.assumption_epoch += 1
+        if old is not None or provisional:
+            self.assumptions[key] = value
+
+    def _pop_frame(self) -> None:
+        frame = self.frames.pop()
+        frame.open = False
+        del self.evaluating[frame.key]
+
+    def _reevaluate(self, key: ResultKey) -> None:
+        """ Evaluate the provisional pair key again.  Reasons go to a scratch parse node """
+        from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import satisfiesShape
+
+        S = self.provisional.pop(key).S
+        self.dirty.discard(key)
+        if self.stats is not None:
+            self.stats.shape(S.id).restarts += 1
+        parent_node = self.current_node
+        if not self.verdict_only:
+            self.current_node = ParseNode(satisfiesShape, S, key[0], self)
+        self._reevaluating = key
+        try:
+            satisfiesShape(self, key[0], S)
+        finally:
+            self._reevaluating = None
+            self.current_node = parent_node
+
+    def evaluate_deep(self, n: Node, S: ShExJ.Shape) -> None:
+        """ Evaluate (n, S) and the pairs that it references, without recursion.  Each pair is opened before the
+        pairs that it references, so references back to it are recursive references, and evaluated after them,
+        so its own evaluation finds their values rather than evaluating them in turn.  The depth of the data is
+        bounded by memory instead of the python stack.  The reasons of the referenced pairs are recorded alongside
+        those of the pairs that reference them rather than inside them.
+        """
+        from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import satisfiesShape
+
+        stack: List[Tuple[Node, ShExJ.Shape, Optional[Iterator[Tuple[Node, ShExJ.Shape]]]]] = [(n, S, None)]
+        while stack:
+            n, S, references = stack[-1]
+            if references is None:
+                if not self._open_ahead(n, S):
+                    stack.pop()
+                    continue
+                references = self._references(n, S)
+                stack[-1] = (n, S, references)
+            reference = next(references, None)
+            if reference is not None:
+                stack.append((reference[0], reference[1], None))
+            else:
+                stack.pop()
+                satisfiesShape(self, n, S)
+
+    def _open_ahead(self, n: Node, S: ShExJ.Shape) -> bool:
+        """ Open the evaluation of (n, S) if it hasn't been opened or done already """
+        if S.id and ((n, S.id) in self.evaluating or (n, S.id) in self.known_results or
+                     (n, S.id) in self.provisional):
+            return False
+        if self.start_evaluating(n, S) is not None:
+            return False
+        self.frames[-1].pending = True
+        return True
+
+    def _references(self, n: Node, S: ShExJ.Shape) -> Iterator[Tuple[Node, ShExJ.Shape]]:
+        """ Generate the (node, shape) pairs that the evaluation of (n, S) may reference """
+        from pyshex.utils.slurp_utils import slurper
+
+        with slurper(self, n, S):
+            neighbourhood = self.neighbourhood(n, S)
+        for tc in self.compiled_schema.shape(S).triple_constraints:
+            shapes = self.compiled_schema.referenced_shapes(tc.valueExpr) if tc.valueExpr is not None else []
+            if shapes:
+                p = self.compiled_schema.predicate(tc)
+                for t in neighbourhood.table.graph(neighbourhood.in_mask(p) if tc.inverse
+                                                   else neighbourhood.out_mask(p)):
+                    for S2 in shapes:
+                        yield (t.s if tc.inverse else t.o), S2
+
+    def _resolve(self, keys: List[ResultKey], values: Dict[ResultKey, bool], cache: bool = True) -> None:
+        """ Record the final values of keys """
+        for key in keys:
+            if key in values:
+                value = values[key]
+            elif key in self.assumptions:
+                value = self.assumptions.pop(key)
+                self.assumption_epoch += 1
+            else:
+                continue                    # Resolved on its own when it was re-evaluated
+            self.known_results[key] = value
+            if cache and self.result_cache is not None:
+                self.result_cache.put(key, value)
+            self.provisional.pop(key, None)
+            self.readers.pop(key, None)
+            self.dirty.discard(key)
+
+    def tc_result(self, t: RDFTriple, tc: ShExJ.TripleConstraint) -> Optional[bool]:
+        """ Return the recorded result of checking the value of t against tc or None if it has to be (re)evaluated.
+        A result that may have depended on an assumption is only good within the same evaluation, for as long as
+        the assumptions don't change.
+        """
+        entry = self.tc_results.get((t, id(tc)))
+        if entry is not None and (entry[1] is None or (entry[1] == self.assumption_epoch and self.frames and
+                                                       entry[2] == self.frames[-1].serial)):
+            return entry[0]
+        return None
+
+    def record_tc_result(self, t: RDFTriple, tc: ShExJ.TripleConstraint, result: bool) -> None:
+        """ Record the result of checking the value of t against tc """
+        self.tc_results[(t, id(tc))] = (result, None, None) if not self.assumptions else \
+            (result, self.assumption_epoch, self.frames[-1].serial if self.frames else None)
+
+    def partitions(self, partitions: Iterable) -> Iterable:
+        """ Return partitions, counted against the shape being evaluated if profiling """
+        return partitions if self.stats is None else self.stats.partitions(partitions)
+
     def process_reasons(self) -> List[str]:
-        return self.current_node.fail_reasons(self.graph)
+        return self.current_node.fail_reasons(self.graph) if not self.verdict_only else []
 
 
     @property
-    def fail_reason(self) -> str:
-        return self.current_node._fail_reason
+    def fail_reason(self) -> Optional[str]:
+        return self.current_node._fail_reason if self.current_node is not None else None
 
     @fail_reason.setter
-    def fail_reason(self, reason_text: str) -> None:
-        if self.current_node._fail_reason is None:
-            self.current_node._fail_reason = reason_text
-        else:
-            self.current_node._fail_reason += '\n' + reason_text
-        self.current_node.reason_stack = copy(self.evaluate_stack)
+    def fail_reason(self, reason_text: Reason) -> None:
+        """ Record a fail reason in the current parse node.  Reasons that are expensive to format should be passed
+        as a function, which is only invoked if the reasons are reported.  Reasons are dropped in verdict only mode.
+        """
+        if not self.verdict_only:
+            self.current_node.add_reason(reason_text)
+            self.current_node.reason_stack = copy(self.evaluate_stack)
 
     def dump_bnode(self, n: Union[URIRef, BNode, Literal]) -> None:
-        if isinstance(n, BNode):
-            self.fail_reason = f"    {self.n3_mapper.n3(n)} context:"
-            for entry in self.current_node.dump_bnodes(self.graph, n, '      '):
-                self.fail_reason = entry
+        if isinstance(n, BNode) and not self.verdict_only:
+            node = self.current_node
+            self.fail_reason = lambda: '\n'.join([f"    {self.n3_mapper.n3(n)} context:"] +
+                                                  node.dump_bnodes(self.graph, n, '      '))
 
     def type_last(self, obj: JsonObj) -> JsonObj:
         """ Move the type identifiers to the end of the object for print purposes """
@@ -1,12 +1,16 @@
+import multiprocessing
 import sys
 from argparse import ArgumentParser
-from typing import Optional, Union, List, NamedTuple, Type, Iterator, Callable
+from itertools import chain, islice
+from typing import Optional, Union, List, NamedTuple, Type, Iterator, Callable, Tuple, Sized, Iterable, Set
 
 from CFGraph import CFGraph
 from ShExJSG import ShExJ, ShExC
+from jsonasobj import as_json
+from pyjsg.jsglib import isinstance_
 from rdflib import Graph, URIRef, RDF
 from rdflib.util import guess_format
-from sparqlslurper import QueryResultPrinter
+from sparqlslurper import QueryResultPrinter, SlurpyGraph
 
 from pyshex import PrefixLibrary
 from pyshex.shape_expressions_language.p5_2_validation_definition import isValid
@@ -14,7 +18,16 @@ from pyshex.shape_expressions_language.p5_context import Context
 from pyshex.shapemap_structure_and_language.p3_shapemap_structure import FixedShapeMap, ShapeAssociation, START, \
     START_TYPE
 from pyshex.user_agent import UserAgent, SlurpyGraphWithAgent
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.component_order import ComponentOrder
+from pyshex.utils.evaluation_stats import EvaluationStats
+from pyshex.utils.footprint import Footprint
+from pyshex.utils.result_cache import ResultCache
 from pyshex.utils.schema_loader import SchemaLoader
+from pyshex.utils.slurp_cache import SlurpCache
+from pyshex.utils.sparql_planner import SPARQLPlanner
+from pyshex.utils.sparql_prefetch import NeighbourhoodPrefetcher
+from pyshex.utils.sparql_pushdown import SPARQLPushdown
 from pyshex.utils.sparql_query import SPARQLQuery
 
 
@@ -31,6 +44,9 @@ URILIST = Iterator[URI]             # List of URI's as an argument
 URIPARM = Union[URI, URILIST]       # Choice of URI or list
 STARTPARM = [Union[Type[START], START_TYPE, URILIST]]
 
+# Number of graph subjects that are sorted together when evaluating all subjects of a graph
+FOCI_CHUNK_SIZE = 10000
+
 
 def normalize_uri(u: URI) -> URIRef:
     """ Return a URIRef for a str or URIRef """
@@ -42,10 +58,12 @@ def normalize_urilist(ul: URILIST) -> List[URIRef]:
     return [normalize_uri(u) for u in ul]
 
 
-def normalize_uriparm(p: URIPARM) -> List[URIRef]:
-    """ Return an optional list of URIRefs for p"""
+def normalize_uriparm(p: URIPARM) -> Iterable[URIRef]:
+    """ Return an optional list of URIRefs for p.  Any other iterable (a generator, a SPARQL result cursor, ...) is
+    normalized lazily.  The first column is used for result rows """
     return normalize_urilist(p) if isinstance(p, List) else \
-        normalize_urilist([p]) if isinstance(p, (str, URIRef)) else p
+        normalize_urilist([p]) if isinstance(p, (str, URIRef)) else \
+        (normalize_uri(u[0] if isinstance(u, tuple) else u) for u in p) if p is not None else None
 
 
 def normalize_startparm(p: STARTPARM) -> List[Union[type(START), START_TYPE, URIRef]]:
@@ -67,7 +85,16 @@ class ShExEvaluator:
                  debug: bool = False,
                  debug_slurps: bool = False,
                  over_slurp: bool = None,
-                 output_sink: Optional[Callable[[EvaluationResult], bool]] = None) -> None:
+                 output_sink: Optional[Callable[[EvaluationResult], bool]] = None,
+                 result_cache_size: Optional[int] = None,
+                 workers: int = 1,
+                 verdict_only: bool = False,
+                 prefetch: int = 0,
+                 prefetch_concurrency: int = 4,
+                 plan_slurps: bool = False,
+                 pushdown: int = 0,
+                 profile: bool = False,
+                 adaptive_order: bool = False) -> None:
         """ Evaluator constructor.  All of the parameters below can be set in the constructor or at runtime
 
         :param rdf: RDF string, file name, URL or Graph for evaluation.
@@ -79,7 +106,27 @@ class ShExEvaluator:
         :param debug: debug graph fetch calls
         :param over_slurp: Controls whether SPARQL slurper does exact or over slurps
         :param output_sink: Function for accepting evaluation results and returns whether to keep evaluating
+        :param result_cache_size: If present, keep up to this many (node, shape) results across focus nodes and
+        evaluate calls.  The cache is discarded when rdf or schema is assigned, but changes made to the graph in
+        place aren't seen -- call self.result_cache.clear() after editing it.
+        :param workers: Number of processes to spread the focus nodes over.  Results are still delivered to
+        output_sink in focus order and evaluation stops as soon as output_sink returns False.
+        :param verdict_only: Only determine conformance.  No parse tree is built, no fail reasons are formatted
+        and the reason of a failing result is empty.
+        :param prefetch: SPARQL slurper graphs only.  If positive, the neighbourhoods of the focus nodes and of the
+        nodes that they reference are fetched ahead of evaluation, this many nodes per query.
+        :param prefetch_concurrency: Maximum number of prefetch queries in flight at once
+        :param plan_slurps: SPARQL slurper graphs only.  Fetch exactly the predicates that each shape needs, along with
+        those of the shapes that it references, in one query per node (or per prefetch batch).  Overrides over_slurp
+        :param pushdown: SPARQL slurper graphs only.  If positive, start shapes that only constrain node values are
+        checked at the endpoint, this many focus nodes per query.  Only the nodes that the endpoint can't vouch for
+        are fetched and evaluated.  Single worker only.
+        :param profile: Record per shape and per TripleConstraint timings and counters of each evaluate call in
+        self.stats.  Single worker only.
+        :param adaptive_order: Order the components of ShapeAnds, ShapeOrs, OneOfs and EachOfs on how often they
+        passed for the earlier focus nodes as well as on their estimated cost.  Results aren't affected.
         """
+        self.result_cache = ResultCache(result_cache_size) if result_cache_size else None
         self.pfx: PrefixLibrary = None
         self.rdf_format = rdf_format
         self.g = None
@@ -93,6 +140,16 @@ class ShExEvaluator:
         self.debug_slurps = debug_slurps
         self.over_slurp = over_slurp
         self.output_sink = output_sink
+        self.workers = workers
+        self.verdict_only = verdict_only
+        self.prefetch = prefetch
+        self.prefetch_concurrency = prefetch_concurrency
+        self.plan_slurps = plan_slurps
+        self.pushdown = pushdown
+        self.profile = profile
+        self.stats: Optional[EvaluationStats] = None
+        self.adaptive_order = adaptive_order
+        self._component_order: Optional[ComponentOrder] = None
         self.nerrors = 0
         self.nnodes = 0
         self.eval_result = []
@@ -112,6 +169,7 @@ class ShExEvaluator:
 
         :param rdf: File name, URL, representation of rdflib Graph
         """
+        self._clear_result_cache()
         if isinstance(rdf, Graph):
             self.g = rdf
         else:
@@ -139,6 +197,8 @@ class ShExEvaluator:
         :param shex:  Schema
         """
         self.pfx = None
+        self._compiled_schema = None
+        self._clear_result_cache()
         if shex is not None:
             if isinstance(shex, ShExJ.Schema):
                 self._schema = shex
@@ -153,6 +213,20 @@ class ShExEvaluator:
                     raise ValueError("Unable to parse shex file")
                 self.pfx = PrefixLibrary(loader.schema_text)
 
+    @property
+    def compiled_schema(self) -> Optional[CompiledSchema]:
+        """
+
+        :return: The compiled form of the schema.  This is built once and shared by every evaluation
+        """
+        if self._compiled_schema is None and self._schema is not None:
+            self._compiled_schema = CompiledSchema(self._schema)
+        return self._compiled_schema
+
+    def _clear_result_cache(self) -> None:
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
     @property
     def focus(self) -> Optional[List[URIRef]]:
         """
@@ -161,19 +235,35 @@ class ShExEvaluator:
         return self._focus
 
     @property
-    def foci(self) -> List[URIRef]:
+    def foci(self) -> Iterator[URIRef]:
         """
 
-        :return: The current set of focus nodes
+        :return: The current set of focus nodes.  If focus isn't set, the non-BNode subjects in the graph, sorted in
+        chunks of FOCI_CHUNK_SIZE.  Note that a focus that was supplied as an iterator can only be consumed once.
         """
-        return self._focus if self._focus else sorted([s for s in set(self.g.subjects()) if isinstance(s, URIRef)])
+        return iter(self._focus) if self._focus else self._graph_subjects()
+
+    def _graph_subjects(self) -> Iterator[URIRef]:
+        """ Generate the non-BNode subjects in the graph without materializing the complete list up front.  The seen
+        set only holds references to subjects that are already in the graph. """
+        seen: Set[URIRef] = set()
+        chunk: List[URIRef] = []
+        for s in self.g.subjects():
+            if isinstance(s, URIRef) and s not in seen:
+                seen.add(s)
+                chunk.append(s)
+                if len(chunk) >= FOCI_CHUNK_SIZE:
+                    yield from sorted(chunk)
+                    chunk = []
+        yield from sorted(chunk)
 
     @focus.setter
     def focus(self, focus: Optional[URIPARM]) -> None:
         """ Set the focus node(s).  If no focus node is specified, the evaluation will occur for all non-BNode
-        graph subjects.  Otherwise it can be a string, a URIRef or a list of string/URIRef combinations
+        graph subjects.  Otherwise it can be a string, a URIRef, a list of string/URIRef combinations or any iterator
+        over them, such as a generator or a SPARQL query result
 
-        :param focus: None if focus should be all URIRefs in the graph otherwise a URI or list of URI's
+        :param focus: None if focus should be all URIRefs in the graph otherwise a URI or list or iterator of URI's
         """
         self._focus = normalize_uriparm(focus) if focus else None
 
@@ -198,7 +288,9 @@ class ShExEvaluator:
                  debug: Optional[bool] = None,
                  debug_slurps: Optional[bool] = None,
                  over_slurp: Optional[bool] = None,
-                 output_sink: Optional[Callable[[EvaluationResult], bool]] = None) -> List[EvaluationResult]:
+                 output_sink: Optional[Callable[[EvaluationResult], bool]] = None,
+                 workers: Optional[int] = None,
+                 verdict_only: Optional[bool] = None) -> List[EvaluationResult]:
         if rdf is not None or shex is not None or focus is not None or start is not None:
             evaluator = ShExEvaluator(rdf=rdf if rdf is not None else self.g,
                                       schema=shex if shex is not None else self._schema,
@@ -206,6 +298,10 @@ class ShExEvaluator:
                                       start=start if start is not None else self.start if self.start else START,
                                       rdf_format=rdf_format if rdf_format is not None else self.rdf_format,
                                       output_sink=output_sink if output_sink is not None else self.output_sink)
+            if shex is None:
+                evaluator._compiled_schema = self.compiled_schema
+                if rdf is None:
+                    evaluator.result_cache = self.result_cache
         else:
             evaluator = self
 
@@ -216,7 +312,6 @@ class ShExEvaluator:
                 return True
             evaluator.output_sink = sink
 
-        processing = True
         self.nerrors = 0
         self.nnodes = 0
         if START in evaluator.start and evaluator._schema.start is None:
@@ -228,40 +323,249 @@ class ShExEvaluator:
         if self.pfx and evaluator.g is not None:
             self.pfx.add_bindings_to(evaluator.g)
 
-        cntxt = Context(evaluator.g, evaluator._schema)
-        cntxt.debug_context.debug = debug if debug is not None else self.debug
-        cntxt.debug_context.trace_slurps = debug_slurps if debug_slurps is not None else self.debug_slurps
-        cntxt.over_slurp = self.over_slurp if over_slurp is not None else self.over_slurp
-
-        for focus in evaluator.foci:
-            self.nnodes += 1
-            start_list: List[Union[URIRef, START]] = []
-            for start in evaluator.start:
-                if start is START:
-                    start_list.append(evaluator._schema.start)
-                elif isinstance(start, START_TYPE):
-                    start_list += list(evaluator.g.objects(focus, start.start_predicate))
-                else:
-                    start_list.append(start)
-            if start_list:
-                for start_node in start_list:
-                    map_ = FixedShapeMap()
-                    map_.add(ShapeAssociation(focus, start_node))
-                    cntxt.reset()
-                    success, fail_reasons = isValid(cntxt, map_)
-                    if not success:
-                        self.nerrors += 1
-                    if not evaluator.output_sink(EvaluationResult(success, focus, start_node,
-                                                                  '\n'.join(fail_reasons) if not success else '')):
-                        processing = False
-                        break
+        options = _ContextOptions(debug if debug is not None else self.debug,
+                                  debug_slurps if debug_slurps is not None else self.debug_slurps,
+                                  over_slurp if over_slurp is not None else self.over_slurp,
+                                  verdict_only if verdict_only is not None else self.verdict_only,
+                                  self.plan_slurps, self.adaptive_order)
+        workers = workers if workers is not None else self.workers
+        self.stats = EvaluationStats() if self.profile and workers == 1 else None
+        if workers > 1:
+            focus_results = _parallel_focus_results(evaluator, workers, options)
+        else:
+            cntxt = evaluator._new_context(options)
+            cntxt.stats = self.stats
+            foci = evaluator.foci
+            if self.pushdown > 0 and isinstance(evaluator.g, SlurpyGraph):
+                focus_results = evaluator._pushdown_focus_results(cntxt, foci, self.pushdown)
             else:
-                self.nerrors += 1
-                evaluator.output_sink(EvaluationResult(False, focus, None, "No start node located"))
-            if not processing:
-                break
+                if self.prefetch > 0 and isinstance(evaluator.g, SlurpyGraph):
+                    foci = evaluator._prefetched(foci, self.prefetch, self.prefetch_concurrency)
+                focus_results = (evaluator._focus_results(cntxt, focus) for focus in foci)
+
+        try:
+            for results in focus_results:
+                self.nnodes += 1
+                for result in results:
+                    if not result.result:
+                        self.nerrors += 1
+                    if not evaluator.output_sink(result):
+                        return self.eval_result
+        finally:
+            focus_results.close()
         return self.eval_result
 
+    def footprinted_results(self, foci: Iterable[URIRef]) \
+            -> Iterator[Tuple[URIRef, List[Tuple[EvaluationResult, Footprint]]]]:
+        """ Evaluate each of foci against the start shapes, recording the arcs that each result depends on.  The
+        output sink isn't called and the result cache isn't consulted.
+
+        :param foci: focus nodes
+        :return: each focus node along with its results and their footprints
+        """
+        cntxt = self._new_context(_ContextOptions(self.debug, self.debug_slurps, self.over_slurp, self.verdict_only,
+                                                  self.plan_slurps, self.adaptive_order))
+        type_predicates = [start.start_predicate for start in self.start if isinstance(start, START_TYPE)]
+        try:
+            for focus in foci:
+                rval = []
+                cntxt.footprint = Footprint((focus, True, p) for p in type_predicates)
+                for result in self._focus_results(cntxt, focus):
+                    rval.append((result, cntxt.footprint))
+                    cntxt.footprint = Footprint((focus, True, p) for p in type_predicates)
+                yield focus, rval
+        finally:
+            cntxt.footprint = None
+
+    def _new_context(self, options: "_ContextOptions") -> Context:
+        """ Create an evaluation context for the current graph and schema """
+        cntxt = Context(self.g, self._schema, compiled_schema=self.compiled_schema, result_cache=self.result_cache)
+        cntxt.debug_context.debug = options.debug
+        cntxt.debug_context.trace_slurps = options.debug_slurps
+        cntxt.over_slurp = options.over_slurp
+        cntxt.verdict_only = options.verdict_only
+        if options.plan_slurps:
+            cntxt.sparql_planner = SPARQLPlanner(self.compiled_schema)
+        if options.adaptive_order:
+            # The outcomes carry across focus nodes and evaluate calls, for as long as the schema stays the same
+            if self._component_order is None or self._component_order.cs is not self.compiled_schema:
+                self._component_order = ComponentOrder(self.compiled_schema, adaptive=True)
+            cntxt.component_order = self._component_order
+        return cntxt
+
+    def _prefetched(self, foci: Iterator[URIRef], batch_size: int, concurrency: int) -> Iterator[URIRef]:
+        """ Pass foci through, prefetching the neighbourhoods of each group of foci (and the nodes they reference)
+        before the group is evaluated
+
+        :param foci: focus nodes
+        :param batch_size: nodes per query
+        :param concurrency: queries in flight
+        """
+        prefetcher = NeighbourhoodPrefetcher(self.g, batch_size, concurrency)
+        follow = self.compiled_schema.reference_predicates()
+        planner = SPARQLPlanner(self.compiled_schema) if self.plan_slurps else None
+        start_shapes = self._start_shapes() if planner else None
+        group: List[URIRef] = []
+        for focus in chain(foci, [None]):
+            if focus is not None:
+                group.append(focus)
+            if group and (focus is None or len(group) >= batch_size * concurrency):
+                if start_shapes is not None:
+                    for i in range(0, len(group), batch_size):
+                        for S in start_shapes:
+                            planner.fetch(self.g, group[i:i + batch_size], S)
+                else:
+                    prefetcher.prefetch(group, follow, 1)
+                yield from group
+                group = []
+
+    def _start_shapes(self) -> Optional[List[ShExJ.Shape]]:
+        """ Return the start shapes if they are the same for every focus node and all of them are Shapes """
+        rval = []
+        for start in self.start:
+            if isinstance(start, START_TYPE):
+                return None
+            expr = self.compiled_schema.shapeExprFor(start)
+            if isinstance_(expr, ShExJ.shapeExprLabel):
+                expr = self.compiled_schema.shapeExprFor(expr)
+            if not isinstance(expr, ShExJ.Shape):
+                return None
+            rval.append(expr)
+        return rval
+
+    def _pushdown_focus_results(self, cntxt: Context, foci: Iterator[URIRef], batch_size: int) \
+            -> Iterator[Iterator[EvaluationResult]]:
+        """ Evaluate foci in batches, letting the endpoint vouch for the nodes that conform to the start shapes that
+        can be pushed down
+
+        :param cntxt: evaluation context
+        :param foci: focus nodes
+        :param batch_size: nodes per query
+        :return: results for each focus node in focus order
+        """
+        pushdown = SPARQLPushdown(self.compiled_schema)
+        starts = [self._schema.start if start is START else start for start in self.start
+                  if not isinstance(start, START_TYPE)]
+        endpoint_empty: Optional[bool] = None
+        foci = iter(foci)
+        batch = list(islice(foci, batch_size))
+        while batch:
+            certified: List[Tuple[Union[URIRef, ShExJ.shapeExpr], Set[URIRef]]] = []
+            absent: Set[URIRef] = set()
+            for start in starts:
+                violations = pushdown.violations(self.g, batch, start) if start is not None else None
+                if violations is not None:
+                    certified.append((start, set(batch) - violations.nodes))
+                    absent |= violations.absent
+            # The engine passes nodes that aren't in a completely empty graph, so they aren't failed up front there
+            if absent and len(absent) == len(set(batch)):
+                if endpoint_empty is None:
+                    endpoint_empty = pushdown.is_empty(self.g)
+                if endpoint_empty:
+                    absent = set()
+            for focus in batch:
+                yield self._focus_results(cntxt, focus, lambda start_node, focus=focus: any(
+                    start_node is start and focus in nodes for start, nodes in certified), focus in absent)
+            batch = list(islice(foci, batch_size))
+
+    def _focus_results(self, cntxt: Context, focus: URIRef,
+                       conforms: Optional[Callable[[Union[URIRef, ShExJ.shapeExpr]], bool]] = None,
+                       absent: bool = False) -> Iterator[EvaluationResult]:
+        """ Evaluate focus against each of the start shapes
+
+        :param cntxt: evaluation context
+        :param focus: focus node
+        :param conforms: function that determines whether focus is already known to conform to a start shape
+        :param absent: focus is already known not to be in the graph
+        :return: one result per start shape
+        """
+        start_list: List[Union[URIRef, START]] = []
+        for start in self.start:
+            if start is START:
+                start_list.append(self._schema.start)
+            elif isinstance(start, START_TYPE):
+                start_list += list(self.g.objects(focus, start.start_predicate))
+            else:
+                start_list.append(start)
+        if start_list:
+            for start_node in start_list:
+                if conforms is not None and conforms(start_node):
+                    yield EvaluationResult(True, focus, start_node, '')
+                    continue
+                if absent:
+                    yield EvaluationResult(False, focus, start_node, f"Focus: {focus} not in graph")
+                    continue
+                map_ = FixedShapeMap()
+                map_.add(ShapeAssociation(focus, start_node))
+                cntxt.reset()
+                success, fail_reasons = isValid(cntxt, map_)
+                yield EvaluationResult(success, focus, start_node, '\n'.join(fail_reasons) if not success else '')
+        else:
+            yield EvaluationResult(False, focus, None, "No start node located")
+
+
+class _ContextOptions(NamedTuple):
+    """ Evaluation settings that are passed on to the Context """
+    debug: bool
+    debug_slurps: bool
+    over_slurp: Optional[bool]
+    verdict_only: bool
+    plan_slurps: bool
+    adaptive_order: bool
+
+
+# State of a worker process in a parallel evaluation -- the evaluator and its context
+_worker: Optional[Tuple[ShExEvaluator, Context]] = None
+
+
+def _init_worker(rdf: Union[str, Graph], namespaces: List[Tuple[str, URIRef]], shexj: str, start: STARTPARM,
+                 options: _ContextOptions, result_cache_size: Optional[int]) -> None:
+    """ Worker process initializer.  Each worker builds its own evaluator once and reuses it for every focus node
+
+    :param rdf: Graph to evaluate or, if it couldn't be shared with the worker, its N-Triples rendering
+    :param namespaces: namespace bindings of the graph
+    :param shexj: ShExJ rendering of the schema
+    """
+    global _worker
+    if isinstance(rdf, str):
+        g = Graph()
+        g.parse(data=rdf, format="nt")
+        for prefix, namespace in namespaces:
+            g.bind(prefix, namespace)
+    else:
+        g = rdf
+    evaluator = ShExEvaluator(g, shexj, start=start, result_cache_size=result_cache_size)
+    _worker = (evaluator, evaluator._new_context(options))
+
+
+def _evaluate_focus(focus: URIRef) -> List[EvaluationResult]:
+    evaluator, cntxt = _worker
+    return list(evaluator._focus_results(cntxt, focus))
+
+
+def _parallel_focus_results(evaluator: ShExEvaluator, workers: int, options: _ContextOptions) \
+        -> Iterator[Iterable[EvaluationResult]]:
+    """ Evaluate the foci of evaluator in a pool of worker processes.  The schema is shipped to each worker as
+    ShExJ.  Forked workers share the parent's graph, otherwise the graph is shipped as N-Triples (SPARQL graphs
+    are shipped as is and do their own fetching).
+
+    :return: results for each focus node in focus order.  Closing the generator shuts the pool down.
+    """
+    mp_context = multiprocessing.get_context()
+    if mp_context.get_start_method() == 'fork' or isinstance(evaluator.g, SlurpyGraph):
+        rdf = evaluator.g
+    else:
+        rdf = evaluator.g.serialize(format="nt")
+        if isinstance(rdf, bytes):
+            rdf = rdf.decode()
+    result_cache_size = evaluator.result_cache.max_size if evaluator.result_cache is not None else None
+    initargs = (rdf, list(evaluator.g.namespaces()), as_json(evaluator._schema), evaluator.start,
+                options, result_cache_size)
+    nfoci = len(evaluator._focus) if isinstance(evaluator._focus, Sized) else None
+    chunksize = max(1, min(64, nfoci // (workers * 4))) if nfoci else 16
+    with mp_context.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.imap(_evaluate_focus, evaluator.foci, chunksize)
+
 
 def genargs(prog: Optional[str] = None) -> ArgumentParser:
     """
@@ -291,6 +595,22 @@ def genargs(prog: Optional[str] = None) -> ArgumentParser:
     parser.add_argument("-pb", "--persistbnodes", help="Treat BNodes as persistent in SPARQL endpoint",
                         action="store_true"),
     parser.add_argument("--useragent", help='Use this user agent in the SPARQL Queries (Default: "' + UserAgent + '")')
+    parser.add_argument("-pf", "--prefetch", type=int, default=0,
+                        help="SPARQL only - prefetch the neighbourhoods of focus nodes, this many nodes per query")
+    parser.add_argument("-pl", "--plan", action="store_true",
+                        help="SPARQL only - fetch exactly the predicates that each shape needs, one query per node")
+    parser.add_argument("-pd", "--pushdown", type=int, default=0,
+                        help="SPARQL only - check shapes that only constrain node values at the endpoint, this many "
+                             "nodes per query")
+    parser.add_argument("-sc", "--slurpcache",
+                        help="SPARQL only - cache slurped triples in this SQLite file across runs")
+    parser.add_argument("--cachettl", type=float,
+                        help="Number of seconds that slurp cache entries remain valid (Default: no expiry)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the time and counters of each shape and triple constraint when done")
+    parser.add_argument("-ao", "--adaptiveorder", action="store_true",
+                        help="Order shape and triple expression components on how often they passed so far")
+    parser.add_argument("-w", "--workers", help="Number of processes to evaluate focus nodes in", type=int, default=1)
     return parser
 
 
@@ -304,16 +624,18 @@ def evaluate_cli(argv: Optional[Union[str, List[str]]] = None, prog: Optional[st
         print("Error: Cannot combine slurper and flattener graphs", file=sys.stderr)
         return 2
     if not opts.sparql and not opts.slurper and \
-            (opts.printsparql or opts.printsparqlresults or opts.graphname is not None or opts.persistbnodes):
-        print("Error: printsparql, pringsparqlresults, graphname and persistbnodes are SPARQL only",
-              file=sys.stderr)
+            (opts.printsparql or opts.printsparqlresults or opts.graphname is not None or opts.persistbnodes or
+             opts.prefetch or opts.plan or opts.pushdown or opts.slurpcache):
+        print("Error: printsparql, pringsparqlresults, graphname, persistbnodes, prefetch, plan, pushdown and "
+              "slurpcache are SPARQL only", file=sys.stderr)
     if not opts.format:
         opts.format = guess_format(opts.rdf)
     if not opts.format:
         print('Error: Cannot determine RDF format from file name - use "--format" option', file=sys.stderr)
         return 3
     if opts.slurper or opts.gdbslurper:
-        g = SlurpyGraphWithAgent(opts.rdf, agent=opts.useragent, gdb_slurper=opts.gdbslurper)
+        cache = SlurpCache(opts.slurpcache, opts.cachettl) if opts.slurpcache else None
+        g = SlurpyGraphWithAgent(opts.rdf, agent=opts.useragent, gdb_slurper=opts.gdbslurper, cache=cache)
         if opts.printsparql:
             g.debug_slurps = True
         if opts.printsparqlresults:
@@ -345,12 +667,8 @@ def evaluate_cli(argv: Optional[Union[str, List[str]]] = None, prog: Optional[st
     if not start:
         start.append(START)
     if opts.sparql:
-        # TODO: switch to a generator idiom all the way through
-        if opts.focus is None:
-            opts.focus = []
-        elif not isinstance(opts.focus, list):
-            opts.focus = [opts.focus]
-        opts.focus += list(SPARQLQuery(opts.rdf, opts.sparql, print_query=opts.printsparql,
+        opts.focus = chain([opts.focus] if opts.focus else [],
+                           SPARQLQuery(opts.rdf, opts.sparql, print_query=opts.printsparql,
                                        print_results=opts.printsparqlresults, user_agent=opts.useragent).focus_nodes())
 
     def result_sink(rslt: EvaluationResult) -> bool:
@@ -364,8 +682,12 @@ def evaluate_cli(argv: Optional[Union[str, List[str]]] = None, prog: Optional[st
         return not opts.stopafter or evaluator.nnodes < opts.stopafter
 
     evaluator = ShExEvaluator(g, opts.shex, opts.focus, start, rdf_format=opts.format, debug=opts.debug,
-                              output_sink=result_sink)
+                              output_sink=result_sink, workers=opts.workers, prefetch=opts.prefetch,
+                              plan_slurps=opts.plan, pushdown=opts.pushdown, profile=opts.profile,
+                              adaptive_order=opts.adaptiveorder)
     evaluator.evaluate()
+    if evaluator.stats is not None:
+        print(evaluator.stats.report())
     return 1 if evaluator.nerrors else 0
 
 
@@ -4,6 +4,8 @@ from typing import Optional
 from SPARQLWrapper import SPARQLWrapper
 from sparqlslurper import SlurpyGraph, GraphDBSlurpyGraph
 
+from pyshex.utils.slurp_cache import SlurpCache, CachedSlurpyGraph, CachedGraphDBSlurpyGraph
+
 with open(os.path.join(os.path.dirname(__file__), 'git_describe.txt')) as desc_f:
     description = desc_f.read().strip()
 
@@ -16,9 +18,14 @@ UserAgent = f"PyShEx/{description[1:description.find('-')]} " \
 
 
 def SlurpyGraphWithAgent(endpoint: str, *args, persistent_bnodes: bool = False, agent: Optional[str] = None,
-                 gdb_slurper: Optional[bool] = False, **kwargs) -> SlurpyGraph:
-    rval = GraphDBSlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs) if gdb_slurper else \
-        SlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs)
+                 gdb_slurper: Optional[bool] = False, cache: Optional[SlurpCache] = None, **kwargs) -> SlurpyGraph:
+    if cache is not None:
+        rval = CachedGraphDBSlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs) \
+            if gdb_slurper else CachedSlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs)
+        rval.slurp_cache = cache
+    else:
+        rval = GraphDBSlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs) if gdb_slurper \
+            else SlurpyGraph(endpoint, *args, persistent_bnodes=persistent_bnodes, **kwargs)
     rval.sparql.agent = agent if agent else UserAgent
     return rval
 
@@ -0,0 +1,264 @@
+"""
+Triple expression matching as a bounded flow problem.
+
+A triple expression that is built from TripleConstraints, EachOfs and OneOfs without semantic actions can usually
+be flattened into a list of alternatives, each of which is a list of TripleConstraint "slots" with a (min, max)
+cardinality (see :py:meth:`CompiledSchema.alternatives`).  Matching a set of triples against an alternative is then
+a matter of:
+
+1) determining, for each triple, which slots it can satisfy (predicate, direction and value expression) and
+2) deciding whether the triples can be assigned to slots such that every triple that isn't an EXTRA is used and
+   every slot receives between min and max triples
+
+Step 2 is a feasible flow problem with lower bounds.  Triples that can satisfy exactly the same slots are
+interchangeable, so they are grouped into a single node whose capacity is the number of triples in the group.
+The resulting network has one node per group and per slot, regardless of the number of triples.
+
+A repeated group (e.g. ``( :a . ; :b . )*``) is matched k times by giving each of its slots k times its own
+cardinality.  The possible numbers of repetitions are tried one at a time, each of them a flow problem of its own.
+"""
+from collections import deque
+from itertools import product
+from typing import List, Tuple, Dict, Optional, FrozenSet, Union, Iterator, Sequence
+
+from ShExJSG import ShExJ
+from rdflib import URIRef
+
+from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFGraph, RDFTriple, Node
+from pyshex.utils.compiled_schema import Slot, Repeat, AlternativeElement
+
+# A fail reason is either a line of text or a list of triples to be rendered when reported
+MatchReason = Union[str, List[RDFTriple]]
+
+
+class BoundedFlow:
+    """ Feasibility of a flow network whose edges have both lower and upper bounds """
+    def __init__(self, nnodes: int, source: int, sink: int) -> None:
+        self.nnodes = nnodes
+        self.source = source
+        self.sink = sink
+        self.capacity: List[Dict[int, int]] = [dict() for _ in range(nnodes + 2)]
+        self.excess: List[int] = [0] * (nnodes + 2)
+        self.infeasible = False
+
+    def add_edge(self, u: int, v: int, lower: int, upper: int) -> None:
+        """ Add an edge from u to v that must carry between lower and upper units of flow """
+        if upper < lower:
+            self.infeasible = True
+        elif upper > lower:
+            self.capacity[u][v] = self.capacity[u].get(v, 0) + upper - lower
+            self.capacity[v].setdefault(u, 0)
+        self.excess[v] += lower
+        self.excess[u] -= lower
+
+    def feasible(self) -> bool:
+        """ Determine whether there is a flow from source to sink that satisfies all of the edge bounds """
+        if self.infeasible:
+            return False
+        # Standard reduction: close the network with an unbounded sink -> source edge and move the lower bounds
+        # into a super source and super sink.  A feasible flow exists iff the max flow saturates the super source.
+        super_source, super_sink = self.nnodes, self.nnodes + 1
+        unbounded = sum(max(e, 0) for e in self.excess) + 1
+        self.capacity[self.sink][self.source] = self.capacity[self.sink].get(self.source, 0) + unbounded
+        self.capacity[self.source].setdefault(self.sink, 0)
+        required = 0
+        for node in range(self.nnodes):
+            if self.excess[node] > 0:
+                self.capacity[super_source][node] = self.excess[node]
+                self.capacity[node].setdefault(super_source, 0)
+                required += self.excess[node]
+            elif self.excess[node] < 0:
+                self.capacity[node][super_sink] = -self.excess[node]
+                self.capacity[super_sink].setdefault(node, 0)
+        return self._max_flow(super_source, super_sink) == required
+
+    def _max_flow(self, s: int, t: int) -> int:
+        """ Edmonds-Karp -- the networks we build are tiny, so simplicity wins """
+        flow = 0
+        while True:
+            parent: Dict[int, int] = {s: s}
+            queue = deque([s])
+            while queue and t not in parent:
+                u = queue.popleft()
+                for v, c in self.capacity[u].items():
+                    if c > 0 and v not in parent:
+                        parent[v] = u
+                        queue.append(v)
+            if t not in parent:
+                return flow
+            bottleneck = None
+            v = t
+            while v != s:
+                u = parent[v]
+                bottleneck = self.capacity[u][v] if bottleneck is None else min(bottleneck, self.capacity[u][v])
+                v = u
+            v = t
+            while v != s:
+                u = parent[v]
+                self.capacity[u][v] -= bottleneck
+                self.capacity[v][u] += bottleneck
+                v = u
+            flow += bottleneck
+
+
+class BipartiteMatcher:
+    def __init__(self, T: RDFGraph, alternatives: List[List[AlternativeElement]],
+                 extras: Optional[FrozenSet[URIRef]] = None, focus: Optional[Node] = None) -> None:
+        """ Create a matcher for the flattened triple expression alternatives and T
+
+        :param T: triples to match
+        :param alternatives: flattened triple expression (see :py:meth:`CompiledSchema.alternatives`)
+        :param extras: predicates whose triples may be left unmatched
+        :param focus: focus node.  If present, forward constraints only match arcs out and inverse constraints
+        only match arcs in.
+        """
+        self.T = T
+        self.alternatives = alternatives
+        self.extras = extras if extras else frozenset()
+        self.focus = focus
+
+    def evaluate(self, cntxt: Context) -> bool:
+        fail_reasons: List[Tuple[int, List[MatchReason]]] = []
+        for alternative in self.alternatives:
+            # Only the closest number of repetitions is reported
+            repetition_reasons: List[Tuple[int, List[MatchReason]]] = []
+            for slots in self._repetitions(cntxt, alternative):
+                if self._evaluate_alternative(cntxt, slots, repetition_reasons):
+                    return True
+            if repetition_reasons:
+                fail_reasons.append(min(repetition_reasons, key=lambda r: r[0]))
+        if len(fail_reasons) == 1:
+            self._emit(cntxt, fail_reasons[0][1], True)
+        elif fail_reasons:
+            # Report the closest alternative only.  An alternative without reasons of its own failed because of
+            # value expressions, which are already explained by the nested evaluations.
+            alt_num = min(range(len(fail_reasons)), key=lambda i: fail_reasons[i][0])
+            if fail_reasons[alt_num][1]:
+                cntxt.fail_reason = f"{len(self.T)} triples do not match any of {len(fail_reasons)} alternatives"
+                cntxt.fail_reason = f"   Closest alternative ({alt_num + 1}):"
+                self._emit(cntxt, fail_reasons[alt_num][1], False)
+        return False
+
+    def _repetitions(self, cntxt: Context, alternative: List[AlternativeElement]) -> Iterator[List[Slot]]:
+        """ Generate the slots of alternative for each combination of the numbers of repetitions of its groups """
+        choices: List[List[List[Slot]]] = []
+        for element in alternative:
+            if isinstance(element, Repeat):
+                choices.append([[(tc, k * min_, -1 if max_ == -1 and k else k * max_)
+                                 for tc, min_, max_ in element.slots] for k in self._repeat_counts(cntxt, element)])
+            else:
+                choices.append([[element]])
+        for combination in product(*choices):
+            yield [slot for slots in combination for slot in slots]
+
+    def _repeat_counts(self, cntxt: Context, repeat: Repeat) -> Sequence[int]:
+        """ Return the numbers of repetitions of repeat that are worth trying """
+        # Beyond one repetition per triple, more repetitions can't take any more triples.  A slot that needs triples
+        # in every repetition limits the repetitions to the number of triples that it could take.
+        most = len(self.T) if repeat.max == -1 else min(repeat.max, len(self.T))
+        for tc, min_, _ in repeat.slots:
+            if min_ > 0:
+                most = min(most, sum(1 for t in self.T if t.p == cntxt.compiled_schema.predicate(tc)) // min_)
+        most = max(most, repeat.min)
+        if all(min_ == 0 for _, min_, _ in repeat.slots):
+            return [most]                       # Every extra repetition loosens the bounds
+        if all(max_ == -1 for _, _, max_ in repeat.slots):
+            # Every extra repetition tightens the bounds, but no repetitions at all means no triples at all
+            return [k for k in (0, 1) if repeat.min <= k <= most] if repeat.min == 0 else [repeat.min]
+        return range(repeat.min, most + 1)
+
+    def _matches_slot(self, cntxt: Context, t: RDFTriple, tc: ShExJ.TripleConstraint) -> bool:
+        """ Determine whether t can fill the slot for tc, reusing the context's earlier check of its value """
+        from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import matchesTripleConstraint
+
+        if t.p != cntxt.compiled_schema.predicate(tc):
+            return False
+        if self.focus is not None and (t.o if tc.inverse else t.s) != self.focus:
+            return False
+        rslt = cntxt.tc_result(t, tc)
+        return matchesTripleConstraint(cntxt, t, tc) if rslt is None else rslt
+
+    def _evaluate_alternative(self, cntxt: Context, alternative: List[Slot],
+                              fail_reasons: List[Tuple[int, List[MatchReason]]]) -> bool:
+        # Group the triples by the set of slots they can satisfy
+        groups: Dict[Tuple[Tuple[int, ...], bool], List[RDFTriple]] = {}
+        for t in self.T:
+            slots = tuple(i for i, (tc, _, _) in enumerate(alternative) if self._matches_slot(cntxt, t, tc))
+            groups.setdefault((slots, t.p in self.extras), []).append(t)
+
+        # Node numbering: 0 - source, 1 - sink, then groups, then slots
+        flow = BoundedFlow(2 + len(groups) + len(alternative), 0, 1)
+        slot_base = 2 + len(groups)
+        unmatched: List[RDFTriple] = []
+        for group_num, ((slots, is_extra), triples) in enumerate(groups.items()):
+            if not slots:
+                if not is_extra:
+                    unmatched += triples
+                continue
+            flow.add_edge(0, 2 + group_num, 0 if is_extra else len(triples), len(triples))
+            for slot_num in slots:
+                flow.add_edge(2 + group_num, slot_base + slot_num, 0, len(triples))
+        for slot_num, (_, min_, max_) in enumerate(alternative):
+            flow.add_edge(slot_base + slot_num, 1, min_, len(self.T) if max_ == -1 else max_)
+
+        if not unmatched and flow.feasible():
+            return True
+        if not cntxt.verdict_only:
+            fail_reasons.append(self._fail_reasons(cntxt, alternative, groups, unmatched))
+        return False
+
+    def _fail_reasons(self, cntxt: Context, alternative: List[Slot],
+                      groups: Dict[Tuple[Tuple[int, ...], bool], List[RDFTriple]],
+                      unmatched: List[RDFTriple]) -> Tuple[int, List[MatchReason]]:
+        """ Explain why the triples can't be assigned to the alternative.  Triples whose value expression failed
+        have already recorded their reasons, so we only report triples that no constraint could take at all.
+
+        :return: distance from the alternative (number of missing or surplus triples) and the reasons
+
+        Triple lists are rendered by :py:meth:`_emit`, as rendering assigns BNode labels and only the reported
+        alternative should do that.
+        """
+        reasons = []
+        distance = 0
+        predicates = {cntxt.compiled_schema.predicate(tc) for tc, _, _ in alternative}
+        unexplained = [t for t in unmatched if t.p not in predicates]
+        if unexplained:
+            reasons.append(unexplained)
+            reasons.append(f"   {len(unexplained)} triples match no constraint")
+            distance += len(unexplained)
+        for slot_num, (tc, min_, max_) in enumerate(alternative):
+            cardinality_text = f"{{{min_},{'*' if max_ == -1 else max_}}}"
+            present = [t for t in self.T if t.p == cntxt.compiled_schema.predicate(tc) and
+                       (self.focus is None or (t.o if tc.inverse else t.s) == self.focus)]
+            required = [t for (slots, is_extra), triples in groups.items()
+                        if slots == (slot_num, ) and not is_extra for t in triples]
+            if not present and min_ > 0:
+                reasons.append(f"   No matching triples found for predicate {cntxt.n3_mapper.n3(tc.predicate)}")
+                distance += min_
+            elif len(present) < min_:
+                reasons.append(present)
+                reasons.append(f"   {len(present)} triples less than {cardinality_text}")
+                distance += min_ - len(present)
+            elif 0 <= max_ < len(required):
+                reasons.append(required)
+                reasons.append(f"   {len(required)} triples exceeds max {cardinality_text}")
+                distance += len(required) - max_
+        if not reasons and not unmatched:
+            reasons.append(f"   {len(self.T)} triples cannot be assigned to constraints with cardinalities " +
+                           ', '.join(f"{{{min_},{'*' if max_ == -1 else max_}}}" for _, min_, max_ in alternative))
+        return distance, reasons
+
+    @staticmethod
+    def _emit(cntxt: Context, reasons: List[MatchReason], first: bool) -> None:
+        """ Record reasons in the current parse node.  Only the first line of a node is indented to the node's depth,
+        so a triple list that follows other lines is lined up with them instead
+        """
+        for reason_num, reason in enumerate(reasons):
+            if isinstance(reason, str):
+                cntxt.fail_reason = reason
+            elif reason:
+                header = "Triples:" if first and reason_num == 0 else "   Triples:"
+                cntxt.fail_reason = lambda T=reason, header=header: '\n'.join(
+                    [header] + [f"      {cntxt.n3_mapper.n3(t)}" for t in sorted(T)[:5]] +
+                    (["      ...   "] if len(T) > 5 else []))
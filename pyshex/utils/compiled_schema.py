@@ -0,0 +1,413 @@
+"""
+Compiled schema -- a one-time analysis of a ShExJ Schema that is shared by every evaluation that uses it.
+
+The evaluation functions in :py:mod:`pyshex.shape_expressions_language` are written against the ShExJ JSG
+objects.  Everything that can be derived from the schema alone (label resolution, the predicates and directions
+used by a shape, EXTRA predicates as URIRefs, cardinality defaults, typed value set entries, ...) is computed once
+here rather than on every focus node.
+
+Entries are keyed by the identity of the ShExJ object they describe.  Expressions that aren't reachable from the
+schema (e.g. those supplied by an external shape resolver) are compiled the first time they are asked for.
+"""
+from typing import Dict, List, Optional, Union, Tuple, FrozenSet, Any, Callable, Set, NamedTuple
+
+from ShExJSG import ShExJ
+from pyjsg.jsglib import isinstance_
+from rdflib import Namespace, URIRef
+
+from pyshex.shapemap_structure_and_language.p3_shapemap_structure import START
+from pyshex.utils.datatype_utils import map_object_literal
+from pyshex.utils.value_set_utils import iriref_to_uriref, ValueSetIndex
+
+
+# A TripleConstraint along with its (min, max) cardinality
+Slot = Tuple[ShExJ.TripleConstraint, int, int]
+
+
+class Repeat(NamedTuple):
+    """ A group that is matched between min and max times.  The cardinalities of its slots are per repetition """
+    slots: List[Slot]
+    min: int
+    max: int
+
+
+# An element of a flattened alternative
+AlternativeElement = Union[Slot, Repeat]
+
+# A predicate and whether the arcs are out of (True) or into (False) the node
+ArcKey = Tuple[URIRef, bool]
+
+# Upper limit on the number of alternatives that a triple expression is flattened into
+MAX_ALTERNATIVES = 64
+
+
+class PredDirection:
+    def __init__(self) -> None:
+        self.is_fwd = False
+        self.is_rev = False
+
+    def dir(self, is_fwd: bool) -> None:
+        if is_fwd:
+            self.is_fwd = True
+        else:
+            self.is_rev = True
+
+
+class CompiledShape:
+    """ The schema-only information needed to evaluate a :py:class:`ShExJ.Shape` """
+    def __init__(self, S: ShExJ.Shape, cs: "CompiledSchema") -> None:
+        self.shape = S
+        self.closed: bool = bool(S.closed)
+        self.extras: FrozenSet[URIRef] = frozenset(iriref_to_uriref(e) for e in S.extra) \
+            if S.extra is not None else frozenset()
+
+        # The TripleConstraints that appear in the shape expression (references included, nested shapes excluded)
+        # and the directed predicates that they use
+        self.triple_constraints: List[ShExJ.TripleConstraint] = []
+        self.predicates: Dict[URIRef, PredDirection] = {}
+        if S.expression is not None:
+            cs.triple_constraints_in(S.expression, self.triple_constraints)
+        for tc in self.triple_constraints:
+            self.predicates.setdefault(iriref_to_uriref(tc.predicate), PredDirection()).dir(not tc.inverse)
+
+        # The fewest and the most arcs of each (predicate, is_fwd) that a node can have and still satisfy the shape.
+        # A max of -1 is unbounded.  None if the expression can't be analyzed
+        self.arc_bounds: Optional[Dict[ArcKey, Tuple[int, int]]] = None
+        if S.expression is not None:
+            bounds = cs.arc_bounds(S.expression)
+            if bounds is not None:
+                # Arcs of EXTRA predicates needn't be matched
+                self.arc_bounds = {key: (min_, -1 if key[0] in self.extras else max_)
+                                   for key, (min_, max_) in bounds.items()}
+
+
+class CompiledSchema:
+    """ An immutable evaluation plan for a ShExJ Schema """
+    def __init__(self, s: ShExJ.Schema, base_namespace: Optional[Union[str, Namespace]] = None) -> None:
+        """
+        Construct the label maps and compile every shape, triple expression and node constraint in s.
+
+        :param s: ShExJ Schema instance.  Note that an inline start shape is moved into the shapes list
+        :param base_namespace: namespace for resolving relative shape labels
+        """
+        self.schema: ShExJ.Schema = s
+        self.base_namespace = base_namespace if isinstance(base_namespace, Namespace) \
+            else Namespace(base_namespace) if base_namespace else None
+        self.schema_id_map: Dict[ShExJ.shapeExprLabel, ShExJ.shapeExpr] = {}
+        self.te_id_map: Dict[ShExJ.tripleExprLabel, ShExJ.tripleExpr] = {}
+
+        self._shapes: Dict[int, CompiledShape] = {}
+        self._cardinalities: Dict[int, Tuple[int, int]] = {}
+        self._value_sets: Dict[int, List[ShExJ.valueSetValue]] = {}
+        self._value_set_indices: Dict[int, ValueSetIndex] = {}
+        self._predicates: Dict[int, URIRef] = {}
+        self._alternatives: Dict[int, Optional[List[List[AlternativeElement]]]] = {}
+        self._node_checkers: Dict[int, Callable] = {}
+        self._analyses: Dict[Tuple[str, int], Any] = {}
+        self._pinned: List[Any] = []        # Lazily compiled objects -- keep them alive so their id() stays valid
+
+        if self.schema.start is not None:
+            if not isinstance_(self.schema.start, ShExJ.shapeExprLabel) and\
+                    'id' in self.schema.start and self.schema.start.id is None:
+                self.schema.start.id = "_:start"
+            self._gen_schema_xref(self.schema.start)
+            # An inline start shape is moved into the shapes list and start refers to it by label
+            if not isinstance_(self.schema.start, ShExJ.shapeExprLabel):
+                if self.schema.shapes is None:
+                    self.schema.shapes = [self.schema.start]
+                else:
+                    self.schema.shapes.append(self.schema.start)
+                self.schema.start = self.schema.start.id
+        if self.schema.shapes is not None:
+            for e in self.schema.shapes:
+                self._gen_schema_xref(e)
+            for e in self.schema.shapes:
+                self._compile_shape_expr(e)
+
+    def _gen_schema_xref(self, expr: Optional[Union[ShExJ.shapeExprLabel, ShExJ.shapeExpr]]) -> None:
+        """
+        Generate the schema_id_map
+
+        :param expr: root shape expression
+        """
+        if expr is not None and not isinstance_(expr, ShExJ.shapeExprLabel) and 'id' in expr and expr.id is not None:
+            abs_id = self._resolve_relative_uri(expr.id)
+            if abs_id not in self.schema_id_map:
+                self.schema_id_map[abs_id] = expr
+        if isinstance(expr, (ShExJ.ShapeOr, ShExJ.ShapeAnd)):
+            for expr2 in expr.shapeExprs:
+                self._gen_schema_xref(expr2)
+        elif isinstance(expr, ShExJ.ShapeNot):
+            self._gen_schema_xref(expr.shapeExpr)
+        elif isinstance(expr, ShExJ.Shape):
+            if expr.expression is not None:
+                self._gen_te_xref(expr.expression)
+
+    def _resolve_relative_uri(self, ref: Union[URIRef, ShExJ.shapeExprLabel]) -> ShExJ.shapeExprLabel:
+        return ShExJ.IRIREF(str(self.base_namespace[str(ref)])) if ':' not in str(ref) and self.base_namespace else ref
+
+    def _gen_te_xref(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel]) -> None:
+        """
+        Generate the triple expression map (te_id_map)
+
+        :param expr: root triple expression
+
+        """
+        if expr is not None and not isinstance_(expr, ShExJ.tripleExprLabel) and 'id' in expr and expr.id is not None:
+            if expr.id in self.te_id_map:
+                return
+            else:
+                self.te_id_map[self._resolve_relative_uri(expr.id)] = expr
+        if isinstance(expr, (ShExJ.OneOf, ShExJ.EachOf)):
+            for expr2 in expr.expressions:
+                self._gen_te_xref(expr2)
+        elif isinstance(expr, ShExJ.TripleConstraint):
+            if expr.valueExpr is not None:
+                self._gen_schema_xref(expr.valueExpr)
+
+    def _compile_shape_expr(self, expr: Optional[ShExJ.shapeExpr]) -> None:
+        """ Compile expr and every inline expression it contains """
+        if isinstance(expr, (ShExJ.ShapeOr, ShExJ.ShapeAnd)):
+            for expr2 in expr.shapeExprs:
+                self._compile_shape_expr(expr2)
+        elif isinstance(expr, ShExJ.ShapeNot):
+            self._compile_shape_expr(expr.shapeExpr)
+        elif isinstance(expr, ShExJ.NodeConstraint):
+            self.value_set_index(expr)
+        elif isinstance(expr, ShExJ.Shape):
+            if id(expr) not in self._shapes:
+                self.shape(expr)
+                if expr.expression is not None:
+                    self._compile_triple_expr(expr.expression)
+                    self.alternatives(expr.expression)
+
+    def _compile_triple_expr(self, expr: ShExJ.tripleExpr) -> None:
+        if isinstance(expr, (ShExJ.OneOf, ShExJ.EachOf, ShExJ.TripleConstraint)):
+            self.cardinality(expr)
+            if isinstance(expr, ShExJ.TripleConstraint):
+                self.predicate(expr)
+                self._compile_shape_expr(expr.valueExpr)
+            else:
+                for expr2 in expr.expressions:
+                    self._compile_triple_expr(expr2)
+
+    def triple_constraints_in(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel],
+                              tcs: List[ShExJ.TripleConstraint], seen: Optional[List[int]] = None) -> None:
+        """ Collect the TripleConstraints in expr, following triple expression references but not value expressions
+
+        :param expr: triple expression to search
+        :param tcs: list to add the constraints to
+        :param seen: triple expressions that have already been visited
+        """
+        if seen is None:
+            seen = []
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            expr = self.tripleExprFor(expr)
+        if expr is None or id(expr) in seen:
+            return
+        seen.append(id(expr))
+        if isinstance(expr, ShExJ.TripleConstraint):
+            tcs.append(expr)
+        elif isinstance(expr, (ShExJ.OneOf, ShExJ.EachOf)):
+            for expr2 in expr.expressions:
+                self.triple_constraints_in(expr2, tcs, seen)
+
+    def reference_predicates(self) -> Set[URIRef]:
+        """ Return the forward predicates of the TripleConstraints whose value expression is more than a node
+        constraint -- the arcs that evaluation follows from one node to the next """
+        return {self.predicate(tc) for cshape in self._shapes.values() for tc in cshape.triple_constraints
+                if not tc.inverse and tc.valueExpr is not None and not isinstance(tc.valueExpr, ShExJ.NodeConstraint)}
+
+    def referenced_shapes(self, expr: Union[ShExJ.shapeExpr, ShExJ.shapeExprLabel]) -> List[ShExJ.Shape]:
+        """ Return the shapes that a node is evaluated against when it is checked against expr -- the shapes that
+        expr is or refers to, without descending into their triple expressions """
+        return self.analysis('referenced_shapes', expr, lambda: self._referenced_shapes(expr, set()))
+
+    def _referenced_shapes(self, expr: Union[ShExJ.shapeExpr, ShExJ.shapeExprLabel], seen: Set[str]) \
+            -> List[ShExJ.Shape]:
+        if isinstance_(expr, ShExJ.shapeExprLabel):
+            if str(expr) in seen:
+                return []
+            seen.add(str(expr))
+            expr = self.shapeExprFor(expr)
+        if isinstance(expr, (ShExJ.ShapeOr, ShExJ.ShapeAnd)):
+            return [S for expr2 in expr.shapeExprs for S in self._referenced_shapes(expr2, seen)]
+        elif isinstance(expr, ShExJ.ShapeNot):
+            return self._referenced_shapes(expr.shapeExpr, seen)
+        elif isinstance(expr, ShExJ.Shape):
+            return [expr]
+        return []
+
+    def tripleExprFor(self, id_: ShExJ.tripleExprLabel) -> Optional[ShExJ.tripleExpr]:
+        """ Return the triple expression that corresponds to id """
+        rval = self.te_id_map.get(str(id_))
+        if rval is None and self.base_namespace:
+            rval = self.te_id_map.get(str(self._resolve_relative_uri(id_)))
+        return rval
+
+    def shapeExprFor(self, id_: Union[ShExJ.shapeExprLabel, START]) -> Optional[ShExJ.shapeExpr]:
+        """ Return the shape expression that corresponds to id.  Every shape expression with an id is indexed, so
+        this is a dictionary lookup regardless of the size of the schema. """
+        if id_ is START:
+            return self.schema.start
+        rval = self.schema_id_map.get(str(id_))
+        if rval is None and self.base_namespace:
+            rval = self.schema_id_map.get(str(self._resolve_relative_uri(id_)))
+        return rval
+
+    def shape(self, S: ShExJ.Shape) -> CompiledShape:
+        """ Return the compiled form of shape S """
+        rval = self._shapes.get(id(S))
+        if rval is None:
+            rval = self._shapes[id(S)] = CompiledShape(S, self)
+        return rval
+
+    def cardinality(self, expr: ShExJ.tripleExpr) -> Tuple[int, int]:
+        """ Return the (min, max) of expr with the defaults filled in.  A max of -1 is unbounded """
+        rval = self._cardinalities.get(id(expr))
+        if rval is None:
+            rval = self._cardinalities[id(expr)] = (expr.min if expr.min is not None else 1,
+                                                    expr.max if expr.max is not None else 1)
+            self._pinned.append(expr)
+        return rval
+
+    def predicate(self, tc: ShExJ.TripleConstraint) -> URIRef:
+        """ Return the predicate of tc as a URIRef """
+        rval = self._predicates.get(id(tc))
+        if rval is None:
+            rval = self._predicates[id(tc)] = iriref_to_uriref(tc.predicate)
+            self._pinned.append(tc)
+        return rval
+
+    def value_set(self, nc: ShExJ.NodeConstraint) -> Optional[List[ShExJ.valueSetValue]]:
+        """ Return the values in nc with their types identified (see :py:func:`map_object_literal`) """
+        if nc.values is None:
+            return None
+        rval = self._value_sets.get(id(nc))
+        if rval is None:
+            rval = self._value_sets[id(nc)] = [map_object_literal(vsv) for vsv in nc.values]
+            self._pinned.append(nc)
+        return rval
+
+    def value_set_index(self, nc: ShExJ.NodeConstraint) -> Optional[ValueSetIndex]:
+        """ Return the values in nc organized for lookup """
+        if nc.values is None:
+            return None
+        rval = self._value_set_indices.get(id(nc))
+        if rval is None:
+            rval = self._value_set_indices[id(nc)] = ValueSetIndex(self.value_set(nc))
+        return rval
+
+    def node_checker(self, nc: ShExJ.NodeConstraint) -> Callable:
+        """ Return nc compiled into a single test (see :py:func:`compile_node_constraint`) """
+        from pyshex.shape_expressions_language.p5_4_node_constraints import compile_node_constraint
+
+        rval = self._node_checkers.get(id(nc))
+        if rval is None:
+            rval = self._node_checkers[id(nc)] = compile_node_constraint(nc, self)
+            self._pinned.append(nc)
+        return rval
+
+    def analysis(self, name: str, expr: Any, compute: Callable[[], Any]) -> Any:
+        """ Return the result of the analysis called name on expr, computing it the first time it is asked for.
+        Analyses must depend on nothing but the schema and expr.
+
+        :param name: name of the analysis
+        :param expr: shape or triple expression (or label) being analyzed
+        :param compute: function that does the analysis
+        """
+        key = (name, id(expr))
+        if key not in self._analyses:
+            self._analyses[key] = compute()
+            self._pinned.append(expr)
+        return self._analyses[key]
+
+    def arc_bounds(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel]) \
+            -> Optional[Dict[ArcKey, Tuple[int, int]]]:
+        """ Return the fewest and the most triples of each predicate and direction that expr can match.  A max of -1
+        is unbounded.
+
+        :param expr: triple expression to analyze
+        :return: bounds by (predicate, is_fwd) or None if expr has an unresolved or recursive reference
+        """
+        return self.analysis('arc_bounds', expr, lambda: self._arc_bounds(expr, []))
+
+    def _arc_bounds(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel], active: List[int]) \
+            -> Optional[Dict[ArcKey, Tuple[int, int]]]:
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            expr = self.tripleExprFor(expr)
+        if expr is None or id(expr) in active:
+            return None
+        min_, max_ = self.cardinality(expr)
+        if isinstance(expr, ShExJ.TripleConstraint):
+            return {(self.predicate(expr), not expr.inverse): (min_, max_)}
+        active.append(id(expr))
+        component_bounds = [self._arc_bounds(e, active) for e in expr.expressions]
+        active.pop()
+        if any(bounds is None for bounds in component_bounds):
+            return None
+
+        # An EachOf matches the arcs of all of its components, a OneOf those of one of them
+        rval = {}
+        for key in dict.fromkeys(key for bounds in component_bounds for key in bounds):
+            mins = [bounds.get(key, (0, 0))[0] for bounds in component_bounds]
+            maxes = [bounds.get(key, (0, 0))[1] for bounds in component_bounds]
+            if isinstance(expr, ShExJ.EachOf):
+                key_min, key_max = sum(mins), -1 if -1 in maxes else sum(maxes)
+            else:
+                key_min, key_max = min(mins), -1 if -1 in maxes else max(maxes)
+            rval[key] = (key_min * min_, 0 if key_max == 0 or max_ == 0 else
+                         -1 if key_max == -1 or max_ == -1 else key_max * max_)
+        return rval
+
+    def alternatives(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel]) \
+            -> Optional[List[List[AlternativeElement]]]:
+        """ Flatten expr into a list of alternatives, each of which is a list of TripleConstraints that must all be
+        matched.  EachOfs become the cartesian product of their components, OneOfs the union, and optional groups
+        add an empty alternative.  Any other group cardinality becomes a :py:class:`Repeat` of the group's slots,
+        provided that the group flattens into a single alternative of TripleConstraints.  For a given number of
+        repetitions, k, such a group matches exactly when each of its slots gets k times its own cardinality.
+
+        :param expr: triple expression to flatten
+        :return: list of alternatives or None if expr can't be flattened -- it has semantic actions, a repeated
+        group with more than one alternative or a nested repeated group, a recursive reference or too many
+        alternatives.
+        """
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            expr = self.tripleExprFor(expr)
+            if expr is None:
+                return None
+        if id(expr) not in self._alternatives:
+            self._alternatives[id(expr)] = self._flatten(expr, [])
+            self._pinned.append(expr)
+        return self._alternatives[id(expr)]
+
+    def _flatten(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel], active: List[int]) \
+            -> Optional[List[List[AlternativeElement]]]:
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            expr = self.tripleExprFor(expr)
+        if expr is None or id(expr) in active or expr.semActs is not None:
+            return None
+        min_, max_ = self.cardinality(expr)
+        if isinstance(expr, ShExJ.TripleConstraint):
+            return [[(expr, min_, max_)]]
+        active.append(id(expr))
+        component_alternatives = [self._flatten(e, active) for e in expr.expressions]
+        active.pop()
+        if any(alts is None for alts in component_alternatives):
+            return None
+        if isinstance(expr, ShExJ.EachOf):
+            rval = [[]]
+            for alts in component_alternatives:
+                rval = [r + alt for r in rval for alt in alts]
+                if len(rval) > MAX_ALTERNATIVES:
+                    return None
+        else:
+            rval = [alt for alts in component_alternatives for alt in alts]
+        if (min_, max_) not in ((1, 1), (0, 1)):
+            if len(rval) != 1 or any(isinstance(element, Repeat) for element in rval[0]):
+                return None
+            return [[Repeat(rval[0], min_, max_)]]
+        if min_ == 0:
+            rval.insert(0, [])
+        return rval if len(rval) <= MAX_ALTERNATIVES else None
@@ -0,0 +1,142 @@
+"""
+The order in which the components of ShapeAnds, ShapeOrs, OneOfs and EachOfs are evaluated.
+
+Conjunctions stop at the first component that fails and disjunctions at the first one that passes, so evaluating
+cheap, decisive components first saves evaluating the expensive ones at all.  The cost of a component is estimated
+from the schema -- a node constraint is cheap, a shape costs more for each of its triple constraints and a reference
+to another shape means evaluating another node.  Components are ranked by their cost over the probability that they
+decide the outcome.  That probability is an even chance unless the outcomes of earlier evaluations, across focus
+nodes, are being recorded (``adaptive``).
+
+Reordering doesn't change the results, nor the reasons.  A disjunction that fails has evaluated every component,
+and their parse nodes are put back in schema order.  One that passes only keeps the parse node of the component that
+passed.  A conjunction that fails, however, could fail on a different component than it would have, so conjunctions
+are only reordered when no reasons are recorded (``cntxt.verdict_only``).
+"""
+from typing import Any, Callable, Dict, List, Set, Sequence, Union
+
+from ShExJSG import ShExJ
+from pyjsg.jsglib import isinstance_
+
+from pyshex.utils.compiled_schema import CompiledSchema
+
+NODE_CONSTRAINT_COST = 1
+TRIPLE_CONSTRAINT_COST = 1
+SHAPE_COST = 4
+REFERENCE_COST = 16                 # Evaluating another node
+EXTERNAL_COST = 64
+
+
+class ComponentOrder:
+    def __init__(self, cs: CompiledSchema, adaptive: bool = False) -> None:
+        """
+        :param cs: compiled schema the components come from
+        :param adaptive: record the outcome of each component evaluation and rank components on it
+        """
+        self.cs = cs
+        self.adaptive = adaptive
+        self.outcomes: Dict[int, List[int]] = {}        # id(component) -> [evaluations, passes]
+
+    def conjunction(self, cntxt: "Context", components: Sequence[ShExJ.shapeExpr],
+                    evaluate: Callable[[ShExJ.shapeExpr], bool]) -> bool:
+        """ Return true iff evaluate is true for all of the shape expressions in components """
+        return self._evaluate(cntxt, components, evaluate, True, self.shape_cost)
+
+    def disjunction(self, cntxt: "Context", components: Sequence[ShExJ.shapeExpr],
+                    evaluate: Callable[[ShExJ.shapeExpr], bool]) -> bool:
+        """ Return true iff evaluate is true for some shape expression in components """
+        return self._evaluate(cntxt, components, evaluate, False, self.shape_cost)
+
+    def one_of(self, cntxt: "Context", components: Sequence[ShExJ.tripleExpr],
+               evaluate: Callable[[ShExJ.tripleExpr], bool]) -> bool:
+        """ Return true iff evaluate is true for some triple expression in components """
+        return self._evaluate(cntxt, components, evaluate, False, self.triple_cost)
+
+    def each_of(self, cntxt: "Context", components: Sequence[ShExJ.tripleExpr]) -> List[ShExJ.tripleExpr]:
+        """ Return the components of an EachOf in the order that they are to be matched """
+        if not cntxt.verdict_only:
+            return list(components)
+        return [components[i] for i in self._static_order(components, True, self.triple_cost)]
+
+    def shape_cost(self, expr: Union[ShExJ.shapeExpr, ShExJ.shapeExprLabel]) -> int:
+        """ Return the estimated cost of evaluating a node against expr """
+        return self.cs.analysis('shape_cost', expr, lambda: self._shape_cost(expr, set()))
+
+    def triple_cost(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel]) -> int:
+        """ Return the estimated cost of matching a set of triples against expr """
+        return self.cs.analysis('triple_cost', expr, lambda: self._triple_cost(expr, set()))
+
+    def _evaluate(self, cntxt: "Context", components: Sequence[Any], evaluate: Callable[[Any], bool],
+                  conjunctive: bool, cost: Callable[[Any], int]) -> bool:
+        """ Evaluate components in rank order until one of them decides the outcome """
+        parse_node = cntxt.current_node if not cntxt.verdict_only else None
+        mark = len(parse_node.nodes) if parse_node is not None else 0
+        evaluated: List[Any] = []
+        rval = conjunctive
+        if conjunctive and not cntxt.verdict_only:
+            order = range(len(components))
+        elif self.adaptive:
+            order = self._rank_order(components, conjunctive, cost)
+        else:
+            order = self._static_order(components, conjunctive, cost)
+        for i in order:
+            start = len(parse_node.nodes) if parse_node is not None else 0
+            result = evaluate(components[i])
+            if self.adaptive:
+                outcome = self.outcomes.setdefault(id(components[i]), [0, 0])
+                outcome[0] += 1
+                outcome[1] += result
+            if parse_node is not None:
+                evaluated.append((i, parse_node.nodes[start:]))
+            if result != conjunctive:
+                rval = result
+                break
+        if len(evaluated) > 1:
+            parse_node.nodes[mark:] = [node for _, nodes in sorted(evaluated, key=lambda e: e[0]) for node in nodes]
+        return rval
+
+    def _static_order(self, components: Sequence[Any], conjunctive: bool, cost: Callable[[Any], int]) -> List[int]:
+        return self.cs.analysis('conjunct_order' if conjunctive else 'disjunct_order', components,
+                                lambda: self._rank_order(components, conjunctive, cost))
+
+    def _rank_order(self, components: Sequence[Any], conjunctive: bool, cost: Callable[[Any], int]) -> List[int]:
+        """ Order the components by cost over the chance that they decide the outcome.  Ties keep schema order """
+        def rank(i: int) -> float:
+            evaluations, passes = self.outcomes.get(id(components[i]), (0, 0))
+            p_pass = (passes + 1) / (evaluations + 2)
+            return cost(components[i]) / ((1 - p_pass) if conjunctive else p_pass)
+        return sorted(range(len(components)), key=rank)
+
+    def _shape_cost(self, expr: Union[ShExJ.shapeExpr, ShExJ.shapeExprLabel], seen: Set[str]) -> int:
+        if isinstance_(expr, ShExJ.shapeExprLabel):
+            if str(expr) in seen:
+                return REFERENCE_COST
+            seen.add(str(expr))
+            expr = self.cs.shapeExprFor(expr)
+            if expr is None:
+                return NODE_CONSTRAINT_COST             # Fails straight away
+        if isinstance(expr, ShExJ.NodeConstraint):
+            return NODE_CONSTRAINT_COST
+        elif isinstance(expr, ShExJ.Shape):
+            return SHAPE_COST + (self._triple_cost(expr.expression, set()) if expr.expression is not None else 0)
+        elif isinstance(expr, (ShExJ.ShapeAnd, ShExJ.ShapeOr)):
+            return sum(self._shape_cost(expr2, seen) for expr2 in expr.shapeExprs)
+        elif isinstance(expr, ShExJ.ShapeNot):
+            return self._shape_cost(expr.shapeExpr, seen)
+        return EXTERNAL_COST
+
+    def _triple_cost(self, expr: Union[ShExJ.tripleExpr, ShExJ.tripleExprLabel], seen: Set[str]) -> int:
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            if str(expr) in seen:
+                return TRIPLE_CONSTRAINT_COST
+            seen.add(str(expr))
+            expr = self.cs.tripleExprFor(expr)
+            if expr is None:
+                return TRIPLE_CONSTRAINT_COST
+        if isinstance(expr, ShExJ.TripleConstraint):
+            if expr.valueExpr is None:
+                return TRIPLE_CONSTRAINT_COST
+            # The shapes that a value is evaluated against cost another node each -- we don't look inside them
+            return TRIPLE_CONSTRAINT_COST + (REFERENCE_COST if self.cs.referenced_shapes(expr.valueExpr)
+                                             else NODE_CONSTRAINT_COST)
+        return sum(self._triple_cost(expr2, seen) for expr2 in expr.expressions)
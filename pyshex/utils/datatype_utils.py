@@ -1,5 +1,6 @@
 import re
-from typing import Optional, Tuple, Union
+from functools import lru_cache
+from typing import Optional, Tuple, Union, Pattern
 
 import jsonasobj
 from ShExJSG import ShExJ
@@ -41,8 +42,14 @@ def fraction_digits(n: Literal) -> Optional[int]:
 
 
 def pattern_match(pattern: str, flags: str, val: str) -> bool:
+    return compile_pattern(str(pattern), str(flags) if flags is not None else None).search(val) is not None
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern: str, flags: Optional[str]) -> Pattern:
+    """ Translate an XPath pattern and flags into a compiled python regular expression """
     re_flags, pattern = _map_xpath_flags_to_re(reencode_escapes(pattern), flags)
-    return re.search(pattern, val, flags=re_flags) is not None
+    return re.compile(pattern, flags=re_flags)
 
 
 def reencode_escapes(pattern: str) -> str:
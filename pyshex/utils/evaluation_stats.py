@@ -0,0 +1,103 @@
+"""
+Structured profiling of an evaluation.
+
+:py:class:`DebugContext` traces an evaluation by printing it, which is only useful for a handful of nodes.  An
+:py:class:`EvaluationStats` attached to a :py:class:`Context` (``cntxt.stats``) instead keeps counters for each shape
+label and each TripleConstraint, so that the shapes that dominate the run time of a large schema can be found::
+
+    evaluator = ShExEvaluator(rdf, schema, focus, profile=True)
+    evaluator.evaluate()
+    print(evaluator.stats.report())
+
+Shape times are inclusive -- they cover the shapes that a shape references.  ``self_time`` leaves those out.
+"""
+import time
+from typing import Dict, List, Tuple, Iterable, Iterator, Any, Optional
+
+
+class ShapeStats:
+    """ Counters for one shape label """
+    def __init__(self) -> None:
+        self.evaluations = 0            # Evaluations of (node, shape) pairs
+        self.time = 0.0                 # Seconds spent evaluating, referenced shapes included
+        self.self_time = 0.0            # Seconds spent evaluating, referenced shapes excluded
+        self.cache_hits = 0             # (node, shape) pairs answered by known or cached results
+        self.assumptions = 0            # Recursive references answered by an assumption
+        self.restarts = 0               # Re-evaluations because a value that the evaluation read changed
+        self.partitions = 0             # Partitions (and EXTRA subsets) of the neighbourhood tried
+        self.prefiltered = 0            # Evaluations that failed on the number of arcs alone
+        self.slurp_queries = 0          # SPARQL queries issued while fetching neighbourhoods
+        self.slurp_triples = 0          # Triples fetched
+        self.slurp_time = 0.0           # Seconds spent fetching
+
+
+class ConstraintStats:
+    """ Counters for one TripleConstraint in a shape """
+    def __init__(self) -> None:
+        self.evaluations = 0            # Triples whose value was checked
+        self.cache_hits = 0             # Value checks answered by an earlier check of the same triple
+        self.time = 0.0                 # Seconds spent checking values
+
+
+class EvaluationStats:
+    def __init__(self) -> None:
+        self.shapes: Dict[str, ShapeStats] = {}
+        self.triple_constraints: Dict[Tuple[str, str], ConstraintStats] = {}
+
+        # Shapes being evaluated -- label, start time and time spent in referenced shapes
+        self._stack: List[List[Any]] = []
+
+    def shape(self, label: Optional[str]) -> ShapeStats:
+        label = str(label)
+        rval = self.shapes.get(label)
+        if rval is None:
+            rval = self.shapes[label] = ShapeStats()
+        return rval
+
+    def triple_constraint(self, label: Optional[str], predicate: str, inverse: bool) -> ConstraintStats:
+        key = (str(label), ('^' if inverse else '') + predicate)
+        rval = self.triple_constraints.get(key)
+        if rval is None:
+            rval = self.triple_constraints[key] = ConstraintStats()
+        return rval
+
+    def enter_shape(self, label: Optional[str]) -> None:
+        """ Record the start of an evaluation of label """
+        self.shape(label).evaluations += 1
+        self._stack.append([label, time.perf_counter(), 0.0])
+
+    def exit_shape(self) -> None:
+        """ Record the end of the innermost evaluation """
+        label, start, child_time = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        stats = self.shape(label)
+        stats.time += elapsed
+        stats.self_time += elapsed - child_time
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def partitions(self, partitions: Iterable) -> Iterator:
+        """ Pass partitions through, counting them against the innermost shape """
+        stats = self.shape(self._stack[-1][0] if self._stack else None)
+        for partition in partitions:
+            stats.partitions += 1
+            yield partition
+
+    def as_dict(self) -> Dict[str, Any]:
+        """ Return the counters as plain dictionaries """
+        return dict(shapes={label: dict(vars(stats)) for label, stats in self.shapes.items()},
+                    triple_constraints={f"{label} {predicate}": dict(vars(stats))
+                                        for (label, predicate), stats in self.triple_constraints.items()})
+
+    def report(self, top: int = 20) -> str:
+        """ Return a report of the top shapes and TripleConstraints by time """
+        lines = ["Shapes:",
+                 f"  {'time':>9} {'self':>9} {'evals':>7} {'cached':>7} {'restarts':>8} {'partitions':>10} "
+                 f"{'queries':>7} {'slurp':>9}  shape"]
+        for label, s in sorted(self.shapes.items(), key=lambda e: -e[1].time)[:top]:
+            lines.append(f"  {s.time:9.4f} {s.self_time:9.4f} {s.evaluations:7} {s.cache_hits:7} {s.restarts:8} "
+                         f"{s.partitions:10} {s.slurp_queries:7} {s.slurp_time:9.4f}  {label}")
+        lines += ["Triple constraints:", f"  {'time':>9} {'evals':>7} {'cached':>7}  shape predicate"]
+        for (label, predicate), s in sorted(self.triple_constraints.items(), key=lambda e: -e[1].time)[:top]:
+            lines.append(f"  {s.time:9.4f} {s.evaluations:7} {s.cache_hits:7}  {label} {predicate}")
+        return '\n'.join(lines)
@@ -0,0 +1,87 @@
+"""
+EXTRA resolution for triple expressions that can't be flattened (see :py:mod:`pyshex.utils.bipartite_matcher`).
+
+When the matchables of a shape with EXTRA predicates don't match its expression as a whole, the EXTRA triples have
+to be split between the triples that are matched and the remainder.  Trying every subset of the EXTRA triples is
+exponential in their number -- a node with a couple dozen ``rdf:type`` arcs never finishes.  The resolver cuts this
+down in two steps:
+
+1) A triple that can't satisfy any TripleConstraint in the shape can't be part of a match, so it goes straight to
+   the remainder.
+2) The remaining triples are grouped by predicate and by the set of TripleConstraints they satisfy.  Triples in the
+   same group are interchangeable as far as the expression is concerned, so only the *number* of triples taken from
+   each group matters.  Each combination of counts is evaluated once.
+
+Step 2 assumes that nothing looks at a triple beyond the constraints it satisfies, which semantic actions on a
+TripleConstraint may do.  Shapes with TripleConstraint semantic actions fall back to trying every subset.
+"""
+from itertools import product
+from typing import List, Dict, Iterator
+
+from ShExJSG import ShExJ
+
+from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple, Node
+from pyshex.utils.triple_table import TripleTable, TripleMask, submasks
+
+
+class ExtrasResolver:
+    def __init__(self, table: TripleTable, matched: TripleMask, permutable: TripleMask,
+                 tcs: List[ShExJ.TripleConstraint], focus: Node) -> None:
+        """ Create a resolver for the EXTRA triples of a shape
+
+        :param table: numbered neighbourhood of focus
+        :param matched: triples that must be matched
+        :param permutable: EXTRA triples that may be either matched or left in the remainder
+        :param tcs: TripleConstraints in the shape's expression
+        :param focus: focus node
+        """
+        self.table = table
+        self.matched = matched
+        self.permutable = permutable
+        self.tcs = tcs
+        self.focus = focus
+
+    def evaluate(self, cntxt: Context, expr: ShExJ.tripleExpr) -> bool:
+        """ Determine whether the matched triples along with some subset of the permutable triples match expr.
+        The complete set of triples is assumed to have been tried (and failed) already.
+        """
+        from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import matches
+
+        tried: Dict[TripleMask, bool] = {self.matched | self.permutable: False}
+        for candidate in cntxt.partitions(self._candidates(cntxt)):
+            if candidate not in tried:
+                tried[candidate] = matches(cntxt, self.table.graph(candidate), expr)
+                if tried[candidate]:
+                    return True
+        return False
+
+    def _candidates(self, cntxt: Context) -> Iterator[TripleMask]:
+        """ Generate the sets of triples worth trying, largest first """
+        if any(tc.semActs is not None for tc in self.tcs):
+            for sub in submasks(self.permutable):
+                yield self.matched | sub
+            return
+
+        # Group the triples by the constraints they satisfy, leaving out the triples that satisfy none
+        groups: Dict[tuple, List[int]] = {}
+        for t in self.table.members(self.permutable):
+            signature = tuple(self._matches_tc(cntxt, t, tc) for tc in self.tcs)
+            if any(signature):
+                groups.setdefault((t.p, signature), []).append(1 << self.table.ids[t])
+        members = list(groups.values())
+        for counts in product(*[range(len(bits), -1, -1) for bits in members]):
+            candidate = self.matched
+            for bits, count in zip(members, counts):
+                for bit in bits[:count]:
+                    candidate |= bit
+            yield candidate
+
+    def _matches_tc(self, cntxt: Context, t: RDFTriple, tc: ShExJ.TripleConstraint) -> bool:
+        """ Determine whether t satisfies tc.  Values already checked in this evaluation aren't checked again """
+        from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import matchesTripleConstraint
+
+        if t.p != cntxt.compiled_schema.predicate(tc) or (t.o if tc.inverse else t.s) != self.focus:
+            return False
+        rslt = cntxt.tc_result(t, tc)
+        return matchesTripleConstraint(cntxt, t, tc) if rslt is None else rslt
@@ -0,0 +1,54 @@
+"""
+The part of the graph that an evaluation depends on.
+
+Evaluation is deterministic: it only looks at the graph through the neighbourhoods that :py:func:`satisfiesShape`
+reads -- the arcs out and arcs in of a node for the predicates of the shape (every arc out for a CLOSED shape) --
+and the focus node presence test in :py:func:`isValid`.  If none of the arcs that a verdict read have changed, the
+verdict can't have changed either.  A :py:class:`Footprint` attached to a :py:class:`Context` (``cntxt.footprint``)
+records those reads as ``(node, is_out, predicate)`` entries, where a predicate of ``None`` stands for every arc in
+that direction.
+"""
+from typing import Set, Tuple, Optional, Iterator, Iterable
+
+from rdflib import URIRef
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node, RDFTriple
+from pyshex.utils.compiled_schema import CompiledShape
+
+FootprintEntry = Tuple[Node, bool, Optional[URIRef]]
+
+
+class Footprint:
+    def __init__(self, entries: Iterable[FootprintEntry] = ()) -> None:
+        self.entries: Set[FootprintEntry] = set(entries)
+
+    def __iter__(self) -> Iterator[FootprintEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def read_node(self, n: Node) -> None:
+        """ Record that every arc into and out of n was read """
+        self.entries.add((n, True, None))
+        self.entries.add((n, False, None))
+
+    def read_arcs(self, n: Node, p: URIRef, is_out: bool = True) -> None:
+        """ Record that the arcs out of (or into) n with predicate p were read """
+        self.entries.add((n, is_out, p))
+
+    def read_shape(self, n: Node, cshape: CompiledShape) -> None:
+        """ Record the neighbourhood of n that the evaluation of cshape reads """
+        if cshape.closed:
+            self.entries.add((n, True, None))
+        for p, direction in cshape.predicates.items():
+            if direction.is_fwd and not cshape.closed:
+                self.entries.add((n, True, p))
+            if direction.is_rev:
+                self.entries.add((n, False, p))
+
+
+def affected_entries(t: RDFTriple) -> Tuple[FootprintEntry, ...]:
+    """ Return the footprint entries that adding or removing t changes """
+    s, p, o = t
+    return (s, True, p), (s, True, None), (o, False, p), (o, False, None)
@@ -5,8 +5,10 @@ from ShExJSG.ShExJ import IRIREF
 
 from pyshex.shape_expressions_language.p5_context import Context
 from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFGraph
+from pyshex.utils.neighbourhood import group_by_predicate
 from pyshex.utils.partitions import partition_t
 from pyshex.utils.schema_utils import predicates_in_tripleexpr
+from pyshex.utils.value_set_utils import iriref_to_uriref
 
 
 class EachOfEvaluator:
@@ -35,14 +37,15 @@ class EachOfEvaluator:
         self.expression_num_predicates: List[Set[IRIREF]] = []
         self.predicate_graph: Dict[IRIREF, RDFGraph] = {}
 
-        for e in expr.expressions:
+        by_predicate = group_by_predicate(T)
+        for e in cntxt.component_order.each_of(cntxt, expr.expressions):
             expr_num = len(self.expressions)
             self.expressions.append(e)
             self.expression_num_predicates.append(predicates_in_tripleexpr(e, cntxt))
             for p in self.expression_num_predicates[expr_num]:
                 self.predicate_to_expression_nums.setdefault(p, []).append(expr_num)
                 if p not in self.predicate_graph:
-                    self.predicate_graph[p] = RDFGraph([t for t in T if str(t.p) == str(p)])
+                    self.predicate_graph[p] = by_predicate.get(iriref_to_uriref(p), RDFGraph())
 
     def evaluate(self, cntxt: Context) -> bool:
         from pyshex.shape_expressions_language.p5_5_shapes_and_triple_expressions import matches
@@ -56,7 +59,7 @@ class EachOfEvaluator:
                 else:
                     # Case 2: several expressions match exactly one predicate -- split the triples
                     successful_combination = False
-                    for partition in partition_t(self.predicate_graph[p], len(expr_nums)):
+                    for partition in cntxt.partitions(partition_t(self.predicate_graph[p], len(expr_nums))):
                         if all(matches(cntxt, t, self.expressions[e_num]) for t, e_num in zip(partition, expr_nums)):
                             successful_combination = True
                             break
@@ -82,8 +85,8 @@ class EachOfEvaluator:
                         target = RDFGraph()
                         for predicate in predicates:
                             target.update(self.predicate_graph[predicate])
-                        successful_combination = True
-                        for partition in partition_t(target, len(expressions)):
+                        successful_combination = False
+                        for partition in cntxt.partitions(partition_t(target, len(expressions))):
                             if all(matches(cntxt, t, self.expressions[e_num])
                                    for t, e_num in zip(partition, expressions)):
                                 successful_combination = True
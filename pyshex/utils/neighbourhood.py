@@ -0,0 +1,105 @@
+"""
+The neighbourhood of a node -- its arcs out and arcs in, grouped by predicate.
+
+Shape evaluation needs the triples for a handful of predicates, the complete set of arcs out (CLOSED shapes) and
+the triples for the EXTRA predicates.  Rather than asking the graph for each of these separately, the arcs are
+fetched once per node and indexed by predicate, so every subsequent lookup is a dictionary access.  Every arc is
+also numbered in the neighbourhood's :py:class:`TripleTable`, so that sets of arcs can be combined as bitsets.
+
+For SPARQL graphs a complete fetch of the arcs in can be enormous, so arcs in are always fetched a predicate at a
+time there.  Arcs out are fetched a predicate at a time when the context isn't over-slurping.
+"""
+from typing import Dict, List, Iterable
+
+from rdflib import Graph, URIRef
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node, RDFTriple, RDFGraph
+from pyshex.utils.triple_table import TripleTable, TripleMask
+
+
+class Neighbourhood:
+    """ arcsOut(G, n) and arcsIn(G, n), indexed by predicate and fetched at most once """
+    def __init__(self, g: Graph, n: Node, all_out: bool = True, all_in: bool = True) -> None:
+        """
+        :param g: graph containing n
+        :param n: node
+        :param all_out: True means fetch every arc out on first use, False means fetch them a predicate at a time
+        :param all_in: True means fetch every arc in on first use, False means fetch them a predicate at a time
+        """
+        self.g = g
+        self.n = n
+        self.table = TripleTable()
+        self._out: Dict[URIRef, List[RDFTriple]] = {}
+        self._in: Dict[URIRef, List[RDFTriple]] = {}
+        self._out_masks: Dict[URIRef, TripleMask] = {}
+        self._in_masks: Dict[URIRef, TripleMask] = {}
+        self._out_complete = False
+        self._in_complete = False
+        self._all_out = all_out
+        self._all_in = all_in
+
+    def outs(self, p: URIRef) -> List[RDFTriple]:
+        """ Return the triples in arcsOut(G, n) with predicate p """
+        if not self._out_complete:
+            if self._all_out:
+                self._fetch_all_out()
+            elif p not in self._out:
+                self._out[p] = [RDFTriple(t) for t in self.g.triples((self.n, p, None))]
+                self._out_masks[p] = self.table.add(self._out[p])
+        return self._out.get(p, [])
+
+    def ins(self, p: URIRef) -> List[RDFTriple]:
+        """ Return the triples in arcsIn(G, n) with predicate p """
+        if not self._in_complete:
+            if self._all_in:
+                self._in_complete = True
+                self._group(self._in, self._in_masks, self.g.triples((None, None, self.n)))
+            elif p not in self._in:
+                self._in[p] = [RDFTriple(t) for t in self.g.triples((None, p, self.n))]
+                self._in_masks[p] = self.table.add(self._in[p])
+        return self._in.get(p, [])
+
+    def out_mask(self, p: URIRef) -> TripleMask:
+        """ Return the triples in arcsOut(G, n) with predicate p as a mask over :py:attr:`table` """
+        self.outs(p)
+        return self._out_masks.get(p, 0)
+
+    def in_mask(self, p: URIRef) -> TripleMask:
+        """ Return the triples in arcsIn(G, n) with predicate p as a mask over :py:attr:`table` """
+        self.ins(p)
+        return self._in_masks.get(p, 0)
+
+    def arcs_out_mask(self) -> TripleMask:
+        """ Return all of arcsOut(G, n) as a mask over :py:attr:`table` """
+        self.arcs_out()
+        mask = 0
+        for m in self._out_masks.values():
+            mask |= m
+        return mask
+
+    def arcs_out(self) -> Dict[URIRef, List[RDFTriple]]:
+        """ Return all of arcsOut(G, n), grouped by predicate """
+        if not self._out_complete:
+            self._fetch_all_out()
+        return self._out
+
+    def _fetch_all_out(self) -> None:
+        self._out = {}
+        self._out_masks = {}
+        self._out_complete = True
+        self._group(self._out, self._out_masks, self.g.triples((self.n, None, None)))
+
+    def _group(self, groups: Dict[URIRef, List[RDFTriple]], masks: Dict[URIRef, TripleMask], triples: Iterable) \
+            -> None:
+        for t in triples:
+            groups.setdefault(t[1], []).append(RDFTriple(t))
+        for p, ts in groups.items():
+            masks[p] = self.table.add(ts)
+
+
+def group_by_predicate(T: Iterable[RDFTriple]) -> Dict[URIRef, RDFGraph]:
+    """ Partition T by predicate """
+    rval: Dict[URIRef, RDFGraph] = {}
+    for t in T:
+        rval.setdefault(t.p, RDFGraph()).add(t)
+    return rval
@@ -3,9 +3,10 @@ Partition utilities -
 taken from `Stack Overflow <https://stackoverflow.com/questions/19368375/set-partitions-in-python>`_
 """
 from itertools import permutations
-from typing import List, Iterator, Tuple, Set
+from typing import List, Iterator, Tuple, Set, Dict
 
 from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFGraph
+from pyshex.utils.triple_table import TripleTable, TripleMask
 
 
 def algorithm_u(ns, m):
@@ -148,19 +149,25 @@ def partition_t(T: RDFGraph, nparts: int) -> Iterator[Tuple[RDFGraph, ...]]:
     :return: Iterator that returns partitions
 
     We don't actually partition the triples directly -- instead, we partition a set of integers that
-    reference elements in the (ordered) set and return those
+    reference elements in the (ordered) set and return those.  The same part turns up in many partitions, so each
+    distinct part is materialized as an RDFGraph only once.  The returned graphs are shared and must not be modified.
     """
     def partition_map(partition: List[List[int]]) -> Tuple[RDFGraph, ...]:
-        rval: List[RDFGraph, ...] = []
+        rval: List[RDFGraph] = []
         for part in partition:
-            if len(part) == 1 and part[0] >= t_list_len:
-                rval.append(RDFGraph())
-            else:
-                rval.append(RDFGraph([t_list[e] for e in part if e < t_list_len]))
+            mask = 0
+            for e in part:
+                if e < t_list_len:
+                    mask |= 1 << e
+            graph = graphs.get(mask)
+            if graph is None:
+                graph = graphs[mask] = table.graph(mask)
+            rval.append(graph)
         return tuple(rval)
 
-    t_list = sorted(list(T))      # Sorted not strictly necessary, but aids testing
-    t_list_len = len(t_list)
+    table = TripleTable(sorted(list(T)))      # Sorted not strictly necessary, but aids testing
+    t_list_len = len(table)
+    graphs: Dict[TripleMask, RDFGraph] = {}
     return map(lambda partition: partition_map(partition), filtered_integer_partition(t_list_len, nparts))
 
 
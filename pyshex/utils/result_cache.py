@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Tuple, Optional
+
+from ShExJSG import ShExJ
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node
+
+ResultKey = Tuple[Node, ShExJ.shapeExprLabel]
+
+
+class ResultCache:
+    """ A bounded (node, shape label) -> result cache that outlives a single focus evaluation.
+
+    The context only stores results that were reached without any recursive assumptions outstanding, so every
+    entry holds for the graph and schema as a whole.  The owner is responsible for discarding the cache when
+    either of them changes.
+    """
+    def __init__(self, max_size: int = 10000) -> None:
+        """
+        :param max_size: maximum number of entries.  The least recently used entry is dropped beyond this
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results: "OrderedDict[ResultKey, bool]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: ResultKey) -> Optional[bool]:
+        """ Return the cached result for key, or None if we haven't seen it """
+        rslt = self._results.get(key)
+        if rslt is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._results.move_to_end(key)
+        return rslt
+
+    def put(self, key: ResultKey, result: bool) -> None:
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
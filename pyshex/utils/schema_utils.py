@@ -17,6 +17,9 @@ def reference_of(selector: shapeLabel, cntxt: Union[Context, ShExJ.Schema] ) ->
     schema = cntxt.schema if isinstance(cntxt, Context) else cntxt
     if selector is START:
         return schema.start
+    if isinstance(cntxt, Context):
+        expr = cntxt.shapeExprFor(selector)
+        return expr if expr is not None and not isinstance(expr, ShExJ.ShapeExternal) else None
     for expr in schema.shapes:
         if not isinstance(expr, ShExJ.ShapeExternal) and expr.id == selector:
             return expr
@@ -25,15 +28,7 @@ def reference_of(selector: shapeLabel, cntxt: Union[Context, ShExJ.Schema] ) ->
 
 def triple_reference_of(label: ShExJ.tripleExprLabel, cntxt: Context) -> Optional[ShExJ.tripleExpr]:
     """ Search for the label in a Schema """
-    te: Optional[ShExJ.tripleExpr] = None
-    if cntxt.schema.start is not None:
-        te = triple_in_shape(cntxt.schema.start, label, cntxt)
-    if te is None:
-        for shapeExpr in cntxt.schema.shapes:
-            te = triple_in_shape(shapeExpr, label, cntxt)
-            if te:
-                break
-    return te
+    return cntxt.tripleExprFor(label)
 
 
 def triple_in_shape(expr: ShExJ.shapeExpr, label: ShExJ.tripleExprLabel, cntxt: Context) \
@@ -55,6 +50,12 @@ def triple_in_shape(expr: ShExJ.shapeExpr, label: ShExJ.tripleExprLabel, cntxt:
 
 
 def triple_constraints_in_expression(expression: ShExJ.shapeExpr, cntxt: Context) -> List[ShExJ.TripleConstraint]:
+    return list(cntxt.compiled_schema.analysis('triple_constraints_in_expression', expression,
+                                               lambda: _triple_constraints_in_expression(expression, cntxt)))
+
+
+def _triple_constraints_in_expression(expression: ShExJ.shapeExpr, cntxt: Context) \
+        -> List[ShExJ.TripleConstraint]:
     tes: List[ShExJ.TripleConstraint] = []
 
     def triple_expr_visitor(tes: List[ShExJ.TripleConstraint], expr: ShExJ.TripleConstraint, _: Context) -> None:
@@ -91,12 +92,17 @@ class PredDirection:
 
 def directed_predicates_in_expression(expression: ShExJ.shapeExpr, cntxt: Context) -> Dict[IRIREF, PredDirection]:
     """ Directed predicates in expression -- return all predicates in shapeExpr along with which direction(s) they
-    evaluate
+    evaluate.  The analysis is done once per expression and schema.
 
     :param expression: Expression to scan
     :param cntxt:
     :return:
     """
+    return dict(cntxt.compiled_schema.analysis('directed_predicates_in_expression', expression,
+                                               lambda: _directed_predicates_in_expression(expression, cntxt)))
+
+
+def _directed_predicates_in_expression(expression: ShExJ.shapeExpr, cntxt: Context) -> Dict[IRIREF, PredDirection]:
     dir_predicates: Dict[IRIREF, PredDirection] = {}
 
     def predicate_finder(predicates: Dict[IRIREF, PredDirection], tc: ShExJ.TripleConstraint, _: Context) -> None:
@@ -113,6 +119,11 @@ def directed_predicates_in_expression(expression: ShExJ.shapeExpr, cntxt: Contex
 
 
 def predicates_in_tripleexpr(expression: ShExJ.tripleExpr, cntxt: Context) -> Set[IRIREF]:
+    return set(cntxt.compiled_schema.analysis('predicates_in_tripleexpr', expression,
+                                              lambda: _predicates_in_tripleexpr(expression, cntxt)))
+
+
+def _predicates_in_tripleexpr(expression: ShExJ.tripleExpr, cntxt: Context) -> Set[IRIREF]:
     predicates: Set[IRIREF] = set()
 
     def triple_expr_visitor(predicates: Set[IRIREF], expr: ShExJ.tripleExpr, cntxt_: Context) -> None:
@@ -0,0 +1,154 @@
+"""
+Persistent, on-disk cache for :py:class:`SlurpyGraph` fetches.
+
+The slurper only remembers what it has fetched for the lifetime of the graph, so every validation run starts from
+scratch and pays one HTTP request per neighbourhood.  :py:class:`SlurpCache` records the triples returned for each
+query pattern in an SQLite file, keyed by endpoint, graph name and pattern, along with the time they were fetched.
+A graph created with a cache (see :py:func:`pyshex.user_agent.SlurpyGraphWithAgent`) looks each pattern up before
+going to the endpoint.  A pattern with a subject is also satisfied by a cached fetch of all of the subject's arcs out.
+
+Entries older than the cache's ``ttl`` are ignored (and replaced when the pattern is fetched again).  The cache is
+only opened when it is first used, so a graph that carries one can be shipped to worker processes.
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple, List, Any, Iterable
+
+from rdflib import URIRef, BNode, Literal, Graph
+from sparqlslurper import SlurpyGraph, GraphDBSlurpyGraph
+from sparqlslurper._slurpygraph import QueryTriple
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple
+
+
+class SlurpCache:
+    def __init__(self, path: str, ttl: Optional[float] = None) -> None:
+        """ Create a cache
+
+        :param path: name of the SQLite file.  Created if it doesn't exist
+        :param ttl: number of seconds that an entry remains valid.  None means entries never expire
+        """
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = state['_pid'] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._pid = os.getpid()
+            self._conn.execute("CREATE TABLE IF NOT EXISTS slurps (endpoint TEXT, graph TEXT, pattern TEXT, "
+                               "fetched REAL, triples TEXT, PRIMARY KEY (endpoint, graph, pattern))")
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, g: SlurpyGraph, pattern: QueryTriple) -> Optional[Tuple[QueryTriple, List[RDFTriple]]]:
+        """ Return the cached triples for pattern, or None if there aren't any that are still valid
+
+        :param g: graph being fetched into
+        :param pattern: `(s, p, o)` tuple, with `None` as wild cards
+        :return: pattern that was actually cached (pattern or the subject's arcs out) and its triples
+        """
+        keys = [pattern]
+        if pattern[0] is not None and pattern[1:] != (None, None):
+            keys.append((pattern[0], None, None))
+        for key in keys:
+            row = self.conn.execute("SELECT fetched, triples FROM slurps WHERE endpoint=? AND graph=? AND pattern=?",
+                                    self._key(g, key)).fetchone()
+            if row is not None and (self.ttl is None or time.time() - row[0] <= self.ttl):
+                self.hits += 1
+                return key, [RDFTriple(tuple(_decode(e) for e in t)) for t in json.loads(row[1])]
+        self.misses += 1
+        return None
+
+    def store(self, g: SlurpyGraph, pattern: QueryTriple, triples: Iterable[RDFTriple]) -> None:
+        """ Record the triples that the endpoint returned for pattern
+
+        :param g: graph that was fetched into
+        :param pattern: `(s, p, o)` tuple, with `None` as wild cards
+        :param triples: triples matching pattern
+        """
+        self.conn.execute("INSERT OR REPLACE INTO slurps VALUES (?, ?, ?, ?, ?)",
+                          self._key(g, pattern) +
+                          (time.time(), json.dumps([[_encode(e) for e in t] for t in triples])))
+        self.conn.commit()
+
+    def purge(self) -> int:
+        """ Remove the entries that have expired
+
+        :return: number of entries removed
+        """
+        if self.ttl is None:
+            return 0
+        n = self.conn.execute("DELETE FROM slurps WHERE fetched < ?", (time.time() - self.ttl,)).rowcount
+        self.conn.commit()
+        return n
+
+    def clear(self) -> None:
+        """ Remove every entry """
+        self.conn.execute("DELETE FROM slurps")
+        self.conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _key(g: SlurpyGraph, pattern: QueryTriple) -> Tuple[str, str, str]:
+        return g.sparql.endpoint, json.dumps(g.graph_name), json.dumps([_encode(e) for e in pattern])
+
+
+def _encode(e: Any) -> Optional[List[Optional[str]]]:
+    if e is None:
+        return None
+    if isinstance(e, Literal):
+        return ['l', str(e), str(e.datatype) if e.datatype else None, e.language]
+    return ['b' if isinstance(e, BNode) else 'u', str(e)]
+
+
+def _decode(e: List[Optional[str]]) -> Any:
+    if e[0] == 'l':
+        return Literal(e[1], datatype=e[2], lang=e[3])
+    return BNode(e[1]) if e[0] == 'b' else URIRef(e[1])
+
+
+class CachedSlurpyGraph(SlurpyGraph):
+    """ A :py:class:`SlurpyGraph` that consults a :py:class:`SlurpCache` before going to the endpoint """
+    slurp_cache: Optional[SlurpCache] = None
+
+    def triples(self, pattern: QueryTriple):
+        if self.slurp_cache is None or self.already_resolved(pattern) or self.load_cached(pattern):
+            return super().triples(pattern)
+        rval = super().triples(pattern)
+        self.slurp_cache.store(self, pattern, [RDFTriple(t) for t in Graph.triples(self, pattern)])
+        return rval
+
+    def load_cached(self, pattern: QueryTriple) -> bool:
+        """ Load the cached triples for pattern, if any, and mark them as resolved
+
+        :param pattern: `(s, p, o)` tuple, with `None` as wild cards
+        :return: True if pattern was found in the cache
+        """
+        cached = self.slurp_cache.lookup(self, pattern) if self.slurp_cache is not None else None
+        if cached is None:
+            return False
+        key, triples = cached
+        for t in triples:
+            self.add(t)
+        self.resolved_nodes.append(key)
+        return True
+
+
+class CachedGraphDBSlurpyGraph(CachedSlurpyGraph, GraphDBSlurpyGraph):
+    pass
@@ -13,19 +13,27 @@ class slurper(AbstractContextManager):
 
     def __init__(self, cntxt: Context, n: Node, S: ShExJ.Shape):
         self.graph: SlurpyGraph = cntxt.graph
-        self.tracing = isinstance(self.graph, SlurpyGraph) and cntxt.debug_context.trace_slurps
+        is_sparql = isinstance(self.graph, SlurpyGraph)
+        self.tracing = is_sparql and cntxt.debug_context.trace_slurps
+        self.stats = cntxt.stats.shape(S.id) if is_sparql and cntxt.stats is not None else None
         self.n = n
         self.S = S
 
     def __enter__(self) -> Graph:
-        if self.tracing:
+        if self.tracing or self.stats is not None:
+            self.g_queries = self.graph.total_queries
             self.g_triples = self.graph.total_triples
             self.g_time = self.graph.total_slurptime
+        if self.tracing:
             print(f"# ← <{self.n}>@{self.S.id} ", end="")
             sys.stdout.flush()
         return self.graph
 
     def __exit__(self, exctype, excinst, exctb):
+        if self.stats is not None:
+            self.stats.slurp_queries += self.graph.total_queries - self.g_queries
+            self.stats.slurp_triples += self.graph.total_triples - self.g_triples
+            self.stats.slurp_time += self.graph.total_slurptime - self.g_time
         if self.tracing:
             new_triples = self.graph.total_triples - self.g_triples
             if new_triples:
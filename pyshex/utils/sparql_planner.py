@@ -0,0 +1,189 @@
+"""
+Schema-driven SPARQL fetches for :py:class:`SlurpyGraph`.
+
+The slurper either pulls every arc out of a node (over-slurping) or issues one query per predicate.  The first
+fetches data that the shape never looks at, the second needs as many round trips as the shape has predicates.  The
+planner uses the compiled shape to fetch exactly the triples that the shape needs -- the arcs out and arcs in for
+its predicates -- in a single query per node or batch of nodes::
+
+    SELECT ?s ?p ?o {
+        {VALUES ?s {<n1> <n2>} VALUES ?p {<p1> <p2>} ?s ?p ?o}
+        UNION {VALUES ?o {<n1> <n2>} VALUES ?p {<r1>} ?s ?p ?o}
+        UNION {VALUES ?n {<n1> <n2>} ?n <p2> ?s . VALUES ?p {<q1>} ?s ?p ?o}
+    }
+
+The last branch fetches the arcs out of the nodes reached through a predicate whose value is a shape reference,
+restricted to the predicates of the referenced shapes, so one level of references is warm as well.  CLOSED shapes
+need every arc out, so their branches aren't restricted by predicate.
+
+Everything that a query fetches is marked as resolved in the slurper, which then answers the evaluator's own
+requests from its cache.
+"""
+import time
+from typing import Dict, Optional, Set, List, Iterable, Tuple
+
+from ShExJSG import ShExJ
+from rdflib import URIRef, BNode, Graph
+from sparqlslurper import SlurpyGraph
+from sparqlslurper._slurpygraph import QueryTriple
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.slurp_cache import CachedSlurpyGraph
+from pyshex.utils.sparql_prefetch import QueryFunction
+
+
+class FetchPlan:
+    """ The part of a focus node's neighbourhood that the evaluation of a shape needs """
+    def __init__(self) -> None:
+        self.all_out = False                        # Every arc out is needed (CLOSED shapes)
+        self.fwd: Set[URIRef] = set()               # Predicates of the arcs out
+        self.rev: Set[URIRef] = set()               # Predicates of the arcs in
+
+        # Referenced shapes -- predicate to the predicates of the arcs out of the nodes it reaches.  None means
+        # every arc out
+        self.refs: Dict[URIRef, Optional[Set[URIRef]]] = {}
+
+    def __bool__(self) -> bool:
+        return self.all_out or bool(self.fwd) or bool(self.rev)
+
+
+class SPARQLPlanner:
+    def __init__(self, cs: CompiledSchema, query: Optional[QueryFunction] = None,
+                 follow_references: bool = True) -> None:
+        """ Create a planner for the shapes in cs
+
+        :param cs: compiled schema
+        :param query: function that runs a query.  Default: the slurper's own SPARQLWrapper
+        :param follow_references: True means fetch one level of referenced shapes along with the focus nodes
+        """
+        self.cs = cs
+        self.query = query
+        self.follow_references = follow_references
+
+    def plan(self, S: ShExJ.Shape) -> FetchPlan:
+        """ Return the fetch plan for S """
+        return self.cs.analysis('fetch_plan', S, lambda: self._plan(S))
+
+    def fetch(self, g: SlurpyGraph, nodes: Iterable[Node], S: ShExJ.Shape) -> int:
+        """ Load the triples that the evaluation of S needs for each of nodes into g.  Only the parts of the plan
+        that g hasn't already resolved are fetched.
+
+        :param g: slurper graph
+        :param nodes: focus nodes
+        :param S: shape that the nodes will be evaluated against
+        :return: number of queries issued (0 or 1)
+        """
+        nodes, plan = self._unresolved(g, [n for n in dict.fromkeys(nodes) if isinstance(n, URIRef)], self.plan(S))
+        if not nodes:
+            return 0
+        query = self.query_text(g, nodes, plan)
+        start = time.time()
+        resp = self.query(query) if self.query is not None else self._endpoint_query(g, query)
+        elapsed = time.time() - start
+        bindings = resp['results']['bindings']
+        for row in bindings:
+            g.add((g._map_type(row['s'], row.get('sid')), g._map_type(row['p']),
+                   g._map_type(row['o'], row.get('oid'))))
+
+        resolved = self._patterns(g, nodes, plan)
+        g.resolved_nodes += resolved
+        if isinstance(g, CachedSlurpyGraph) and g.slurp_cache is not None:
+            for pattern in resolved:
+                g.slurp_cache.store(g, pattern, Graph.triples(g, pattern))
+        g.total_slurptime += elapsed
+        g.total_queries += 1
+        g.total_triples += len(bindings)
+        if g.debug_slurps:
+            print(f"SPARQL: ({query}) ({round(elapsed, 2)} secs) - {len(bindings)} triples")
+        return 1
+
+    def query_text(self, g: SlurpyGraph, nodes: List[URIRef], plan: FetchPlan) -> str:
+        """ Return the query that fetches plan for nodes """
+        values = ' '.join(f"<{n}>" for n in nodes)
+        branches = []
+        if plan.all_out:
+            branches.append(f"VALUES ?s {{{values}}} ?s ?p ?o")
+        elif plan.fwd:
+            branches.append(f"VALUES ?s {{{values}}} VALUES ?p {{{_values(plan.fwd)}}} ?s ?p ?o")
+        if plan.rev:
+            branches.append(f"VALUES ?o {{{values}}} VALUES ?p {{{_values(plan.rev)}}} ?s ?p ?o")
+        if self.follow_references:
+            for p, qs in sorted(plan.refs.items()):
+                branches.append(f"VALUES ?n {{{values}}} ?n <{p}> ?s . " +
+                                (f"VALUES ?p {{{_values(qs)}}} " if qs is not None else "") + "?s ?p ?o")
+        pattern = ' UNION '.join(f"{{{branch}}}" for branch in branches)
+        if g.graph_name is not None:
+            pattern = f"graph {g.graph_name if g.graph_name else '?g'} {{{pattern}}}"
+        return f"SELECT ?s ?p ?o {{{pattern}}}"
+
+    def _plan(self, S: ShExJ.Shape) -> FetchPlan:
+        cshape = self.cs.shape(S)
+        plan = FetchPlan()
+        plan.all_out = cshape.closed
+        for p, direction in cshape.predicates.items():
+            if direction.is_fwd:
+                plan.fwd.add(p)
+            if direction.is_rev:
+                plan.rev.add(p)
+        for tc in cshape.triple_constraints:
+            if not tc.inverse and tc.valueExpr is not None:
+                p = self.cs.predicate(tc)
+                for S2 in self.cs.referenced_shapes(tc.valueExpr):
+                    cshape2 = self.cs.shape(S2)
+                    if cshape2.closed or (p in plan.refs and plan.refs[p] is None):
+                        plan.refs[p] = None
+                    else:
+                        qs = {q for q, direction in cshape2.predicates.items() if direction.is_fwd}
+                        if qs:
+                            plan.refs.setdefault(p, set()).update(qs)
+        return plan
+
+    def _unresolved(self, g: SlurpyGraph, nodes: List[URIRef], plan: FetchPlan) -> Tuple[List[URIRef], FetchPlan]:
+        """ Reduce nodes and plan to the parts that g hasn't resolved yet (or can load from its slurp cache) """
+        def needed(pattern: QueryTriple) -> bool:
+            return not g.already_resolved(pattern) and \
+                not (isinstance(g, CachedSlurpyGraph) and g.load_cached(pattern))
+
+        rval_nodes: List[URIRef] = []
+        rval = FetchPlan()
+        for n in nodes:
+            node_plan = FetchPlan()
+            node_plan.all_out = plan.all_out and needed((n, None, None))
+            if not plan.all_out:
+                node_plan.fwd = {p for p in plan.fwd if needed((n, p, None))}
+            node_plan.rev = {p for p in plan.rev if needed((None, p, n))}
+            if node_plan:
+                rval_nodes.append(n)
+                rval.all_out = rval.all_out or node_plan.all_out
+                rval.fwd |= node_plan.fwd
+                rval.rev |= node_plan.rev
+        if rval.all_out:
+            rval.fwd = set()
+        # References are only followed from the arcs out that are being fetched
+        rval.refs = {p: qs for p, qs in plan.refs.items() if rval.all_out or p in rval.fwd}
+        return rval_nodes, rval
+
+    def _patterns(self, g: SlurpyGraph, nodes: List[URIRef], plan: FetchPlan) -> List[QueryTriple]:
+        """ Return the patterns that were fetched for plan """
+        rval: List[QueryTriple] = []
+        for n in nodes:
+            if plan.all_out:
+                rval.append((n, None, None))
+            rval += [(n, p, None) for p in plan.fwd]
+            rval += [(None, p, n) for p in plan.rev]
+            if self.follow_references:
+                for p, qs in plan.refs.items():
+                    for _, _, o in Graph.triples(g, (n, p, None)):
+                        if isinstance(o, (URIRef, BNode)):
+                            rval += [(o, None, None)] if qs is None else [(o, q, None) for q in qs]
+        return rval
+
+    @staticmethod
+    def _endpoint_query(g: SlurpyGraph, query: str) -> Dict:
+        g.sparql.setQuery(query)
+        return g.sparql.query().convert()
+
+
+def _values(predicates: Iterable[URIRef]) -> str:
+    return ' '.join(f"<{p}>" for p in sorted(predicates))
@@ -0,0 +1,132 @@
+"""
+Batched, concurrent neighbourhood prefetch for :py:class:`SlurpyGraph`.
+
+The slurper fetches a node's arcs out the first time the evaluator asks for them, so validating against a remote
+endpoint costs one blocking round trip per node and the nodes are visited strictly depth first.  The prefetcher
+loads the arcs out of a whole batch of nodes ahead of time::
+
+    SELECT ?s ?p ?o {VALUES ?s {<n1> <n2> ...} ?s ?p ?o}
+
+with several batches in flight at once.  The results go into the slurper's cache and the nodes are marked as
+resolved, so the (synchronous) evaluator then runs against warm data.  Graphs with a persistent
+:py:class:`SlurpCache` are loaded from it where possible and the fetched neighbourhoods are recorded in it.
+Optionally, the objects reached through a given set of predicates -- the frontier of nodes that the evaluation will
+visit next -- are prefetched as well.
+"""
+import asyncio
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from SPARQLWrapper import SPARQLWrapper, JSON
+from rdflib import URIRef
+from sparqlslurper import SlurpyGraph
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node, RDFTriple
+from pyshex.utils.slurp_cache import CachedSlurpyGraph
+
+# Runs a SPARQL SELECT and returns the result in SPARQL 1.1 JSON results format
+QueryFunction = Callable[[str], Dict]
+
+
+class NeighbourhoodPrefetcher:
+    def __init__(self, g: SlurpyGraph, batch_size: int = 50, concurrency: int = 4,
+                 query: Optional[QueryFunction] = None) -> None:
+        """ Create a prefetcher for g
+
+        :param g: slurper graph to load
+        :param batch_size: number of nodes per query
+        :param concurrency: maximum number of queries in flight
+        :param query: function that runs a query.  Default: a SPARQLWrapper request to g's endpoint
+        """
+        self.g = g
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.query = query if query is not None else self._endpoint_query
+
+    def prefetch(self, nodes: Iterable[Node], follow: Iterable[URIRef] = (), depth: int = 0) -> int:
+        """ Load the arcs out of nodes into the slurper's cache.  Use :py:meth:`prefetch_async` from code that is
+        already running in an event loop.
+
+        :param nodes: nodes to load
+        :param follow: predicates whose objects are prefetched as well
+        :param depth: number of times to follow the predicates
+        :return: number of nodes loaded
+        """
+        return asyncio.run(self.prefetch_async(nodes, follow, depth))
+
+    async def prefetch_async(self, nodes: Iterable[Node], follow: Iterable[URIRef] = (), depth: int = 0) -> int:
+        follow = set(follow)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        nloaded = 0
+        frontier = self._unresolved(nodes)
+        while frontier:
+            batches = [frontier[i:i + self.batch_size] for i in range(0, len(frontier), self.batch_size)]
+            await asyncio.gather(*[self._fetch(batch, semaphore) for batch in batches])
+            nloaded += len(frontier)
+            if depth <= 0 or not follow:
+                break
+            depth -= 1
+            frontier = self._unresolved(o for s in frontier for p in follow for o in self.g.objects(s, p))
+        return nloaded
+
+    def _unresolved(self, nodes: Iterable[Node]) -> List[URIRef]:
+        """ Return the IRIs in nodes whose arcs out haven't been loaded, in order and without duplicates """
+        rval: List[URIRef] = []
+        seen: Set[URIRef] = set()
+        for n in nodes:
+            if isinstance(n, URIRef) and n not in seen:
+                seen.add(n)
+                if not self.g.already_resolved((n, None, None)) and not self._load_cached(n):
+                    rval.append(n)
+        return rval
+
+    def _load_cached(self, n: URIRef) -> bool:
+        return isinstance(self.g, CachedSlurpyGraph) and self.g.load_cached((n, None, None))
+
+    async def _fetch(self, batch: List[URIRef], semaphore: asyncio.Semaphore) -> None:
+        query = self.query_text(batch)
+        async with semaphore:
+            start = time.time()
+            resp = await asyncio.get_running_loop().run_in_executor(None, self.query, query)
+            elapsed = time.time() - start
+
+        # The graph is only updated from the event loop's thread
+        bindings = resp['results']['bindings']
+        arcs_out: Dict[URIRef, List[RDFTriple]] = {n: [] for n in batch}
+        for row in bindings:
+            t = RDFTriple((self.g._map_type(row['s'], row.get('sid')),
+                           self.g._map_type(row['p']),
+                           self.g._map_type(row['o'], row.get('oid'))))
+            self.g.add(t)
+            arcs_out.setdefault(t.s, []).append(t)
+        if isinstance(self.g, CachedSlurpyGraph) and self.g.slurp_cache is not None:
+            for n in batch:
+                self.g.slurp_cache.store(self.g, (n, None, None), arcs_out[n])
+        self.g.resolved_nodes += [(n, None, None) for n in batch]
+        self.g.total_slurptime += elapsed
+        self.g.total_queries += 1
+        self.g.total_triples += len(bindings)
+        if self.g.debug_slurps:
+            print(f"SPARQL: ({query}) ({round(elapsed, 2)} secs) - {len(bindings)} triples")
+
+    def query_text(self, batch: List[URIRef]) -> str:
+        """ Return the query that fetches the arcs out of the nodes in batch """
+        values = ' '.join(f"<{n}>" for n in batch)
+        pattern = f"VALUES ?s {{{values}}} ?s ?p ?o"
+        if self.g.graph_name is not None:
+            pattern = f"graph {self.g.graph_name if self.g.graph_name else '?g'} {{{pattern}}}"
+        return f"SELECT ?s ?p ?o {{{pattern}}}"
+
+    def _endpoint_query(self, query: str) -> Dict:
+        """ Run query against the slurper's endpoint.  Each query gets its own SPARQLWrapper, as they aren't
+        thread safe """
+        sparql = SPARQLWrapper(self.g.sparql.endpoint, agent=self.g.sparql.agent)
+        for k, values in self.g.sparql.parameters.items():
+            if k != 'query':
+                for v in values:
+                    sparql.addParameter(k, v)
+        sparql.setReturnFormat(JSON)
+        sparql.setQuery(query)
+        rval = sparql.query().convert()
+        return rval if isinstance(rval, dict) else json.loads(rval)
@@ -0,0 +1,227 @@
+"""
+SPARQL push-down of shapes that only constrain node values.
+
+A shape whose expression is a TripleConstraint, or an EachOf of TripleConstraints, where each TripleConstraint has
+its own predicate and a value expression that is (at most) a NodeConstraint, needs nothing but the arcs of the focus
+node itself.  Such a shape can be checked at the endpoint.  It is compiled into a FILTER that is true for the nodes
+that might *not* conform::
+
+    SELECT DISTINCT ?n ?_absent {
+        VALUES ?n {<n1> <n2> ...}
+        BIND(!(EXISTS {?n ?_p ?_o} || EXISTS {?_s ?_p ?n}) AS ?_absent)
+        FILTER(?_absent || NOT EXISTS {?n <p1> ?o0} ||
+               EXISTS {?n <p1> ?o0 FILTER(!COALESCE(isLiteral(?o0) && DATATYPE(?o0) = <dt>, false))} || ...)
+    }
+
+Cardinalities other than ``?``, ``*`` and ``+`` are checked against a per-node count that is OPTIONALly joined to
+the nodes.  Only the nodes that the query returns need to be fetched and run through the full engine.  Every
+condition is the same as, or stricter than, the corresponding engine test -- a datatype must match exactly, a value
+must be the same term, and so on.  A conforming node can therefore show up as a possible violation, but it will
+still pass the engine.  A node that doesn't conform can never be skipped.  Facets whose SPARQL counterparts don't
+line up with the engine (patterns, digit counts, literal and language stem ranges) put the shape outside of the
+push-down.
+
+A node that isn't in the graph at all fails whatever the shape, so the nodes that the query flags as absent fail
+without being fetched -- unless the endpoint graph is completely empty, which the engine treats specially.
+"""
+from typing import List, Optional, Set, Iterable, Dict, NamedTuple
+
+from ShExJSG import ShExJ
+from pyjsg.jsglib import isinstance_
+from rdflib import URIRef, Literal, RDF
+from sparqlslurper import SlurpyGraph
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import Node
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.sparql_prefetch import QueryFunction
+from pyshex.utils.value_set_utils import iriref_to_uriref
+
+
+# Stands for the VALUES clause with the nodes being checked
+NODES = '$NODES'
+
+# True if ?n isn't in the graph at all.  The engine fails such a focus node, whatever the shape
+ABSENT = "!(EXISTS {?n ?_p ?_o} || EXISTS {?_s ?_p ?n})"
+
+
+class PushdownQuery(NamedTuple):
+    """ A shape compiled for push-down, in terms of ?n """
+    joins: List[str]                # Graph patterns joined to the nodes (with the NODES placeholder)
+    conditions: List[str]           # Expressions that are true if ?n might not conform
+
+
+class Violations(NamedTuple):
+    """ The nodes that a push-down query picked out """
+    nodes: Set[Node]                # Nodes that might not conform, the absent ones included
+    absent: Set[Node]               # Nodes that aren't in the graph at all
+
+
+class SPARQLPushdown:
+    def __init__(self, cs: CompiledSchema, query: Optional[QueryFunction] = None) -> None:
+        """ Create a push-down evaluator for the shapes in cs
+
+        :param cs: compiled schema
+        :param query: function that runs a query.  Default: the slurper's own SPARQLWrapper
+        """
+        self.cs = cs
+        self.query = query
+
+    def compile(self, expr: ShExJ.shapeExpr) -> Optional[PushdownQuery]:
+        """ Compile expr (or the shape expression it names).  None means that expr can't be pushed down """
+        if isinstance_(expr, ShExJ.shapeExprLabel):
+            expr = self.cs.shapeExprFor(expr)
+        if not isinstance(expr, ShExJ.Shape):
+            return None
+        return self.cs.analysis('pushdown', expr, lambda: self._compile_shape(expr))
+
+    def violations(self, g: SlurpyGraph, nodes: Iterable[Node], expr: ShExJ.shapeExpr) -> Optional[Violations]:
+        """ Return the members of nodes that might not conform to expr, as determined by the endpoint
+
+        :param g: slurper graph for the endpoint
+        :param nodes: focus nodes
+        :param expr: shape expression or label
+        :return: possible violations and, among them, the nodes that aren't in the graph.  None if expr can't be
+        pushed down
+        """
+        compiled = self.compile(expr)
+        if compiled is None or g.graph_name == '':
+            return None
+        nodes = list(dict.fromkeys(nodes))
+        iris = [n for n in nodes if isinstance(n, URIRef)]
+        rval = Violations(set(n for n in nodes if not isinstance(n, URIRef)), set())
+        if iris:
+            query = self.query_text(g, iris, compiled)
+            resp = self.query(query) if self.query is not None else self._endpoint_query(g, query)
+            g.total_queries += 1
+            if g.debug_slurps:
+                print(f"SPARQL: ({query}) - {len(resp['results']['bindings'])} possible violations")
+            for row in resp['results']['bindings']:
+                rval.nodes.add(URIRef(row['n']['value']))
+                if row['_absent']['value'] == 'true':
+                    rval.absent.add(URIRef(row['n']['value']))
+        return rval
+
+    def is_empty(self, g: SlurpyGraph) -> bool:
+        """ Determine whether the endpoint graph has no triples at all """
+        pattern = "?s ?p ?o" if g.graph_name is None else f"graph {g.graph_name} {{?s ?p ?o}}"
+        query = f"ASK {{{pattern}}}"
+        resp = self.query(query) if self.query is not None else self._endpoint_query(g, query)
+        g.total_queries += 1
+        return not resp['boolean']
+
+    @staticmethod
+    def query_text(g: SlurpyGraph, nodes: List[URIRef], compiled: PushdownQuery) -> str:
+        """ Return the query that selects the members of nodes that might not conform, flagging the absent ones """
+        values = f"VALUES ?n {{{' '.join(f'<{n}>' for n in nodes)}}}"
+        joins = ''.join(f" {join.replace(NODES, values)}" for join in compiled.joins)
+        conditions = ' || '.join(['?_absent'] + compiled.conditions)
+        pattern = f"{values}{joins} BIND({ABSENT} AS ?_absent) FILTER({conditions})"
+        if g.graph_name is not None:
+            pattern = f"graph {g.graph_name} {{{pattern}}}"
+        return f"SELECT DISTINCT ?n ?_absent {{{pattern}}}"
+
+    def _compile_shape(self, S: ShExJ.Shape) -> Optional[PushdownQuery]:
+        if S.closed or S.extra is not None or S.semActs is not None:
+            return None
+        tcs = self._triple_constraints(S.expression) if S.expression is not None else []
+        if tcs is None or len(set((self.cs.predicate(tc), bool(tc.inverse)) for tc in tcs)) != len(tcs):
+            return None
+
+        rval = PushdownQuery([], [])
+        for i, tc in enumerate(tcs):
+            min_, max_ = self.cs.cardinality(tc)
+            p = self.cs.predicate(tc)
+
+            def arc(o: str) -> str:
+                return f"{o} <{p}> ?n" if tc.inverse else f"?n <{p}> {o}"
+
+            if min_ > 1 or max_ not in (1, -1):
+                count = f"COALESCE(?_c{i}, 0)"
+                rval.joins.append(f"OPTIONAL {{SELECT ?n (COUNT(DISTINCT ?o{i}) AS ?_c{i}) "
+                                  f"{{{NODES} {arc(f'?o{i}')}}} GROUP BY ?n}}")
+                if min_ > 0:
+                    rval.conditions.append(f"{count} < {min_}")
+                if max_ != -1:
+                    rval.conditions.append(f"{count} > {max_}")
+            else:
+                if min_ == 1:
+                    rval.conditions.append(f"NOT EXISTS {{{arc(f'?o{i}')}}}")
+                if max_ == 1:
+                    rval.conditions.append(f"EXISTS {{{arc(f'?o{i}')} . {arc(f'?o{i}b')} "
+                                           f"FILTER(!sameTerm(?o{i}, ?o{i}b))}}")
+            if tc.valueExpr is not None:
+                value_expr = self.cs.shapeExprFor(tc.valueExpr) if isinstance_(tc.valueExpr, ShExJ.shapeExprLabel) \
+                    else tc.valueExpr
+                if not isinstance(value_expr, ShExJ.NodeConstraint):
+                    return None
+                test = self._node_test(f"?o{i}", value_expr)
+                if test is None:
+                    return None
+                if test:
+                    rval.conditions.append(f"EXISTS {{{arc(f'?o{i}')} FILTER(!COALESCE({test}, false))}}")
+        return rval
+
+    def _triple_constraints(self, expr: ShExJ.tripleExpr) -> Optional[List[ShExJ.TripleConstraint]]:
+        """ Return the TripleConstraints in expr if it is a TripleConstraint or a plain EachOf of them """
+        if isinstance_(expr, ShExJ.tripleExprLabel):
+            expr = self.cs.tripleExprFor(expr)
+        if isinstance(expr, ShExJ.TripleConstraint):
+            return [expr] if expr.semActs is None else None
+        if isinstance(expr, ShExJ.EachOf) and expr.semActs is None and self.cs.cardinality(expr) == (1, 1):
+            rval = []
+            for expr2 in expr.expressions:
+                tcs = self._triple_constraints(expr2)
+                if tcs is None:
+                    return None
+                rval += tcs
+            return rval
+        return None
+
+    def _node_test(self, v: str, nc: ShExJ.NodeConstraint) -> Optional[str]:
+        """ Return a SPARQL expression that is true if v satisfies nc, '' if everything does, or None if nc can't be
+        expressed """
+        if nc.pattern is not None or nc.totaldigits is not None or nc.fractiondigits is not None:
+            return None
+        tests = []
+        if nc.nodeKind is not None:
+            tests.append({'iri': f"isIRI({v})", 'bnode': f"isBlank({v})", 'literal': f"isLiteral({v})",
+                          'nonliteral': f"!isLiteral({v})"}[str(nc.nodeKind)])
+        if nc.datatype is not None:
+            tests.append(f"LANG({v}) != \"\"" if str(nc.datatype) == str(RDF.langString) else
+                         f"isLiteral({v}) && LANG({v}) = \"\" && DATATYPE({v}) = <{nc.datatype}>")
+        for facet, op in (('length', '='), ('minlength', '>='), ('maxlength', '<=')):
+            if getattr(nc, facet) is not None:
+                tests.append(f"STRLEN(STR({v})) {op} {int(getattr(nc, facet))}")
+        for facet, op in (('mininclusive', '>='), ('minexclusive', '>'), ('maxinclusive', '<='),
+                          ('maxexclusive', '<')):
+            if getattr(nc, facet) is not None:
+                tests.append(f"isNumeric({v}) && {v} {op} {getattr(nc, facet)}")
+        if nc.values is not None:
+            test = self._values_test(v, self.cs.value_set(nc))
+            if test is None:
+                return None
+            tests.append(test)
+        return ' && '.join(f"({test})" for test in tests)
+
+    @staticmethod
+    def _values_test(v: str, values: List[ShExJ.valueSetValue]) -> Optional[str]:
+        alternatives = []
+        for vsv in values:
+            if isinstance(vsv, ShExJ.IRIREF):
+                alternatives.append(f"sameTerm({v}, <{vsv}>)")
+            elif isinstance(vsv, ShExJ.ObjectLiteral):
+                lit = Literal(str(vsv.value), datatype=iriref_to_uriref(vsv.type),
+                              lang=str(vsv.language) if vsv.language else None)
+                alternatives.append(f"sameTerm({v}, {lit.n3()})")
+            elif isinstance(vsv, ShExJ.Language) and vsv.languageTag is not None:
+                alternatives.append(f"LANG({v}) = \"{vsv.languageTag}\"")
+            elif isinstance(vsv, ShExJ.IriStem) and not isinstance(vsv.stem, ShExJ.Wildcard):
+                alternatives.append(f"isIRI({v}) && STRSTARTS(STR({v}), \"{vsv.stem}\")")
+            else:
+                return None
+        return ' || '.join(f"({alt})" for alt in alternatives) if alternatives else "false"
+
+    @staticmethod
+    def _endpoint_query(g: SlurpyGraph, query: str) -> Dict:
+        g.sparql.setQuery(query)
+        return g.sparql.query().convert()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterator
 
 import jsonasobj
 import requests
@@ -36,7 +36,8 @@ class SPARQLQuery:
         self.endpoint.setQuery(self.query)
         self.endpoint.setReturnFormat(JSON)
 
-    def focus_nodes(self) -> List[URIRef]:
+    def focus_nodes(self) -> Iterator[URIRef]:
+        """ Generate the focus nodes.  The query isn't issued until the first node is requested """
         result = self.endpoint.query()
 
         processed_results = jsonasobj.load(result.response)
@@ -45,4 +46,5 @@ class SPARQLQuery:
             if len(processed_results.results.bindings) > 10:
                 print('\n\t     ...')
             print('\n')
-        return [URIRef(row.item.value) for row in processed_results.results.bindings]
+        for row in processed_results.results.bindings:
+            yield URIRef(row.item.value)
@@ -13,9 +13,12 @@ from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import R
 def trace_satisfies(newline: bool=True, skip_trace: Callable[[JSGObject], bool]=lambda _: False):
     def e(f: Callable[[Context, Node, JSGObject, DebugContext], bool]):
         def wrapper(cntxt: Context, n: Node, expr: JSGObject) -> bool:
+            if cntxt.verdict_only and not cntxt.debug_context.debug:
+                return f(cntxt, n, expr, cntxt.debug_context)
             parent_parse_node = cntxt.current_node
-            cntxt.current_node = ParseNode(f, expr, n, cntxt)
-            parent_parse_node.nodes.append(cntxt.current_node)
+            if not cntxt.verdict_only:
+                cntxt.current_node = ParseNode(f, expr, n, cntxt)
+                parent_parse_node.nodes.append(cntxt.current_node)
             c = cntxt.debug_context
             c.splus()
             if c.debug and not skip_trace(expr):
@@ -24,8 +27,9 @@ def trace_satisfies(newline: bool=True, skip_trace: Callable[[JSGObject], bool]=
             if c.debug and not skip_trace(expr):
                 c.print(c.i(0, f'<-- {f.__name__} {c.d()} node: {cntxt.n3_mapper.n3(n)}: {rval}'))
             c.sminus()
-            cntxt.current_node.set_result(rval)
-            cntxt.current_node = parent_parse_node
+            if not cntxt.verdict_only:
+                cntxt.current_node.set_result(rval)
+                cntxt.current_node = parent_parse_node
             return rval
         return wrapper
     return e
@@ -34,9 +38,13 @@ def trace_satisfies(newline: bool=True, skip_trace: Callable[[JSGObject], bool]=
 def trace_matches(newline: bool=True):
     def e(f: Callable[[Context, RDFGraph, JSGObject, DebugContext, Optional[Set[URIRef]]], bool]):
         def wrapper(cntxt: Context, T: RDFGraph, expr: JSGObject, extras: Optional[Set[URIRef]]=None) -> bool:
+            if cntxt.verdict_only and not cntxt.debug_context.debug:
+                return f(cntxt, T, expr, cntxt.debug_context, extras) if extras is not None else \
+                    f(cntxt, T, expr, cntxt.debug_context)
             parent_parse_node = cntxt.current_node
-            cntxt.current_node = ParseNode(f, expr, T, cntxt)
-            parent_parse_node.nodes.append(cntxt.current_node)
+            if not cntxt.verdict_only:
+                cntxt.current_node = ParseNode(f, expr, T, cntxt)
+                parent_parse_node.nodes.append(cntxt.current_node)
             c = cntxt.debug_context
             c.splus()
             if c.debug:
@@ -45,8 +53,9 @@ def trace_matches(newline: bool=True):
             if c.debug:
                 c.print(c.i(0, f'<-- {f.__name__} {c.d()} {rval}'))
             c.sminus()
-            cntxt.current_node.result = rval
-            cntxt.current_node = parent_parse_node
+            if not cntxt.verdict_only:
+                cntxt.current_node.result = rval
+                cntxt.current_node = parent_parse_node
             return rval
         return wrapper
     return e
@@ -0,0 +1,74 @@
+"""
+Numbered triples and bitset subsets.
+
+The matching layer spends much of its time building, combining and comparing sets of triples drawn from a single
+neighbourhood.  A :py:class:`TripleTable` numbers each triple once, after which a subset is just a python int with
+bit i set if triple i is a member.  Union, intersection, difference and membership become bit operations and an
+:py:class:`RDFGraph` is only materialized when a subset is handed to the evaluation functions.
+"""
+from typing import List, Dict, Iterable, Iterator
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple, RDFGraph
+
+# A subset of the triples in a TripleTable
+TripleMask = int
+
+
+class TripleTable:
+    def __init__(self, triples: Iterable[RDFTriple] = ()) -> None:
+        self.triples: List[RDFTriple] = []
+        self.ids: Dict[RDFTriple, int] = {}
+        self.add(triples)
+
+    def __len__(self) -> int:
+        return len(self.triples)
+
+    def add(self, triples: Iterable[RDFTriple]) -> TripleMask:
+        """ Number any triples that haven't been seen before and return the mask of all of triples """
+        mask = 0
+        for t in triples:
+            i = self.ids.get(t)
+            if i is None:
+                i = self.ids[t] = len(self.triples)
+                self.triples.append(t)
+            mask |= 1 << i
+        return mask
+
+    def mask(self, triples: Iterable[RDFTriple]) -> TripleMask:
+        """ Return the mask of triples, all of which must already be in the table """
+        mask = 0
+        for t in triples:
+            mask |= 1 << self.ids[t]
+        return mask
+
+    @property
+    def all(self) -> TripleMask:
+        return (1 << len(self.triples)) - 1
+
+    def members(self, mask: TripleMask) -> Iterator[RDFTriple]:
+        """ Iterate over the triples in mask, in table order """
+        triples = self.triples
+        while mask:
+            low = mask & -mask
+            yield triples[low.bit_length() - 1]
+            mask ^= low
+
+    def graph(self, mask: TripleMask) -> RDFGraph:
+        """ Materialize mask as an RDFGraph """
+        rval = RDFGraph()
+        rval.update(self.members(mask))
+        return rval
+
+
+def bit_count(mask: TripleMask) -> int:
+    return bin(mask).count('1')
+
+
+def submasks(mask: TripleMask) -> Iterator[TripleMask]:
+    """ Iterate over every subset of mask, from mask itself down to the empty set """
+    sub = mask
+    while True:
+        yield sub
+        if not sub:
+            return
+        sub = (sub - 1) & mask
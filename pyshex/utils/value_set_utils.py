@@ -1,4 +1,5 @@
-from typing import Union, Optional
+from bisect import bisect_right
+from typing import Union, Optional, List, Iterable, Set, Tuple, FrozenSet
 
 from ShExJSG import ShExJ
 from ShExJSG.ShExJ import IRIREF
@@ -37,3 +38,93 @@ def literal_matches_objectliteral(v1: Literal, v2: ShExJ.ObjectLiteral) -> bool:
 
 def iriref_to_uriref(v: Union[str, ShExJ.IRIREF]) -> Optional[URIRef]:
     return URIRef(str(v)) if v else None
+
+
+class StemSet:
+    """ A set of stems that answers "does any stem start s" with a binary search.
+
+    Stems that start with another stem are redundant, so they are dropped.  In the sorted, prefix free list that
+    remains, the only candidate for a stem of s is the greatest stem that is <= s.
+    """
+    def __init__(self, stems: Iterable[str]) -> None:
+        self.stems: List[str] = []
+        for stem in sorted(set(stems)):
+            if not self.stems or not stem.startswith(self.stems[-1]):
+                self.stems.append(stem)
+
+    def __len__(self) -> int:
+        return len(self.stems)
+
+    def matches(self, s: str) -> bool:
+        """ Return True if some stem is a prefix of s """
+        i = bisect_right(self.stems, s)
+        return i > 0 and s.startswith(self.stems[i - 1])
+
+
+class ValueSetIndex:
+    """ The values of a NodeConstraint, organized for lookup
+
+    Exact IRIs, literals and language tags are hashed, stems go into :py:class:`StemSet` s and each IriStemRange
+    keeps its exclusions the same way.  Anything else (LiteralStemRange and LanguageStemRange) is left in
+    `others` to be tested one value at a time.
+    """
+    def __init__(self, values: List[ShExJ.valueSetValue]) -> None:
+        """
+        :param values: values with their types identified (see :py:meth:`CompiledSchema.value_set`)
+        """
+        self.iris: Set[str] = set()
+        self.literals: Set[Literal] = set()
+        self.languages: Set[str] = set()
+        self.matches_everything = False
+        self.iri_stem_ranges: List[Tuple[Optional[str], FrozenSet[str], StemSet]] = []
+        self.others: List[ShExJ.valueSetValue] = []
+        iri_stems: List[str] = []
+        literal_stems: List[str] = []
+        language_stems: List[str] = []
+
+        for vsv in values:
+            if isinstance(vsv, IRIREF):
+                self.iris.add(str(vsv))
+            elif isinstance(vsv, ShExJ.ObjectLiteral):
+                self.literals.add(Literal(str(vsv.value), datatype=iriref_to_uriref(vsv.type),
+                                          lang=str(vsv.language) if vsv.language else None))
+            elif isinstance(vsv, ShExJ.Language):
+                if vsv.languageTag is not None:
+                    self.languages.add(str(vsv.languageTag))
+            elif isinstance(vsv, (ShExJ.IriStem, ShExJ.LiteralStem, ShExJ.LanguageStem)):
+                if isinstance(vsv.stem, ShExJ.Wildcard):
+                    self.matches_everything = True
+                else:
+                    (iri_stems if isinstance(vsv, ShExJ.IriStem) else
+                     literal_stems if isinstance(vsv, ShExJ.LiteralStem) else language_stems).append(str(vsv.stem))
+            elif isinstance(vsv, ShExJ.IriStemRange):
+                exclusions = vsv.exclusions if vsv.exclusions is not None else []
+                self.iri_stem_ranges.append(
+                    (None if isinstance(vsv.stem, ShExJ.Wildcard) else str(vsv.stem),
+                     frozenset(str(excl) for excl in exclusions if isinstance(excl, ShExJ.IRIREF)),
+                     StemSet(str(excl.stem) for excl in exclusions if not isinstance(excl, ShExJ.IRIREF))))
+            else:
+                self.others.append(vsv)
+        self.iri_stems = StemSet(iri_stems)
+        self.literal_stems = StemSet(literal_stems)
+        self.language_stems = StemSet(language_stems)
+
+    def matches(self, n: Node) -> bool:
+        """ Determine whether n matches any of the indexed values.  `others` are not consulted """
+        if self.matches_everything:
+            return True
+        if isinstance(n, URIRef):
+            if str(n) in self.iris or (self.iri_stems and self.iri_stems.matches(str(n))):
+                return True
+        elif isinstance(n, Literal):
+            if n in self.literals or \
+                    (self.literal_stems and self.literal_stems.matches(str(n.value))) or \
+                    (n.language is not None and
+                     (n.language in self.languages or
+                      (self.language_stems and self.language_stems.matches(str(n.language))))):
+                return True
+        for stem, excluded_iris, excluded_stems in self.iri_stem_ranges:
+            if (stem is None or (isinstance(n, URIRef) and str(n).startswith(stem))) and \
+                    str(n) not in excluded_iris and not excluded_stems.matches(str(n)):
+                return True
+        return False
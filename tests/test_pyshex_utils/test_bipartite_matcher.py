@@ -0,0 +1,113 @@
+import unittest
+
+from pyshex import ShExEvaluator
+from pyshex.utils.bipartite_matcher import BoundedFlow
+from tests.utils.setup_test import EX
+
+shex_1 = """PREFIX : <http://schema.example/>
+:S { :p @:T {2,5} ; :q . * }
+:T { :r [1 2] }
+:U { (:p . | :q .) ; :p [1] ? }
+:V { :p [1 2 3] {1,2} }
+:W { (:p . ; :q .)* ; :r . }
+:X { (:p . | :q .)* }
+:Y { (:p [1 2 3] ; :q . ; :r . ?){2,*} }
+:Z { (:p . ; :q . *)* }"""
+
+rdf_template = """@prefix : <http://schema.example/> .
+{}
+"""
+
+
+def chain(focus: str, n: int, value: int = 1) -> str:
+    return '\n'.join(f":{focus} :p :{focus}_{i} . :{focus}_{i} :r {value} ." for i in range(n))
+
+
+class BoundedFlowTestCase(unittest.TestCase):
+    def test_feasible(self):
+        # source -> a -> sink with a lower bound that can be met
+        flow = BoundedFlow(3, 0, 1)
+        flow.add_edge(0, 2, 2, 2)
+        flow.add_edge(2, 1, 1, 3)
+        self.assertTrue(flow.feasible())
+
+    def test_infeasible(self):
+        # Two units must leave the source but the only path out takes one
+        flow = BoundedFlow(3, 0, 1)
+        flow.add_edge(0, 2, 2, 2)
+        flow.add_edge(2, 1, 0, 1)
+        self.assertFalse(flow.feasible())
+
+        # Lower bound on the sink side that nothing can supply
+        flow = BoundedFlow(3, 0, 1)
+        flow.add_edge(0, 2, 0, 1)
+        flow.add_edge(2, 1, 2, 2)
+        self.assertFalse(flow.feasible())
+
+        flow = BoundedFlow(2, 0, 1)
+        flow.add_edge(0, 1, 2, 1)
+        self.assertFalse(flow.feasible())
+
+
+class BipartiteMatcherTestCase(unittest.TestCase):
+    def test_alternatives(self):
+        cs = ShExEvaluator(schema=shex_1).compiled_schema
+        self.assertEqual(1, len(cs.alternatives(cs.shapeExprFor(EX.S).expression)))
+        self.assertEqual(2, len(cs.alternatives(cs.shapeExprFor(EX.U).expression)))
+        self.assertEqual(1, len(cs.alternatives(cs.shapeExprFor(EX.W).expression)))
+        self.assertIsNone(cs.alternatives(cs.shapeExprFor(EX.X).expression))
+
+    def test_cardinality(self):
+        for n, expected in ((1, False), (2, True), (5, True), (6, False)):
+            rdf = rdf_template.format(chain('n', n) + "\n:n :q 1 .")
+            result = ShExEvaluator(rdf, shex_1, EX.n, EX.S).evaluate()[0]
+            self.assertEqual(expected, result.result, f"{n} triples")
+
+    def test_many_triples(self):
+        """ Evaluation of a {2,5} constraint mustn't depend on the number of partitions of the triples """
+        rdf = rdf_template.format(chain('n', 5) + "\n" +
+                                  '\n'.join(f":n :q {i} ." for i in range(20)))
+        evaluator = ShExEvaluator(rdf, shex_1, EX.n, EX.S, profile=True)
+        result = evaluator.evaluate()[0]
+        self.assertTrue(result.result, result.reason)
+        # No partitions are tried and each :p triple has its value checked once
+        self.assertEqual(0, evaluator.stats.shapes[str(EX.S)].partitions)
+        self.assertEqual(5, evaluator.stats.triple_constraints[(str(EX.S), str(EX.p))].evaluations)
+
+    def test_repeated_group(self):
+        """ A repeated group is matched without partitioning the triples """
+        def pairs(n_p: int, n_q: int) -> str:
+            return rdf_template.format('\n'.join([f":n :p {i} ." for i in range(n_p)] +
+                                                  [f":n :q {i} ." for i in range(n_q)] + [":n :r 1 ."]))
+
+        for n_p, n_q, expected in ((10, 10, True), (0, 0, True), (10, 9, False), (9, 10, False)):
+            evaluator = ShExEvaluator(pairs(n_p, n_q), shex_1, EX.n, EX.W, profile=True)
+            result = evaluator.evaluate()[0]
+            self.assertEqual(expected, result.result, f"{n_p} :p, {n_q} :q")
+            self.assertEqual(0, evaluator.stats.shapes[str(EX.W)].partitions)
+
+        # Each repetition takes a :p and a :q and, optionally, an :r -- and there are at least two of them
+        rdf = rdf_template.format(":n1 :p 1, 2, 3 ; :q 1, 2, 3 ; :r 1, 2, 3 .\n:n2 :p 1 ; :q 1 .\n"
+                                  ":n3 :p 1, 2 ; :q 1, 2 ; :r 1, 2, 3 .\n:n4 :p 1, 4 ; :q 1, 2 .")
+        results = ShExEvaluator(rdf, shex_1, [EX.n1, EX.n2, EX.n3, EX.n4], EX.Y).evaluate()
+        self.assertEqual([True, False, False, False], [r.result for r in results])
+
+        # No repetitions at all leave no room for an unbounded constraint either
+        rdf = rdf_template.format(":n1 :q 1, 2 .\n:n2 :p 1 ; :q 1, 2 .")
+        results = ShExEvaluator(rdf, shex_1, [EX.n1, EX.n2], EX.Z).evaluate()
+        self.assertEqual([False, True], [r.result for r in results])
+
+    def test_shared_predicates(self):
+        rdf = rdf_template.format(":n1 :p 1, 2 .\n:n2 :p 2, 3 .\n:n3 :p 1 .\n:n4 :q 1 ; :p 2 .")
+        results = ShExEvaluator(rdf, shex_1, [EX.n1, EX.n2, EX.n3, EX.n4], EX.U).evaluate()
+        self.assertEqual([True, False, True, False], [r.result for r in results])
+
+    def test_fail_reason(self):
+        rdf = rdf_template.format(":n :p 1, 2, 3 .")
+        result = ShExEvaluator(rdf, shex_1, EX.n, EX.V).evaluate()[0]
+        self.assertFalse(result.result)
+        self.assertIn("3 triples exceeds max {1,2}", result.reason)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+
+from ShExJSG import ShExJ
+from rdflib import URIRef, RDF
+
+from pyshex import ShExEvaluator
+from pyshex.utils.compiled_schema import CompiledSchema
+from tests.utils.setup_test import setup_test, EX
+
+shex_1 = """{ "type": "Schema", "shapes": [
+  { "id": "http://schema.example/EmployeeShape",
+    "type": "Shape",
+    "closed": true,
+    "extra": ["http://www.w3.org/1999/02/22-rdf-syntax-ns#type"],
+    "expression": {
+      "type": "EachOf", "expressions": [
+        "http://schema.example/nameExpr",
+        { "type": "TripleConstraint",
+          "predicate": "http://www.w3.org/1999/02/22-rdf-syntax-ns#type",
+          "valueExpr": { "type": "NodeConstraint",
+            "values": ["http://schema.example/Employee", {"value": "E"}] } },
+        { "type": "TripleConstraint",
+          "inverse": true,
+          "min": 0, "max": -1,
+          "predicate": "http://schema.example/employs" } ] } },
+  { "id": "http://schema.example/PersonShape",
+    "type": "Shape", "expression": {
+      "id": "http://schema.example/nameExpr",
+      "type": "TripleConstraint",
+      "predicate": "http://xmlns.com/foaf/0.1/name" } } ] }"""
+
+shex_2 = """PREFIX : <http://schema.example/>
+:S { :p @:S ? ; :q [:a :b] }"""
+
+rdf_2 = """@prefix : <http://schema.example/> .
+:n1 :p :n2 ; :q :a .
+:n2 :q :b .
+:n3 :q :c .
+"""
+
+shex_3 = """{ "type": "Schema", "shapes": [
+  { "id": "http://schema.example/Outer", "type": "ShapeAnd", "shapeExprs": [
+    { "id": "http://schema.example/Inner", "type": "Shape",
+      "expression": { "type": "TripleConstraint", "predicate": "http://schema.example/p" } },
+    "http://schema.example/Other" ] },
+  { "id": "http://schema.example/Other", "type": "NodeConstraint", "nodeKind": "iri" },
+  { "id": "http://schema.example/UsesInner", "type": "Shape",
+    "expression": { "type": "TripleConstraint", "predicate": "http://schema.example/q",
+                    "valueExpr": "http://schema.example/Inner" } } ] }"""
+
+rdf_3 = """@prefix : <http://schema.example/> .
+:n1 :q :n2 .
+:n2 :p 1 .
+"""
+
+shex_4 = """PREFIX : <http://schema.example/>
+:S { :a . ; (:b . | :a .{2} ; :c .+) ; (:d @:S ; :e .?){1,2} }"""
+
+rdf_4 = """@prefix : <http://schema.example/> .
+:n1 :a 1 ; :b 2 ; :d :n1 .
+:n2 :b 2 ; :d :n1 .
+:n3 :a 1, 2, 3, 4 ; :b 2 ; :d :n1 .
+"""
+
+
+class CompiledSchemaTestCase(unittest.TestCase):
+    def test_compiled_shape(self):
+        schema, _ = setup_test(shex_1, None)
+        cs = CompiledSchema(schema)
+        employee = cs.shapeExprFor(EX.EmployeeShape)
+        self.assertTrue(isinstance(employee, ShExJ.Shape))
+        self.assertEqual(cs.schema_id_map[str(EX.PersonShape)], cs.shapeExprFor(EX.PersonShape))
+        self.assertEqual(cs.te_id_map[str(EX.nameExpr)], cs.tripleExprFor(str(EX.nameExpr)))
+
+        cshape = cs.shape(employee)
+        self.assertIs(cshape, cs.shape(employee))
+        self.assertTrue(cshape.closed)
+        self.assertEqual(frozenset([RDF.type]), cshape.extras)
+        self.assertEqual(3, len(cshape.triple_constraints))
+        self.assertEqual({URIRef('http://xmlns.com/foaf/0.1/name'), RDF.type, EX.employs},
+                         set(cshape.predicates.keys()))
+        self.assertTrue(cshape.predicates[RDF.type].is_fwd)
+        self.assertFalse(cshape.predicates[RDF.type].is_rev)
+        self.assertFalse(cshape.predicates[EX.employs].is_fwd)
+        self.assertTrue(cshape.predicates[EX.employs].is_rev)
+
+        type_tc, employs_tc = employee.expression.expressions[1:]
+        self.assertEqual((1, 1), cs.cardinality(type_tc))
+        self.assertEqual((0, -1), cs.cardinality(employs_tc))
+        self.assertEqual(RDF.type, cs.predicate(type_tc))
+        values = cs.value_set(type_tc.valueExpr)
+        self.assertTrue(isinstance(values[0], ShExJ.IRIREF))
+        self.assertTrue(isinstance(values[1], ShExJ.ObjectLiteral))
+
+    def test_label_index(self):
+        schema, _ = setup_test(shex_3, None)
+        cs = CompiledSchema(schema, EX)
+        other = cs.shapeExprFor(EX.Other)
+        self.assertTrue(isinstance(other, ShExJ.NodeConstraint))
+        self.assertIs(other, cs.shapeExprFor(str(EX.Other)))
+        self.assertIs(other, cs.shapeExprFor(ShExJ.IRIREF(str(EX.Other))))
+        self.assertIs(other, cs.shapeExprFor("Other"))
+        self.assertIsNone(cs.shapeExprFor(EX.Missing))
+
+        # Shape expressions nested in other shape expressions can be referenced too
+        self.assertTrue(isinstance(cs.shapeExprFor(EX.Inner), ShExJ.Shape))
+        results = ShExEvaluator(rdf_3, shex_3, [EX.n1, EX.n2], EX.UsesInner).evaluate()
+        self.assertEqual([True, False], [r.result for r in results])
+
+    def test_evaluator_reuse(self):
+        evaluator = ShExEvaluator(rdf_2, shex_2, start=EX.S)
+        cs = evaluator.compiled_schema
+        self.assertIsNotNone(cs)
+        results = evaluator.evaluate(focus=[EX.n1, EX.n2, EX.n3])
+        self.assertEqual([True, True, False], [r.result for r in results])
+        self.assertIs(cs, evaluator.compiled_schema)
+        evaluator.schema = shex_2
+        self.assertIsNot(cs, evaluator.compiled_schema)
+
+    def test_arc_bounds(self):
+        schema, _ = setup_test(shex_1, None)
+        cs = CompiledSchema(schema)
+        self.assertEqual({(URIRef('http://xmlns.com/foaf/0.1/name'), True): (1, 1), (RDF.type, True): (1, -1),
+                          (EX.employs, False): (0, -1)}, cs.shape(cs.shapeExprFor(EX.EmployeeShape)).arc_bounds)
+
+        cs = ShExEvaluator(schema=shex_4).compiled_schema
+        self.assertEqual({(EX.a, True): (1, 3), (EX.b, True): (0, 1), (EX.c, True): (0, -1), (EX.d, True): (1, 2),
+                          (EX.e, True): (0, 2)}, cs.shape(cs.shapeExprFor(EX.S)).arc_bounds)
+
+    def test_arc_count_prefilter(self):
+        """ Nodes with too few or too many arcs of a predicate fail without their values being looked at """
+        evaluator = ShExEvaluator(rdf_4, shex_4, [EX.n1, EX.n2, EX.n3], EX.S, profile=True)
+        results = evaluator.evaluate()
+        self.assertEqual([True, False, False], [r.result for r in results])
+        self.assertIn("No matching triples found for predicate", results[1].reason)
+        self.assertIn("4 triples exceeds max {1,3}", results[2].reason)
+        stats = evaluator.stats.shapes[str(EX.S)]
+        self.assertEqual(2, stats.prefiltered)
+        self.assertEqual(3, stats.evaluations)
+
+        # Values are still checked when the counts fit
+        shex = """PREFIX : <http://schema.example/>
+:S { ((:a [1 2]{0,2} | :c .){0,2} ; :a LITERAL) }"""
+        rdf = """@prefix : <http://schema.example/> .
+:n1 :c 1 ; :a "x" .
+:n2 :c 1 ; :a :x .
+:n3 :c 1 ."""
+        results = ShExEvaluator(rdf, shex, [EX.n1, EX.n2, EX.n3], EX.S).evaluate()
+        self.assertEqual([True, False, False], [r.result for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from rdflib import Graph
+
+from pyshex import ShExEvaluator
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.component_order import ComponentOrder
+from pyshex.utils.schema_loader import SchemaLoader
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Checked @:Expensive AND [:ok]
+:Either @:Expensive OR IRI
+:Neither @:Expensive OR LITERAL
+:Pick @:A OR @:B
+:Expensive { :p @:Expensive * ; :q . }
+:A { :a . }
+:B { :b . }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:x :p :x .
+:n0 :b 0 . :n1 :b 1 . :n2 :b 2 . :n3 :b 3 . :n4 :b 4 ."""
+
+
+class ComponentOrderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.g = Graph()
+        self.g.parse(data=rdf, format="turtle")
+
+    def evaluations(self, focus, start, shape, **kwargs) -> int:
+        evaluator = ShExEvaluator(self.g, shex, focus, start, profile=True, **kwargs)
+        evaluator.evaluate()
+        return evaluator.stats.shapes[str(shape)].evaluations if str(shape) in evaluator.stats.shapes else 0
+
+    def test_costs(self):
+        order = ComponentOrder(CompiledSchema(SchemaLoader().loads(shex)))
+        self.assertLess(order.shape_cost(EX.A), order.shape_cost(EX.Expensive))
+        self.assertEqual(order.shape_cost(EX.A), order.shape_cost(EX.B))
+
+    def test_cheap_first(self):
+        # A node constraint decides a disjunction before the shape reference is evaluated
+        self.assertEqual(0, self.evaluations(EX.x, EX.Either, EX.Expensive))
+
+        # Conjunctions are only reordered when there are no reasons to report
+        self.assertLess(0, self.evaluations(EX.x, EX.Checked, EX.Expensive))
+        self.assertEqual(0, self.evaluations(EX.x, EX.Checked, EX.Expensive, verdict_only=True))
+
+    def test_reasons_in_schema_order(self):
+        result = ShExEvaluator(self.g, shex, EX.x, EX.Neither).evaluate()[0]
+        self.assertFalse(result.result)
+        self.assertLess(result.reason.index(str(EX.Expensive)), result.reason.index('Node kind mismatch'))
+
+    def test_adaptive(self):
+        foci = [EX[f'n{i}'] for i in range(5)]
+        self.assertEqual(5, self.evaluations(foci, EX.Pick, EX.A))
+        self.assertEqual(1, self.evaluations(foci, EX.Pick, EX.A, adaptive_order=True))
+        results = ShExEvaluator(self.g, shex, foci, EX.Pick, adaptive_order=True).evaluate()
+        self.assertTrue(all(r.result for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
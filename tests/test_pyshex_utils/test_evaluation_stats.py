@@ -0,0 +1,63 @@
+import unittest
+
+from rdflib import Graph
+
+from pyshex import ShExEvaluator
+from tests.test_pyshex_utils.test_sparql_planner import slurper
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Person { :name . ; :knows @:Person * ; (:pet @:Pet | :owner IRI){1,2} }
+:Pet { :species ["dog" "cat"] }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:alice :name "Alice" ; :knows :bob ; :pet :rex, :tom .
+:bob :name "Bob" ; :knows :alice ; :pet :rex .
+:dave :name "Dave" ; :knows :dave ; :pet :nemo .
+:rex :species "dog" .
+:tom :species "cat" .
+:nemo :species "fish" ."""
+
+
+class EvaluationStatsTestCase(unittest.TestCase):
+    def test_counters(self):
+        g = Graph()
+        g.parse(data=rdf, format="turtle")
+        evaluator = ShExEvaluator(g, shex, [EX.alice, EX.dave], EX.Person, profile=True)
+        self.assertEqual([True, False], [r.result for r in evaluator.evaluate()])
+
+        stats = evaluator.stats.as_dict()
+        person = stats['shapes'][str(EX.Person)]
+        pet = stats['shapes'][str(EX.Pet)]
+        self.assertLessEqual(2, person['evaluations'])
+        self.assertLessEqual(1, person['assumptions'])
+        self.assertEqual(1, person['restarts'])
+        self.assertLessEqual(1, person['partitions'])
+        self.assertLessEqual(pet['time'], person['time'])
+        self.assertLessEqual(person['self_time'], person['time'])
+        self.assertEqual(0, person['slurp_queries'])
+        self.assertLessEqual(1, stats['triple_constraints'][f"{EX.Person} {EX.pet}"]['evaluations'])
+        self.assertNotIn(f"{EX.Person} {EX.name}", stats['triple_constraints'])
+
+        report = evaluator.stats.report()
+        self.assertIn(str(EX.Pet), report)
+        self.assertIn(f"{EX.Person} {EX.knows}", report)
+
+        # A new evaluation starts with new counters and profiling is off by default
+        evaluator.evaluate()
+        self.assertEqual(person['evaluations'], evaluator.stats.as_dict()['shapes'][str(EX.Person)]['evaluations'])
+        self.assertIsNone(ShExEvaluator(g, shex, [EX.alice], EX.Person).stats)
+
+    def test_slurps(self):
+        g = slurper(rdf)
+        evaluator = ShExEvaluator(g, shex, [EX.bob], EX.Person, profile=True)
+        self.assertEqual([True], [r.result for r in evaluator.evaluate()])
+        shapes = evaluator.stats.shapes
+        # The focus node's own presence check happens before any shape is entered
+        self.assertLessEqual(sum(s.slurp_queries for s in shapes.values()), g.total_queries)
+        self.assertLess(0, shapes[str(EX.Person)].slurp_queries)
+        self.assertLess(0, shapes[str(EX.Pet)].slurp_triples)
+
+
+if __name__ == '__main__':
+    unittest.main()
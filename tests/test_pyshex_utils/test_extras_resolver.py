@@ -0,0 +1,42 @@
+import unittest
+
+from pyshex import ShExEvaluator
+from tests.utils.setup_test import EX
+
+# A repeated OneOf keeps the expression from being flattened, so EXTRA goes through the resolver
+shex = """PREFIX : <http://schema.example/>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+:S EXTRA rdf:type { rdf:type [:T1 :T2] {2} ; ( :p . | :q . )+ }
+:U EXTRA rdf:type { rdf:type [:T1 :T2] ; rdf:type [:T1 :T2 :T3] ; ( :p . | :q . )+ }
+:V EXTRA rdf:type { rdf:type [:T1] %<http://shex.io/extensions/Test/>{ print(o) %} ; ( :p . ){2} }"""
+
+other_types = ', '.join(f":O{i}" for i in range(30))
+
+rdf = f"""@prefix : <http://schema.example/> .
+:good a :T1, :T2, {other_types} ; :p 1 ; :q 2 .
+:missing a :T1, {other_types} ; :p 1 ; :q 2 .
+:three a :T1, :T2, :T3, :O1 ; :p 1 ; :q 2 .
+:one a :T1, :O1, :O2 ; :p 1 ; :q 2 .
+:sem a :T1, :O1, :O2 ; :p 1, 2 .
+"""
+
+
+class ExtrasResolverTestCase(unittest.TestCase):
+    def test_many_extras(self):
+        """ Thirty non-matching EXTRA triples used to mean 2^30 partitions """
+        results = ShExEvaluator(rdf, shex, [EX.good, EX.missing], EX.S).evaluate()
+        self.assertEqual([True, False], [r.result for r in results])
+
+    def test_shared_constraints(self):
+        """ Triples that satisfy more than one constraint """
+        results = ShExEvaluator(rdf, shex, [EX.three, EX.one], EX.U).evaluate()
+        self.assertEqual([True, False], [r.result for r in results])
+
+    def test_semantic_actions(self):
+        """ A semantic action on a TripleConstraint means trying every subset """
+        results = ShExEvaluator(rdf, shex, [EX.sem], EX.V).evaluate()
+        self.assertEqual([True], [r.result for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
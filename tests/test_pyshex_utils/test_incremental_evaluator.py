@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from rdflib import Graph, Literal
+
+from pyshex import ShExEvaluator, IncrementalEvaluator
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Person { :name . ; :knows @:Person * ; :pet @:Pet ? }
+:Pet { :species ["dog" "cat"] }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:alice :name "Alice" ; :knows :bob ; :pet :rex .
+:bob :name "Bob" ; :knows :carol .
+:carol :name "Carol" .
+:dave :name "Dave" ; :pet :tom .
+:rex :species "dog" .
+:tom :species "cat" ."""
+
+people = [EX.alice, EX.bob, EX.carol, EX.dave]
+
+
+def full(g: Graph, focus=None):
+    return [(r.focus, r.result) for r in ShExEvaluator(g, shex, focus or None, EX.Person).evaluate()]
+
+
+class IncrementalEvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.g = Graph()
+        self.g.parse(data=rdf, format="turtle")
+        self.incremental = IncrementalEvaluator(ShExEvaluator(self.g, shex, people, EX.Person))
+
+    def check(self, expected):
+        results = [(r.focus, r.result) for r in self.incremental.results]
+        self.assertEqual(expected, results)
+        self.assertEqual(full(self.g, people), results)
+
+    def test_referenced_change(self):
+        self.incremental.evaluate()
+        self.assertEqual(people, self.incremental.reevaluated)
+        self.check([(EX.alice, True), (EX.bob, True), (EX.carol, True), (EX.dave, True)])
+
+        # carol loses her name -- bob and alice reference her, dave doesn't
+        self.incremental.update(removed=[(EX.carol, EX.name, Literal("Carol"))])
+        self.assertEqual([EX.alice, EX.bob, EX.carol], self.incremental.reevaluated)
+        self.check([(EX.alice, False), (EX.bob, False), (EX.carol, False), (EX.dave, True)])
+
+        # A predicate that no shape reads changes nothing
+        self.incremental.update(added=[(EX.rex, EX.age, Literal(3))])
+        self.assertEqual([], self.incremental.reevaluated)
+
+        self.incremental.update(added=[(EX.carol, EX.name, Literal("Caz"))], removed=[(EX.tom, EX.species,
+                                                                                       Literal("cat"))])
+        self.assertEqual(people, self.incremental.reevaluated)
+        self.check([(EX.alice, True), (EX.bob, True), (EX.carol, True), (EX.dave, False)])
+
+    def test_all_subjects(self):
+        incremental = IncrementalEvaluator(ShExEvaluator(self.g, shex, None, EX.Person))
+        incremental.evaluate()
+        incremental.update(added=[(EX.eve, EX.name, Literal("Eve"))], removed=[(EX.rex, EX.species, Literal("dog"))])
+        self.assertEqual([EX.alice, EX.eve], incremental.reevaluated)
+        self.assertNotIn(EX.rex, [r.focus for r in incremental.results])
+        self.assertEqual(sorted(full(self.g)), sorted((r.focus, r.result) for r in incremental.results))
+
+    def test_save_load(self):
+        self.incremental.evaluate()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'verdicts.json')
+            self.incremental.save(path)
+            incremental = IncrementalEvaluator(ShExEvaluator(self.g, shex, people, EX.Person))
+            incremental.load(path)
+        self.assertEqual(self.incremental.results, incremental.results)
+        incremental.update(removed=[(EX.rex, EX.species, Literal("dog"))])
+        self.assertEqual([EX.alice], incremental.reevaluated)
+        self.assertEqual(full(self.g, people), [(r.focus, r.result) for r in incremental.results])
+
+
+if __name__ == '__main__':
+    unittest.main()
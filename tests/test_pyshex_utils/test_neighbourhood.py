@@ -0,0 +1,72 @@
+import unittest
+
+from rdflib import Graph
+
+from pyshex import ShExEvaluator
+from pyshex.utils.neighbourhood import Neighbourhood
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Link { :next @:Node ; ^:next @:Node }
+:Node { :name . ? }
+:Closed CLOSED { :next . ; :name . }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:a :next :b ; :name "a" .
+:b :next :c ; :name "b" .
+:c :name "c" ; :other 1 .
+:loop :next :loop .
+"""
+
+
+class CountingGraph(Graph):
+    """ Graph that counts the number of calls to triples """
+    def __init__(self) -> None:
+        super().__init__()
+        self.ncalls = 0
+
+    def triples(self, triple, *args, **kwargs):
+        self.ncalls += 1
+        return super().triples(triple, *args, **kwargs)
+
+
+class NeighbourhoodTestCase(unittest.TestCase):
+    def test_grouping(self):
+        g = CountingGraph()
+        g.parse(data=rdf, format="turtle")
+        g.ncalls = 0
+        nbh = Neighbourhood(g, EX.b)
+        self.assertEqual([(EX.b, EX.next, EX.c)], nbh.outs(EX.next))
+        self.assertEqual(1, len(nbh.outs(EX.name)))
+        self.assertEqual([], nbh.outs(EX.other))
+        self.assertEqual([(EX.a, EX.next, EX.b)], nbh.ins(EX.next))
+        self.assertEqual([], nbh.ins(EX.name))
+        self.assertEqual({EX.next, EX.name}, set(nbh.arcs_out().keys()))
+        self.assertEqual(2, g.ncalls)
+
+    def test_by_predicate(self):
+        g = CountingGraph()
+        g.parse(data=rdf, format="turtle")
+        g.ncalls = 0
+        nbh = Neighbourhood(g, EX.b, all_out=False, all_in=False)
+        self.assertEqual(1, len(nbh.outs(EX.next)))
+        self.assertEqual(1, len(nbh.outs(EX.next)))
+        self.assertEqual(1, len(nbh.ins(EX.next)))
+        self.assertEqual(2, g.ncalls)
+        self.assertEqual(2, len(nbh.arcs_out()))
+        self.assertEqual(3, g.ncalls)
+
+    def test_predicate_in_both_directions(self):
+        """ A predicate that is used both forwards and inverted fetches arcs in and arcs out -- not just self loops """
+        results = ShExEvaluator(rdf, shex, [EX.a, EX.b, EX.c, EX.loop], EX.Link).evaluate()
+        self.assertEqual([False, True, False, False], [r.result for r in results])
+
+    def test_closed(self):
+        results = ShExEvaluator(rdf, shex, [EX.a, EX.c], EX.Closed).evaluate()
+        self.assertTrue(results[0].result)
+        self.assertFalse(results[1].result)
+        self.assertIn("Unmatched triples in CLOSED shape", results[1].reason)
+
+
+if __name__ == '__main__':
+    unittest.main()
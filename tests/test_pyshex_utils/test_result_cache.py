@@ -0,0 +1,63 @@
+import unittest
+
+from pyshex import ShExEvaluator
+from pyshex.utils.result_cache import ResultCache
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Person { :worksFor @:Organization }
+:Organization { :name . }
+:Knower { :knows @:Knower * }"""
+
+people = """@prefix : <http://schema.example/> .
+:acme :name "Acme" .
+""" + '\n'.join(f":p{i} :worksFor :acme ." for i in range(20))
+
+knowers = """@prefix : <http://schema.example/> .
+:k1 :knows :k2 .
+:k2 :knows :k1 .
+"""
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def test_lru(self):
+        cache = ResultCache(2)
+        cache.put((EX.a, 'S'), True)
+        cache.put((EX.b, 'S'), False)
+        self.assertTrue(cache.get((EX.a, 'S')))
+        cache.put((EX.c, 'S'), True)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get((EX.b, 'S')))
+        self.assertIsNotNone(cache.get((EX.c, 'S')))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def test_shared_reference(self):
+        foci = [EX[f'p{i}'] for i in range(20)]
+        evaluator = ShExEvaluator(people, shex, foci, EX.Person, result_cache_size=100)
+        self.assertTrue(all(r.result for r in evaluator.evaluate()))
+        self.assertEqual(1, evaluator.result_cache.misses)
+        self.assertEqual(19, evaluator.result_cache.hits)
+        self.assertIn((EX.acme, str(EX.Organization)), evaluator.result_cache._results)
+
+        # A new graph invalidates everything
+        evaluator.rdf = people.replace('"Acme"', ':acme2')
+        self.assertEqual(0, len(evaluator.result_cache))
+        self.assertTrue(all(r.result for r in evaluator.evaluate()))
+
+    def test_no_cache(self):
+        evaluator = ShExEvaluator(people, shex, [EX.p1, EX.p2], EX.Person)
+        self.assertIsNone(evaluator.result_cache)
+        self.assertTrue(all(r.result for r in evaluator.evaluate()))
+
+    def test_recursive_results_cached(self):
+        evaluator = ShExEvaluator(knowers, shex, EX.k1, EX.Knower, result_cache_size=100)
+        self.assertTrue(evaluator.evaluate()[0].result)
+        # k2 was evaluated while k1 was assumed to conform.  Its result is only recorded once the cycle is resolved
+        self.assertEqual([(EX.k1, str(EX.Knower)), (EX.k2, str(EX.Knower))],
+                         sorted(evaluator.result_cache._results.keys()))
+        self.assertTrue(evaluator.evaluate(focus=EX.k2)[0].result)
+        self.assertEqual(1, evaluator.result_cache.hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
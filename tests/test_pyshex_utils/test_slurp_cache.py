@@ -0,0 +1,73 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from rdflib import Literal, XSD, BNode
+
+from pyshex import ShExEvaluator
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple
+from pyshex.user_agent import SlurpyGraphWithAgent
+from pyshex.utils.slurp_cache import SlurpCache
+from pyshex.utils.sparql_prefetch import NeighbourhoodPrefetcher
+from tests.test_pyshex_utils.test_sparql_prefetch import LocalEndpoint, shex
+from tests.utils.setup_test import EX
+
+# Nothing listens here -- anything that isn't in the cache fails
+ENDPOINT = 'http://localhost:1/sparql'
+
+
+class SlurpCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'slurps.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        cache = SlurpCache(self.path)
+        g = SlurpyGraphWithAgent(ENDPOINT, cache=cache)
+        triples = [RDFTriple((EX.s, EX.p, Literal("chat", lang="fr"))),
+                   RDFTriple((EX.s, EX.p, Literal("17", datatype=XSD.integer))),
+                   RDFTriple((EX.s, EX.q, BNode('b1'))),
+                   RDFTriple((EX.s, EX.q, EX.o))]
+        cache.store(g, (EX.s, None, None), triples)
+        self.assertEqual(((EX.s, None, None), triples), cache.lookup(g, (EX.s, None, None)))
+
+        # A predicate pattern is satisfied by the subject's arcs out
+        self.assertEqual({EX.o, BNode('b1')}, set(g.objects(EX.s, EX.q)))
+        self.assertEqual(2, cache.hits)
+
+        # Different graph names are different entries
+        g.graph_name = ''
+        self.assertIsNone(cache.lookup(g, (EX.s, None, None)))
+
+    def test_ttl(self):
+        cache = SlurpCache(self.path, ttl=60)
+        g = SlurpyGraphWithAgent(ENDPOINT, cache=cache)
+        cache.store(g, (EX.s, None, None), [RDFTriple((EX.s, EX.p, EX.o))])
+        cache.conn.execute("UPDATE slurps SET fetched = fetched - 120")
+        self.assertIsNone(cache.lookup(g, (EX.s, None, None)))
+        self.assertEqual(1, cache.misses)
+        self.assertIsNotNone(SlurpCache(self.path).lookup(g, (EX.s, None, None)))
+        self.assertEqual(1, cache.purge())
+        self.assertIsNone(SlurpCache(self.path).lookup(g, (EX.s, None, None)))
+
+    def test_repeated_run(self):
+        """ A second run is answered entirely from the cache """
+        endpoint = LocalEndpoint()
+        g = SlurpyGraphWithAgent(ENDPOINT, cache=SlurpCache(self.path))
+        NeighbourhoodPrefetcher(g, query=endpoint).prefetch([EX.alice, EX.dave], [EX.knows], 2)
+        self.assertEqual(3, len(endpoint.queries))
+
+        cache = pickle.loads(pickle.dumps(SlurpCache(self.path)))
+        g2 = SlurpyGraphWithAgent(ENDPOINT, cache=cache)
+        results = ShExEvaluator(g2, shex, [EX.alice, EX.dave], EX.Person).evaluate()
+        self.assertEqual([True, True], [r.result for r in results])
+        self.assertEqual(0, g2.total_queries)
+        self.assertLess(0, cache.hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
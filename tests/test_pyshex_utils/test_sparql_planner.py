@@ -0,0 +1,94 @@
+import json
+import unittest
+from typing import List
+
+from rdflib import Graph
+from sparqlslurper import SlurpyGraph
+
+from pyshex import ShExEvaluator
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.schema_loader import SchemaLoader
+from pyshex.utils.sparql_planner import SPARQLPlanner
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Person { :name . ; :knows @:Pet * ; ^:employs . ? }
+:Pet { :species . }
+:Strict CLOSED { :name . }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:alice :name "Alice" ; :age 30 ; :knows :rex, :tom .
+:rex :species "dog" ; :colour "brown" .
+:tom :species "cat" .
+:acme :employs :alice .
+:bob :name "Bob" ; :knows :rex .
+:carol :name "Carol" ."""
+
+
+class LocalSPARQL:
+    """ Stands in for the slurper's SPARQLWrapper, answering queries from an in-memory graph """
+    def __init__(self, data: str = rdf) -> None:
+        self.g = Graph()
+        self.g.parse(data=data, format="turtle")
+        self.endpoint = 'http://localhost:1/sparql'
+        self.queries: List[str] = []
+
+    def setQuery(self, query: str) -> None:
+        self.queries.append(query)
+
+    def query(self) -> "LocalSPARQL":
+        return self
+
+    def convert(self) -> dict:
+        return json.loads(self.g.query(self.queries[-1]).serialize(format='json'))
+
+
+def slurper(data: str = rdf) -> SlurpyGraph:
+    g = SlurpyGraph('http://localhost:1/sparql')
+    g.sparql = LocalSPARQL(data)
+    return g
+
+
+class SPARQLPlannerTestCase(unittest.TestCase):
+    def test_plan(self):
+        cs = CompiledSchema(SchemaLoader().loads(shex))
+        planner = SPARQLPlanner(cs)
+        plan = planner.plan(cs.shapeExprFor(EX.Person))
+        self.assertFalse(plan.all_out)
+        self.assertEqual({EX.name, EX.knows}, plan.fwd)
+        self.assertEqual({EX.employs}, plan.rev)
+        self.assertEqual({EX.knows: {EX.species}}, plan.refs)
+        self.assertIs(plan, planner.plan(cs.shapeExprFor(EX.Person)))
+        self.assertTrue(planner.plan(cs.shapeExprFor(EX.Strict)).all_out)
+
+    def test_one_query_per_node(self):
+        g = slurper()
+        results = ShExEvaluator(g, shex, [EX.alice, EX.bob], EX.Person, plan_slurps=True).evaluate()
+        self.assertEqual([True, True], [r.result for r in results])
+        self.assertEqual(2, len(g.sparql.queries))
+        # Only the triples that the shapes look at are fetched
+        loaded = {p for _, p, _ in Graph.triples(g, (None, None, None))}
+        self.assertEqual({EX.name, EX.knows, EX.species, EX.employs}, loaded)
+
+        # Exact slurping needs a query for each predicate of each node
+        g2 = slurper()
+        results = ShExEvaluator(g2, shex, [EX.alice, EX.bob], EX.Person, over_slurp=False).evaluate()
+        self.assertEqual([True, True], [r.result for r in results])
+        self.assertLess(2, len(g2.sparql.queries))
+
+    def test_closed(self):
+        g = slurper()
+        results = ShExEvaluator(g, shex, [EX.alice, EX.carol], EX.Strict, plan_slurps=True).evaluate()
+        self.assertEqual([False, True], [r.result for r in results])
+        self.assertEqual(2, len(g.sparql.queries))
+
+    def test_batches(self):
+        g = slurper()
+        results = ShExEvaluator(g, shex, [EX.alice, EX.bob, EX.carol], EX.Person, plan_slurps=True,
+                                prefetch=10).evaluate()
+        self.assertEqual([True, True, True], [r.result for r in results])
+        self.assertEqual(1, len(g.sparql.queries))
+
+
+if __name__ == '__main__':
+    unittest.main()
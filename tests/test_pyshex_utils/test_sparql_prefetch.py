@@ -0,0 +1,90 @@
+import re
+import unittest
+from typing import Dict, List
+
+from rdflib import Graph, URIRef, Literal
+from sparqlslurper import SlurpyGraph
+
+from pyshex import ShExEvaluator
+from pyshex.utils.sparql_prefetch import NeighbourhoodPrefetcher
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+:Person { :name . ; :knows @:Person * }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:alice :name "Alice" ; :knows :bob .
+:bob :name "Bob" ; :knows :carol .
+:carol :name "Carol" .
+:dave :name "Dave" ; :knows :eve .
+:eve :name "Eve" ."""
+
+
+class LocalEndpoint:
+    """ Answers the prefetcher's queries from an in-memory graph, recording each query """
+    def __init__(self) -> None:
+        self.g = Graph()
+        self.g.parse(data=rdf, format="turtle")
+        self.queries: List[str] = []
+
+    def __call__(self, query: str) -> Dict:
+        self.queries.append(query)
+        bindings = []
+        for s in re.search(r'VALUES \?s {([^}]*)}', query).group(1).split():
+            for t in self.g.triples((URIRef(s[1:-1]), None, None)):
+                bindings.append({k: self.term(v) for k, v in zip('spo', t)})
+        return dict(results=dict(bindings=bindings))
+
+    @staticmethod
+    def term(v) -> Dict:
+        if isinstance(v, Literal):
+            return dict(type='literal', value=str(v))
+        return dict(type='uri', value=str(v))
+
+
+def slurper() -> SlurpyGraph:
+    # Nothing listens here -- any query that the prefetcher didn't anticipate fails
+    return SlurpyGraph('http://localhost:1/sparql')
+
+
+class SPARQLPrefetchTestCase(unittest.TestCase):
+    def test_batches(self):
+        g = slurper()
+        endpoint = LocalEndpoint()
+        prefetcher = NeighbourhoodPrefetcher(g, batch_size=2, concurrency=2, query=endpoint)
+        self.assertEqual(3, prefetcher.prefetch([EX.alice, EX.dave, EX.eve, EX.alice]))
+        self.assertEqual(2, len(endpoint.queries))
+        self.assertEqual(2, g.total_queries)
+        self.assertEqual(5, g.total_triples)
+        self.assertTrue(g.already_resolved((EX.eve, None, None)))
+        self.assertFalse(g.already_resolved((EX.bob, None, None)))
+
+        # Resolved nodes aren't fetched again
+        self.assertEqual(0, prefetcher.prefetch([EX.alice, EX.dave]))
+        self.assertEqual(2, len(endpoint.queries))
+
+    def test_follow(self):
+        g = slurper()
+        endpoint = LocalEndpoint()
+        prefetcher = NeighbourhoodPrefetcher(g, query=endpoint)
+        self.assertEqual(3, prefetcher.prefetch([EX.alice], [EX.knows], 2))
+        self.assertEqual(3, len(endpoint.queries))
+        self.assertEqual(5, len(g))
+        self.assertTrue(g.already_resolved((EX.carol, None, None)))
+
+    def test_graph_name(self):
+        g = slurper()
+        g.graph_name = '<http://schema.example/g>'
+        self.assertEqual('SELECT ?s ?p ?o {graph <http://schema.example/g> {VALUES ?s {<http://schema.example/a>} '
+                         '?s ?p ?o}}', NeighbourhoodPrefetcher(g).query_text([EX.a]))
+
+    def test_evaluate_warm(self):
+        """ Evaluation runs entirely against the prefetched neighbourhoods """
+        g = slurper()
+        NeighbourhoodPrefetcher(g, query=LocalEndpoint()).prefetch([EX.alice, EX.dave], [EX.knows], 2)
+        results = ShExEvaluator(g, shex, [EX.alice, EX.dave], EX.Person).evaluate()
+        self.assertEqual([True, True], [r.result for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from rdflib import Graph
+
+from pyshex import ShExEvaluator
+from pyshex.utils.compiled_schema import CompiledSchema
+from pyshex.utils.schema_loader import SchemaLoader
+from pyshex.utils.sparql_pushdown import SPARQLPushdown
+from tests.test_pyshex_utils.test_sparql_planner import slurper
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+:Item {
+    :label xsd:string MAXLENGTH 5 ;
+    :count xsd:integer MININCLUSIVE 0 ? ;
+    :status [:active :retired] ;
+    :tag LITERAL {0,3} ;
+    ^:contains IRI *
+}
+:Ref { :item @:Item }
+:Pattern { :label /^[a-z]+$/ }"""
+
+rdf = """@prefix : <http://schema.example/> .
+:i1 :label "one" ; :status :active ; :tag "a", "b" .
+:i2 :label "two" ; :count -1 ; :status :active .
+:i3 :label 3 ; :status :active .
+:i4 :label "four" ; :status :gone .
+:i5 :label "five", "cinq" ; :status :active .
+:i6 :label "six" ; :status :active ; :tag "a", "b", "c", "d" .
+:i7 :status :active .
+:i8 :label "eight" ; :count 5 ; :status :retired ; :tag "x" .
+:i10 :label "fourteen" ; :status :active .
+:i11 :label "eleven" ; :status :active .
+:box :contains :i1, :i8 ."""
+
+nodes = [EX.i1, EX.i2, EX.i3, EX.i4, EX.i5, EX.i6, EX.i7, EX.i8, EX.i9, EX.i10, EX.i11]
+
+
+class SPARQLPushdownTestCase(unittest.TestCase):
+    def test_compile(self):
+        cs = CompiledSchema(SchemaLoader().loads(shex))
+        pushdown = SPARQLPushdown(cs)
+        self.assertIsNotNone(pushdown.compile(EX.Item))
+        self.assertIs(pushdown.compile(EX.Item), pushdown.compile(cs.shapeExprFor(EX.Item)))
+        self.assertEqual(1, len(pushdown.compile(EX.Item).joins))
+        self.assertIsNone(pushdown.compile(EX.Ref))
+        self.assertIsNone(pushdown.compile(EX.Pattern))
+
+    def test_violations(self):
+        g = slurper(rdf)
+        violations = SPARQLPushdown(CompiledSchema(SchemaLoader().loads(shex))).violations(g, nodes, EX.Item)
+        self.assertEqual({EX.i2, EX.i3, EX.i4, EX.i5, EX.i6, EX.i7, EX.i9, EX.i10, EX.i11}, violations.nodes)
+        self.assertEqual({EX.i9}, violations.absent)
+        self.assertEqual(1, len(g.sparql.queries))
+        self.assertEqual(0, len(g))
+
+    def test_evaluate(self):
+        """ Push-down gives the same verdicts as the engine and only the possible violations are fetched """
+        g = Graph()
+        g.parse(data=rdf, format="turtle")
+        expected = [r.result for r in ShExEvaluator(g, shex, nodes, EX.Item).evaluate()]
+        self.assertEqual([True, False, False, False, False, False, False, True, False, False, False], expected)
+
+        g = slurper(rdf)
+        results = ShExEvaluator(g, shex, nodes, EX.Item, pushdown=5).evaluate()
+        self.assertEqual(expected, [r.result for r in results])
+        self.assertEqual([''] * 2, [r.reason for r in results if r.focus in (EX.i1, EX.i8)])
+        self.assertTrue(all(r.reason for r in results if not r.result))
+        self.assertEqual(set(), set(Graph.triples(g, (EX.i1, None, None))))
+
+        # A focus node that isn't in the graph fails, even when nothing else in its batch has been fetched
+        shex_any = "PREFIX : <http://schema.example/>\n:S { :label . * }"
+        for focus in ([EX.i1, EX.i9], [EX.i9, EX.i1], [EX.i9]):
+            g = slurper(rdf)
+            results = ShExEvaluator(g, shex_any, focus, EX.S, pushdown=5).evaluate()
+            self.assertEqual([f != EX.i9 for f in focus], [r.result for r in results])
+            self.assertEqual([f"Focus: {EX.i9} not in graph"], [r.reason for r in results if not r.result])
+            self.assertEqual(0, len(g))
+
+        # Shapes that can't be pushed down go through the engine
+        results = ShExEvaluator(slurper(rdf), shex, [EX.box], EX.Ref, pushdown=5).evaluate()
+        self.assertEqual([False], [r.result for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
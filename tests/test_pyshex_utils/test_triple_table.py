@@ -0,0 +1,53 @@
+import unittest
+
+from rdflib import Graph
+
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple, RDFGraph
+from pyshex.utils.neighbourhood import Neighbourhood
+from pyshex.utils.triple_table import TripleTable, submasks, bit_count
+from tests.utils.setup_test import EX
+
+t1 = RDFTriple((EX.s, EX.p, EX.o1))
+t2 = RDFTriple((EX.s, EX.p, EX.o2))
+t3 = RDFTriple((EX.s, EX.q, EX.o1))
+
+
+class TripleTableTestCase(unittest.TestCase):
+    def test_numbering(self):
+        table = TripleTable([t1, t2])
+        self.assertEqual(2, len(table))
+        self.assertEqual(0b11, table.all)
+        self.assertEqual(0b100, table.add([t3]))
+        self.assertEqual(0b101, table.add([t1, t3]))
+        self.assertEqual(3, len(table))
+        self.assertEqual(0b110, table.mask([t3, t2]))
+        self.assertEqual([t1, t3], list(table.members(0b101)))
+        self.assertEqual(RDFGraph([t1, t3]), table.graph(0b101))
+        self.assertEqual(RDFGraph(), table.graph(0))
+        with self.assertRaises(KeyError):
+            table.mask([RDFTriple((EX.s, EX.r, EX.o1))])
+
+    def test_submasks(self):
+        self.assertEqual([0], list(submasks(0)))
+        self.assertEqual([0b101, 0b100, 0b001, 0], list(submasks(0b101)))
+        self.assertEqual(2 ** 4, len(set(submasks(0b1111))))
+        self.assertEqual(3, bit_count(0b10101))
+
+    def test_neighbourhood_masks(self):
+        g = Graph()
+        g.parse(data="""@prefix : <http://schema.example/> .
+:a :next :a, :b ; :name "a" .
+:c :next :a .""", format="turtle")
+        nbh = Neighbourhood(g, EX.a)
+        table = nbh.table
+        # The self loop is both an arc in and an arc out, but it is only numbered once
+        self.assertEqual(RDFGraph(nbh.outs(EX.next)), table.graph(nbh.out_mask(EX.next)))
+        self.assertEqual(RDFGraph(nbh.ins(EX.next)), table.graph(nbh.in_mask(EX.next)))
+        self.assertEqual(1, bit_count(nbh.out_mask(EX.next) & nbh.in_mask(EX.next)))
+        self.assertEqual(4, len(table))
+        self.assertEqual(3, bit_count(nbh.arcs_out_mask()))
+        self.assertEqual(0, nbh.out_mask(EX.other))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch
+
+from rdflib import Literal, URIRef, BNode, Graph, XSD
+
+from pyshex.shape_expressions_language import p5_4_node_constraints
+from pyshex.shape_expressions_language.p5_4_node_constraints import _nodeSatisfiesValue, nodeSatisfiesValues
+from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.utils.schema_loader import SchemaLoader
+from pyshex.utils.value_set_utils import StemSet
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+:S {
+    :a [:x :y "z" "z"@en 1 "2"^^xsd:integer] ;
+    :b [:x~ <http://other.example/>~ <http://schema.example/xy>~] ;
+    :c ["ab"~ @en~ @fr] ;
+    :d [:~ - :x - :y~] ;
+    :e [. - :x - :y~] ;
+    :f ["ab"~ - "abc" @en~ - @en-us] ;
+    :g [@en~]
+}"""
+
+nodes = [EX.x, EX.xy, EX.xyz, EX.y, EX.yz, EX.z, URIRef("http://other.example/thing"), BNode(), Literal("z"),
+         Literal("z", lang="en"), Literal("z", lang="EN"), Literal(1), Literal("1", datatype=XSD.integer),
+         Literal(2), Literal("ab"), Literal("abc"), Literal("abd"), Literal("q"), Literal("x", lang="en-us"),
+         Literal("y", lang="fr"), Literal("y", lang="fr-ca"), Literal("x", datatype=XSD.string)]
+
+
+class StemSetTestCase(unittest.TestCase):
+    def test_stems(self):
+        stems = StemSet(["ab", "a", "b", "abc", "bcd", "c"])
+        self.assertEqual(["a", "b", "c"], stems.stems)
+        self.assertTrue(stems.matches("ax"))
+        self.assertTrue(stems.matches("bcdx"))
+        self.assertFalse(stems.matches("d"))
+        self.assertFalse(stems.matches(""))
+
+        stems = StemSet(["ab", "ac"])
+        self.assertTrue(stems.matches("ab"))
+        self.assertTrue(stems.matches("abz"))
+        self.assertFalse(stems.matches("aa"))
+        self.assertFalse(stems.matches("ad"))
+        self.assertFalse(StemSet([]).matches("a"))
+        self.assertTrue(StemSet([""]).matches("a"))
+
+
+class ValueSetIndexTestCase(unittest.TestCase):
+    def test_same_as_values(self):
+        """ The index gives the same answer as matching the values one at a time """
+        cntxt = Context(Graph(), SchemaLoader().loads(shex))
+        for tc in cntxt.schema.shapes[0].expression.expressions:
+            values = cntxt.compiled_schema.value_set(tc.valueExpr)
+            index = cntxt.compiled_schema.value_set_index(tc.valueExpr)
+            for n in nodes:
+                expected = any(_nodeSatisfiesValue(cntxt, n, vsv) for vsv in values)
+                actual = index.matches(n) or any(_nodeSatisfiesValue(cntxt, n, vsv) for vsv in index.others)
+                self.assertEqual(expected, actual, f"{tc.predicate} {n!r}")
+
+    def test_large_value_set(self):
+        values = [f"http://example.org/code/{i}" for i in range(20000)]
+        shex_large = "PREFIX : <http://schema.example/>\n:S { :p [" + \
+                     ' '.join(f"<{v}>" for v in values) + "] }"
+        cntxt = Context(Graph(), SchemaLoader().loads(shex_large))
+        cntxt.verdict_only = True
+        nc = cntxt.schema.shapes[0].expression.valueExpr
+        # Every value is in the index, so no node should be compared with the values one by one
+        with patch.object(p5_4_node_constraints, '_nodeSatisfiesValue',
+                          wraps=p5_4_node_constraints._nodeSatisfiesValue) as value_check:
+            for i in range(0, 40000, 7):
+                self.assertEqual(i < 20000, nodeSatisfiesValues(cntxt, URIRef(f"http://example.org/code/{i}"), nc))
+        self.assertEqual(0, value_check.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@ from typing import List
 from ShExJSG import ShExJ
 
 from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.utils.schema_utils import predicates_in_expression, predicates_in_tripleexpr, \
+    triple_constraints_in_expression
 from tests.utils.setup_test import setup_test
 
 shex_1 = """{ "type": "Schema", "shapes": [
@@ -65,6 +67,24 @@ class VisitorTestCase(unittest.TestCase):
         cntxt.visit_shapes(schema.shapes[0], visit_shape, shapes_visited)
         self.assertEqual(["http://schema.example/EmployeeShape"], shapes_visited)
 
+    def test_memoized_analysis(self):
+        schema, _ = setup_test(shex_1, None)
+        cntxt = Context(None, schema)
+        employee = schema.shapes[0]
+        expected = {"http://xmlns.com/foaf/0.1/name", "http://schema.example/empID"}
+        self.assertEqual(expected, set(predicates_in_expression(employee, cntxt)))
+        self.assertEqual(expected, predicates_in_tripleexpr(employee.expression, cntxt))
+        self.assertEqual(2, len(triple_constraints_in_expression(employee.expression, cntxt)))
+
+        # The analyses are done once per schema and callers get their own copies
+        analyses = len(cntxt.compiled_schema._analyses)
+        predicates_in_tripleexpr(employee.expression, cntxt).clear()
+        self.assertEqual(expected, predicates_in_tripleexpr(employee.expression, cntxt))
+        self.assertEqual(expected, set(Context(None, schema, compiled_schema=cntxt.compiled_schema)
+                                       .compiled_schema.analysis('predicates_in_tripleexpr', employee.expression,
+                                                                 lambda: None)))
+        self.assertEqual(analyses, len(cntxt.compiled_schema._analyses))
+
     @unittest.skipIf(True, "Example 2 may not be valid - check it")
     def test_example_2(self):
         schema, _ = setup_test(shex_2, None)
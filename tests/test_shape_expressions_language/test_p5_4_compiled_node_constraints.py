@@ -0,0 +1,71 @@
+import unittest
+from typing import List
+
+from rdflib import Literal, BNode, XSD, Graph
+
+from pyshex.parse_tree.parse_node import ParseNode
+from pyshex.shape_expressions_language.p5_4_node_constraints import satisfiesNodeConstraint, nodeSatisfiesNodeKind, \
+    nodeSatisfiesDataType, nodeSatisfiesStringFacet, nodeSatisfiesNumericFacet, nodeSatisfiesValues
+from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.utils.schema_loader import SchemaLoader
+from tests.utils.setup_test import EX
+
+shex = """PREFIX : <http://schema.example/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+:S {
+    :a IRI /^http:\\/\\/schema/ ;
+    :b LITERAL MINLENGTH 2 MAXLENGTH 4 ;
+    :c xsd:integer MININCLUSIVE 3 MAXEXCLUSIVE 10.5 ;
+    :d xsd:decimal TOTALDIGITS 3 FRACTIONDIGITS 1 ;
+    :e [:x :y "z"] ;
+    :f LENGTH 3 ;
+    :g /^ab+c$/i ;
+    :h BNODE ;
+    :i NONLITERAL ;
+    :j . ;
+    :k MINEXCLUSIVE 0 MAXINCLUSIVE 1
+}"""
+
+nodes = [EX.x, EX.abc, BNode(), Literal("z"), Literal("ab"), Literal("abcde"), Literal("ABBC"), Literal(2),
+         Literal(3), Literal(10), Literal(11), Literal("12.3", datatype=XSD.decimal),
+         Literal("1.23", datatype=XSD.decimal), Literal("1234", datatype=XSD.decimal), Literal(0.5),
+         Literal("x", datatype=XSD.integer), Literal("abc", lang="en")]
+
+
+class CompiledNodeConstraintTestCase(unittest.TestCase):
+    @staticmethod
+    def fail_reasons(cntxt: Context) -> List[str]:
+        return [e.strip() for e in cntxt.current_node.fail_reasons(cntxt.graph)]
+
+    def test_same_as_facets(self):
+        """ The compiled form of each constraint gives the same answer and reasons as the facet functions """
+        cntxt = Context(Graph(), SchemaLoader().loads(shex))
+        for tc in cntxt.schema.shapes[0].expression.expressions:
+            nc = tc.valueExpr
+            if nc is None:
+                continue
+            for n in nodes:
+                cntxt.current_node = ParseNode(satisfiesNodeConstraint, nc, n, cntxt)
+                expected = nodeSatisfiesNodeKind(cntxt, n, nc) and nodeSatisfiesDataType(cntxt, n, nc) and \
+                    nodeSatisfiesStringFacet(cntxt, n, nc) and nodeSatisfiesNumericFacet(cntxt, n, nc) and \
+                    nodeSatisfiesValues(cntxt, n, nc)
+                expected_reasons = self.fail_reasons(cntxt)
+                cntxt.current_node = ParseNode(satisfiesNodeConstraint, nc, n, cntxt)
+                self.assertEqual(expected, cntxt.compiled_schema.node_checker(nc)(cntxt, n), f"{tc.predicate} {n}")
+                self.assertEqual(expected_reasons, self.fail_reasons(cntxt))
+
+    def test_non_number_reason(self):
+        cntxt = Context(Graph(), SchemaLoader().loads(shex))
+        nc = cntxt.schema.shapes[0].expression.expressions[-1].valueExpr
+        cntxt.current_node = ParseNode(satisfiesNodeConstraint, nc, Literal("abc"), cntxt)
+        self.assertFalse(cntxt.compiled_schema.node_checker(nc)(cntxt, Literal("abc")))
+        self.assertEqual(["Numeric test on non-number: abc"], self.fail_reasons(cntxt))
+
+    def test_compiled_once(self):
+        cntxt = Context(Graph(), SchemaLoader().loads(shex))
+        nc = cntxt.schema.shapes[0].expression.expressions[0].valueExpr
+        self.assertIs(cntxt.compiled_schema.node_checker(nc), cntxt.compiled_schema.node_checker(nc))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from ShExJSG.ShExJ import IRIREF
 from rdflib import URIRef, RDF
 
 from pyshex.shape_expressions_language.p5_context import Context
+from pyshex.shapemap_structure_and_language.p1_notation_and_terminology import RDFTriple
 from pyshex.utils.schema_utils import predicates_in_expression
 from tests.utils.setup_test import gen_rdf, setup_context
 
@@ -61,6 +62,31 @@ class ContextTestCase(unittest.TestCase):
         self.assertEqual(predicates_in_expression(c.shapeExprFor(IRIREF('http://schema.example/UserShape')), c),
                          [ShExJ.IRIREF(str(u)) for u in predicates])
 
+    def test_tc_results(self):
+        """ Value checks are memoized for as long as the assumptions they were made under hold """
+        c = setup_context(shex_1, rdf_1)
+        tc = c.te_id_map['http://schema.example/te1']
+        alice = URIRef('http://schema.example/Alice')
+        t1 = RDFTriple((alice, RDF.type, URIRef('http://schema.example/Teacher')))
+        t2 = RDFTriple((alice, RDF.type, URIRef('http://schema.example/Person')))
+        self.assertIsNone(c.tc_result(t1, tc))
+        c.record_tc_result(t1, tc, True)
+
+        # t2 is checked while an assumption is in effect
+        shape = c.shapeExprFor(IRIREF('http://schema.example/UserShape'))
+        self.assertIsNone(c.start_evaluating(alice, shape))
+        self.assertTrue(c.start_evaluating(alice, shape))
+        c.record_tc_result(t2, tc, False)
+        self.assertFalse(c.tc_result(t2, tc))
+
+        # Revising the assumption invalidates t2 but not t1
+        self.assertEqual((False, True), c.done_evaluating(alice, shape, False))
+        self.assertIsNone(c.tc_result(t2, tc))
+        self.assertTrue(c.tc_result(t1, tc))
+
+        c.reset()
+        self.assertIsNone(c.tc_result(t1, tc))
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+import unittest
+
+from rdflib import Graph, Literal
+
+from pyshex import ShExEvaluator
+from tests.utils.setup_test import EX
+
+employees = """PREFIX : <http://schema.example/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+:Employee { :name xsd:string ; :manager @:Employee ; :knows @:Employee * }"""
+
+lists = """PREFIX : <http://schema.example/>
+:List { :first . ; :rest @:List ? }"""
+
+choices = """PREFIX : <http://schema.example/>
+:R @:Rr OR @:Rs
+:Rr { :r @:S }
+:Rs { :s @:S }
+:S { :p @:S ; :q [1] }"""
+
+choices_rdf = """@prefix : <http://schema.example/> .
+:f :r :x ; :s :y .
+:x :p :y ; :q 2 .
+:y :p :x ; :q 1 ."""
+
+
+def org_chart(n: int, bad: int = -1) -> Graph:
+    """ A management cycle of n employees, each of whom knows another one.  Employee bad has no string name """
+    g = Graph()
+    for i in range(n):
+        g.add((EX[f'e{i}'], EX.name, Literal(f"E{i}") if i != bad else Literal(i)))
+        g.add((EX[f'e{i}'], EX.manager, EX[f'e{(i + 1) % n}']))
+        g.add((EX[f'e{i}'], EX.knows, EX[f'e{(i * 7 + 3) % n}']))
+    return g
+
+
+def linked_list(n: int) -> Graph:
+    """ A list of n elements """
+    g = Graph()
+    for i in range(n):
+        g.add((EX[f'l{i}'], EX.first, Literal(i)))
+        if i + 1 < n:
+            g.add((EX[f'l{i}'], EX.rest, EX[f'l{i + 1}']))
+    return g
+
+
+class RecursionTestCase(unittest.TestCase):
+    def test_cycle(self):
+        """ A pair is only re-evaluated when a pair that it references changes, which happens at most once """
+        for bad in (-1, 20):
+            evaluator = ShExEvaluator(org_chart(40, bad), employees, EX.e0, EX.Employee, profile=True)
+            self.assertEqual([bad == -1], [r.result for r in evaluator.evaluate()])
+            self.assertGreaterEqual(120, evaluator.stats.shapes[str(EX.Employee)].evaluations)
+
+    def test_deep_data(self):
+        """ The depth of the data isn't limited by the python stack """
+        g = linked_list(3000)
+        self.assertTrue(ShExEvaluator(g, lists, EX.l0, EX.List).evaluate()[0].result)
+        g.remove((EX.l2999, EX.first, None))
+        result = ShExEvaluator(g, lists, EX.l0, EX.List).evaluate()[0]
+        self.assertFalse(result.result)
+        self.assertIn(str(EX.l2999), result.reason)
+
+        # Each employee is evaluated once and, as its value only goes false once, re-evaluated at most once for
+        # each of the two employees that it references
+        evaluator = ShExEvaluator(org_chart(2000, 1500), employees, EX.e0, EX.Employee, profile=True)
+        self.assertEqual([False], [r.result for r in evaluator.evaluate()])
+        self.assertGreaterEqual(3 * 2000, evaluator.stats.shapes[str(EX.Employee)].evaluations)
+
+    def test_component_resolved_once(self):
+        """ Members of a cycle that are referenced again get the value the cycle resolved to """
+        g = Graph()
+        g.parse(data=choices_rdf, format="turtle")
+        # y conforms only if x does, which it doesn't -- so neither branch of R holds for f
+        results = ShExEvaluator(g, choices, [EX.f, EX.x, EX.y], EX.R).evaluate()
+        self.assertEqual([False, False, False], [r.result for r in results])
+        results = ShExEvaluator(g, choices, [EX.y, EX.x], EX.S).evaluate()
+        self.assertEqual([False, False], [r.result for r in results])
+
+        g.set((EX.x, EX.q, Literal(1)))
+        self.assertTrue(ShExEvaluator(g, choices, EX.f, EX.R).evaluate()[0].result)
+        results = ShExEvaluator(g, choices, [EX.y, EX.x], EX.S).evaluate()
+        self.assertEqual([True, True], [r.result for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
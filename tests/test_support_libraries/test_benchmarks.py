@@ -0,0 +1,19 @@
+import unittest
+
+from benchmarks.runner import run_evaluate
+from benchmarks.workloads import WORKLOADS, workload
+
+
+class BenchmarkWorkloadsTestCase(unittest.TestCase):
+    """ Keep the benchmark workloads runnable -- the numbers themselves aren't checked """
+    def test_workloads(self):
+        for name in WORKLOADS:
+            wl = workload(name, 0.02)
+            self.assertEqual(wl, workload(name, 0.02), f"{name} is not reproducible")
+            result = run_evaluate(wl, memory=False)
+            self.assertEqual(len(wl.foci), result.nodes, name)
+            self.assertLess(result.errors, result.nodes, f"{name}: every node fails")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from pyshex import ShExEvaluator
+
+shex = """PREFIX : <http://schema.example/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+
+:Person { :worksFor @:Organization ; :age xsd:integer ? }
+:Organization { :name . }"""
+
+
+def age(i: int) -> str:
+    """ Every 7th person has a bad age """
+    return str(i) if i % 7 else '"x"'
+
+
+rdf = "@prefix : <http://schema.example/> .\n:acme :name 'Acme' .\n" + \
+      '\n'.join(f":p{i} :worksFor :acme ; :age {age(i)} ." for i in range(50))
+
+foci = [f"http://schema.example/p{i}" for i in range(50)]
+
+
+class ParallelEvaluationTestCase(unittest.TestCase):
+    def test_same_results(self):
+        serial = ShExEvaluator(rdf, shex, foci, "http://schema.example/Person").evaluate()
+        evaluator = ShExEvaluator(rdf, shex, foci, "http://schema.example/Person", workers=3)
+        parallel = evaluator.evaluate()
+        self.assertEqual(serial, parallel)
+        self.assertEqual(8, evaluator.nerrors)
+        self.assertEqual(50, evaluator.nnodes)
+
+    def test_stop(self):
+        results = []
+
+        def sink(rslt) -> bool:
+            results.append(rslt)
+            return len(results) < 10
+
+        evaluator = ShExEvaluator(rdf, shex, foci, "http://schema.example/Person", output_sink=sink, workers=2)
+        evaluator.evaluate()
+        self.assertEqual(10, evaluator.nnodes)
+        self.assertEqual(foci[:10], [str(r.focus) for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
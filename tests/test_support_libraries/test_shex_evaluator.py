@@ -43,7 +43,7 @@ class ShExEvaluatorTestCase(unittest.TestCase):
         self.assertEqual("", evaluator.rdf.strip())
         self.assertIsNone(evaluator.schema)
         self.assertIsNone(evaluator.focus)
-        self.assertEqual([], evaluator.foci)
+        self.assertEqual([], list(evaluator.foci))
         self.assertEqual([START], evaluator.start)
         self.assertEqual("turtle", evaluator.rdf_format)
         self.assertTrue(isinstance(evaluator.g, Graph))
@@ -63,6 +63,55 @@ class ShExEvaluatorTestCase(unittest.TestCase):
         self.assertEqual('  Shape: http://www.wikidata.org/entity/cancer not found in Schema',
                          results[1].reason)
 
+    def test_focus_iterators(self):
+        rdf = """@prefix : <http://example.org/> .
+:c :p 1 . :a :p 2 . :b :p 3 . :b :q 4 . _:x :p 5 ."""
+        shex = """PREFIX : <http://example.org/>
+start = { :p [1 2] }"""
+        evaluator = ShExEvaluator(rdf, shex)
+        self.assertEqual(['http://example.org/a', 'http://example.org/b', 'http://example.org/c'],
+                         [str(f) for f in evaluator.foci])
+
+        # Generator -- consumed lazily
+        evaluator.focus = (f"http://example.org/{n}" for n in "cb")
+        self.assertEqual([True, False], [r.result for r in evaluator.evaluate()])
+
+        # SPARQL result rows -- first column is the focus
+        evaluator.focus = evaluator.g.query("SELECT ?s WHERE { ?s <http://example.org/p> 2 }")
+        results = evaluator.evaluate()
+        self.assertEqual([(True, URIRef('http://example.org/a'))], [(r.result, r.focus) for r in results])
+
+    def test_foci_chunks(self):
+        from pyshex import shex_evaluator
+
+        g = Graph()
+        for i in range(25):
+            g.add((URIRef(f"http://example.org/s{i:02}"), URIRef("http://example.org/p"), URIRef("http://a")))
+        save_chunk_size = shex_evaluator.FOCI_CHUNK_SIZE
+        shex_evaluator.FOCI_CHUNK_SIZE = 10
+        try:
+            foci = list(ShExEvaluator(g).foci)
+        finally:
+            shex_evaluator.FOCI_CHUNK_SIZE = save_chunk_size
+        self.assertEqual(25, len(set(foci)))
+        for chunk_start in range(0, 25, 10):
+            chunk = foci[chunk_start:chunk_start + 10]
+            self.assertEqual(sorted(chunk), chunk)
+
+    def test_verdict_only(self):
+        rdf = """@prefix : <http://example.org/> .
+:a :p 1 ; :q :b . :b :r "x" . :c :p 3 ; :q :b . :d :p 1 ; :q _:x . _:x :r 1 ."""
+        shex = """PREFIX : <http://example.org/>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+start = { :p [1 2] ; :q { :r xsd:string } }"""
+        foci = ["http://example.org/" + n for n in "abcd"]
+        full = ShExEvaluator(rdf, shex, foci).evaluate()
+        verdicts = ShExEvaluator(rdf, shex, foci, verdict_only=True).evaluate()
+        self.assertEqual([True, False, False, False], [r.result for r in full])
+        self.assertEqual([r.result for r in full], [r.result for r in verdicts])
+        self.assertTrue(all(r.reason for r in full if not r.result))
+        self.assertFalse(any(r.reason for r in verdicts))
+
 
 if __name__ == '__main__':
     unittest.main()